@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from telemetry import (
+    ACTOR_CODES,
+    BINARY_MAGIC,
+    EVENT_CODES,
+    EVENT_TYPES,
+    RECORD,
+    SOURCE_CODES,
+    SOURCES,
+)
+
+COLUMNS = {
+    'tick': np.uint32,
+    'fight': np.uint32,
+    'type': np.uint8,
+    'actor': np.uint8,
+    'source': np.uint8,
+    'phase': np.uint8,
+    'value': np.float32,
+    'x': np.float32,
+    'y': np.float32,
+}
+
+RECORD_DTYPE = np.dtype([(name, np.dtype(dtype).newbyteorder('<')) for name, dtype in COLUMNS.items()])
+CHUNK_ROWS = 1 << 20
+
+
+def read_binary(path):
+    with open(path, 'rb') as handle:
+        magic = handle.read(len(BINARY_MAGIC))
+        size = os.fstat(handle.fileno()).st_size
+    if magic != BINARY_MAGIC:
+        raise ValueError(f"{path} is not a binary telemetry file")
+    packed = np.dtype({
+        'names': list(COLUMNS),
+        'formats': list(RECORD_DTYPE[name] for name in COLUMNS),
+        'offsets': [0, 4, 8, 9, 10, 11, 12, 16, 20],
+        'itemsize': RECORD.size,
+    })
+    # The writer may still be appending, so only whole records are mapped.
+    count = (size - len(BINARY_MAGIC)) // RECORD.size
+    if not count:
+        records = np.zeros(0, dtype=packed)
+    else:
+        records = np.memmap(path, dtype=packed, mode='r', offset=len(BINARY_MAGIC), shape=(count,))
+    return {name: np.asarray(records[name]) for name in COLUMNS}
+
+
+def read_ndjson(path):
+    rows = {name: [] for name in COLUMNS}
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            rows['tick'].append(event['tick'])
+            rows['fight'].append(event['fight'])
+            rows['type'].append(EVENT_CODES[event['type']])
+            rows['actor'].append(ACTOR_CODES.get(event['actor'], 0))
+            rows['source'].append(SOURCE_CODES.get(event['source'], 0))
+            rows['phase'].append(event['phase'])
+            rows['value'].append(event['value'])
+            rows['x'].append(event['x'])
+            rows['y'].append(event['y'])
+    return {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in rows.items()}
+
+
+def read_telemetry(path):
+    if path.endswith('.bin'):
+        return read_binary(path)
+    return read_ndjson(path)
+
+
+class EventStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as handle:
+                self.manifest = json.load(handle)
+        else:
+            self.manifest = {'chunks': [], 'fight_offset': 0}
+
+    def save_manifest(self):
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(self.manifest, handle)
+        os.replace(temp_path, self.manifest_path)
+
+    def append(self, columns, renumber_fights=True):
+        rows = len(columns['tick'])
+        if rows == 0:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+
+        columns = dict(columns)
+        if renumber_fights:
+            # Each ingested file restarts fight ids at 0; keep them unique across the store.
+            fights = columns['fight'].astype(np.uint32) + self.manifest['fight_offset']
+            columns['fight'] = fights
+            self.manifest['fight_offset'] = int(fights.max()) + 1
+
+        for start in range(0, rows, CHUNK_ROWS):
+            chunk = f"chunk-{len(self.manifest['chunks']):06d}"
+            stop = min(rows, start + CHUNK_ROWS)
+            for name, dtype in COLUMNS.items():
+                column = np.ascontiguousarray(columns[name][start:stop], dtype=dtype)
+                np.save(os.path.join(self.directory, f"{chunk}.{name}.npy"), column)
+            self.manifest['chunks'].append({'name': chunk, 'rows': stop - start})
+
+        self.save_manifest()
+        return rows
+
+    def ingest(self, path):
+        return self.append(read_telemetry(path))
+
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self.manifest['chunks'])
+
+    def iter_chunks(self, names):
+        for chunk in self.manifest['chunks']:
+            yield {
+                name: np.load(os.path.join(self.directory, f"{chunk['name']}.{name}.npy"), mmap_mode='r')
+                for name in names
+            }
+
+    def filtered_chunks(self, names, event_type=None, actor=None):
+        wanted = set(names)
+        if event_type is not None:
+            wanted.add('type')
+        if actor is not None:
+            wanted.add('actor')
+        for columns in self.iter_chunks(sorted(wanted)):
+            mask = None
+            if event_type is not None:
+                mask = columns['type'] == EVENT_CODES[event_type]
+            if actor is not None:
+                actor_mask = columns['actor'] == ACTOR_CODES[actor]
+                mask = actor_mask if mask is None else mask & actor_mask
+            if mask is None:
+                yield {name: columns[name] for name in names}
+            else:
+                yield {name: columns[name][mask] for name in names}
+
+    def bincount(self, key, value=None, event_type=None, actor=None):
+        names = [key] if value is None else [key, value]
+        totals = np.zeros(0)
+        for columns in self.filtered_chunks(names, event_type, actor):
+            weights = None if value is None else columns[value]
+            counts = np.bincount(columns[key], weights=weights).astype(np.float64)
+            if len(counts) > len(totals):
+                counts[:len(totals)] += totals
+                totals = counts
+            else:
+                totals[:len(counts)] += counts
+        return totals
+
+    def group_sum(self, key, value=None, event_type=None, actor=None, labels=None):
+        totals = self.bincount(key, value, event_type, actor)
+        convert = int if value is None else float
+        if labels is None:
+            return {int(index): convert(total) for index, total in enumerate(totals) if total}
+        return {labels[index]: convert(total) for index, total in enumerate(totals) if total}
+
+    def histogram(self, column, bins=10, range=None, event_type=None, actor=None):
+        if range is None:
+            low, high = np.inf, -np.inf
+            for columns in self.filtered_chunks([column], event_type, actor):
+                if len(columns[column]):
+                    low = min(low, float(columns[column].min()))
+                    high = max(high, float(columns[column].max()))
+            range = (low, high) if low <= high else (0.0, 1.0)
+
+        counts = np.zeros(bins, dtype=np.int64)
+        edges = None
+        for columns in self.filtered_chunks([column], event_type, actor):
+            chunk_counts, edges = np.histogram(columns[column], bins=bins, range=range)
+            counts += chunk_counts
+        if edges is None:
+            edges = np.linspace(range[0], range[1], bins + 1)
+        return counts, edges
+
+    def event_counts(self):
+        return self.group_sum('type', labels=EVENT_TYPES)
+
+    def damage_by_source(self, actor='player'):
+        return self.group_sum('source', 'value', 'hit', actor, labels=SOURCES)
+
+    def adaptation_counts(self):
+        return self.group_sum('source', event_type='adaptation', labels=SOURCES)
+
+    def win_rate_by_phase(self):
+        fights = self.bincount('phase', event_type='death')
+        boss_wins = self.bincount('phase', event_type='death', actor='player')
+        boss_wins = np.pad(boss_wins, (0, max(0, len(fights) - len(boss_wins))))
+        return {
+            int(phase): {'fights': int(fights[phase]), 'boss_win_rate': float(boss_wins[phase] / fights[phase])}
+            for phase in np.nonzero(fights)[0]
+        }
+
+
+def summarize(store):
+    return {
+        'events': len(store),
+        'event_counts': store.event_counts(),
+        'player_damage_by_source': store.damage_by_source('player'),
+        'boss_damage_by_source': store.damage_by_source('boss'),
+        'adaptations': store.adaptation_counts(),
+        'win_rate_by_phase': store.win_rate_by_phase(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar store and aggregate queries for fight telemetry")
+    parser.add_argument('store', help="store directory")
+    parser.add_argument('--ingest', nargs='*', default=[], metavar='PATH',
+                        help="telemetry files (.ndjson or .bin) to append before querying")
+    args = parser.parse_args(argv)
+
+    store = EventStore(args.store)
+    for path in args.ingest:
+        rows = store.ingest(path)
+        print(f"ingested {rows} events from {path}", file=sys.stderr)
+    json.dump(summarize(store), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
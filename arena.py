@@ -0,0 +1,132 @@
+import json
+import os
+from bisect import bisect_left, bisect_right
+
+ARENA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'arenas')
+DEFAULT_ARENA = 'default'
+
+
+def rect_of(entry):
+    return (float(entry['x']), float(entry['y']), float(entry['width']), float(entry['height']))
+
+
+class Arena:
+    def __init__(self, spec):
+        self.name = spec.get('name', 'arena')
+        self.width = float(spec['width'])
+        self.height = float(spec['height'])
+        self.floor = float(spec['floor'])
+        self.spawns = {name: tuple(position) for name, position in spec.get('spawns', {}).items()}
+        self.hazard_zones = [rect_of(zone) for zone in spec.get('hazard_zones', [])]
+
+        self.solids = [(0.0, self.floor, self.width, self.height - self.floor)]
+        self.solids += [rect_of(platform) for platform in spec.get('platforms', [])]
+        self.solids += [rect_of(wall) for wall in spec.get('walls', [])]
+        self.ledges = [(float(ledge['x']), float(ledge['y']), float(ledge['width']))
+                       for ledge in spec.get('ledges', [])]
+        self.compile()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as handle:
+            return cls(json.load(handle))
+
+    def __deepcopy__(self, memo):
+        # Compiled geometry is immutable, so rollouts and clones share it.
+        return self
+
+    def compile(self):
+        # Cut the world into vertical slabs at every surface edge. Inside a slab the
+        # surfaces do not change, so each slab keeps its tops and solid spans sorted.
+        edges = {0.0, self.width}
+        for x, _, width, _ in self.solids:
+            edges.update((x, x + width))
+        for x, _, width in self.ledges:
+            edges.update((x, x + width))
+        self.edges = sorted(edge for edge in edges if 0.0 <= edge <= self.width)
+
+        self.tops = []
+        self.top_solid = []
+        self.spans = []
+        for left, right in zip(self.edges, self.edges[1:]):
+            tops = []
+            spans = []
+            for x, y, width, height in self.solids:
+                if x < right and x + width > left:
+                    tops.append((y, True))
+                    spans.append((y, y + height))
+            for x, y, width in self.ledges:
+                if x < right and x + width > left:
+                    tops.append((y, False))
+            tops.sort()
+            spans.sort()
+            self.tops.append([top for top, _ in tops])
+            self.top_solid.append([solid for _, solid in tops])
+            self.spans.append(spans)
+
+    def slab_range(self, x, width):
+        first = max(0, bisect_right(self.edges, x) - 1)
+        last = min(len(self.edges) - 1, bisect_left(self.edges, x + width))
+        return range(first, last)
+
+    def landing(self, x, width, old_bottom, new_bottom, drop=False):
+        best = None
+        for slab in self.slab_range(x, width):
+            tops = self.tops[slab]
+            index = bisect_left(tops, old_bottom)
+            while index < len(tops) and tops[index] <= new_bottom:
+                if not drop or self.top_solid[slab][index]:
+                    if best is None or tops[index] < best:
+                        best = tops[index]
+                    break
+                index += 1
+        return best
+
+    def ceiling(self, x, width, old_top, new_top):
+        best = None
+        for slab in self.slab_range(x, width):
+            for top, bottom in self.spans[slab]:
+                if new_top < bottom <= old_top and (best is None or bottom > best):
+                    best = bottom
+        return best
+
+    def blocked(self, slab, top, bottom):
+        spans = self.spans[slab]
+        index = bisect_left(spans, (bottom,))
+        return any(span_bottom > top for _, span_bottom in spans[:index])
+
+    def resolve_x(self, old_x, new_x, width, top, bottom):
+        edges = self.edges
+        if new_x > old_x:
+            # Slabs whose left edge the leading side sweeps past this step.
+            start = bisect_left(edges, old_x + width)
+            stop = min(bisect_left(edges, new_x + width), len(edges) - 1)
+            for slab in range(start, stop):
+                if self.blocked(slab, top, bottom):
+                    return edges[slab] - width, True
+        elif new_x < old_x:
+            start = bisect_right(edges, old_x) - 1
+            stop = bisect_right(edges, new_x)
+            for index in range(start, max(stop, 1) - 1, -1):
+                if self.blocked(index - 1, top, bottom):
+                    return edges[index], True
+
+        if new_x < 0:
+            return 0.0, True
+        if new_x > self.width - width:
+            return self.width - width, True
+        return new_x, False
+
+    def spawn(self, name, default):
+        return self.spawns.get(name, default)
+
+
+_loaded = {}
+
+
+def load_arena(name=DEFAULT_ARENA):
+    path = name if name.endswith('.json') else os.path.join(ARENA_DIR, f"{name}.json")
+    path = os.path.abspath(path)
+    if path not in _loaded:
+        _loaded[path] = Arena.load(path)
+    return _loaded[path]
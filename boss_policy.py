@@ -0,0 +1,165 @@
+import time
+
+import numpy as np
+
+DECISIONS = ['chase', 'retreat', 'attack', 'dash', 'projectile', 'hazard']
+FEATURE_COUNT = 16
+DEFAULT_LAYERS = (FEATURE_COUNT, 32, len(DECISIONS))
+DECISION_BUDGET = 0.0005
+MAX_OVERRUNS = 30
+
+
+def boss_features(boss, player, out):
+    dx = player.x - boss.x
+    dy = player.y - boss.y
+    out[:] = (
+        dx / 800.0,
+        dy / 600.0,
+        abs(dx) / boss.attack_distance,
+        boss.attack_cooldown / max(1, boss.attack_cooldown_max),
+        boss.dash_cooldown / max(1, boss.dash_cooldown_max),
+        boss.projectile_cooldown / max(1, boss.projectile_cooldown_max),
+        boss.hazard_cooldown / max(1, boss.hazard_cooldown_max),
+        boss.health / boss.max_health,
+        player.health / player.max_health,
+        boss.phase / 4.0,
+        1.0 if player.attacking else 0.0,
+        1.0 if player.blocking else 0.0,
+        1.0 if player.dash_duration > 0 else 0.0,
+        player.vel_x / 12.0,
+        player.vel_y / 20.0,
+        1.0 if player.on_ground else 0.0,
+    )
+    return out
+
+
+def decision_mask(boss, out):
+    out[:] = True
+    out[DECISIONS.index('attack')] = boss.attack_cooldown <= 0
+    out[DECISIONS.index('dash')] = boss.dash_cooldown <= 0
+    out[DECISIONS.index('projectile')] = boss.phase >= 2 and boss.projectile_cooldown <= 0
+    out[DECISIONS.index('hazard')] = boss.phase >= 2 and boss.hazard_cooldown <= 0
+    return out
+
+
+class MLPPolicy:
+    def __init__(self, weights, biases):
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        if self.weights[0].shape[0] != FEATURE_COUNT or self.weights[-1].shape[1] != len(DECISIONS):
+            raise ValueError(
+                f"policy expects {FEATURE_COUNT} inputs and {len(DECISIONS)} outputs, "
+                f"got {self.weights[0].shape[0]} and {self.weights[-1].shape[1]}"
+            )
+
+    @classmethod
+    def random(cls, layers=DEFAULT_LAYERS, seed=0, scale=0.5):
+        rng = np.random.default_rng(seed)
+        weights = [rng.normal(0, scale / np.sqrt(n_in), (n_in, n_out)) for n_in, n_out in zip(layers, layers[1:])]
+        biases = [np.zeros(n_out) for n_out in layers[1:]]
+        return cls(weights, biases)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            count = len([name for name in data.files if name.startswith('W')])
+            return cls([data[f'W{i}'] for i in range(count)], [data[f'b{i}'] for i in range(count)])
+
+    def save(self, path):
+        arrays = {}
+        for index, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'W{index}'] = weight
+            arrays[f'b{index}'] = bias
+        np.savez(path, **arrays)
+
+    def forward(self, features):
+        hidden = features
+        last = len(self.weights) - 1
+        for index, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            hidden = hidden @ weight + bias
+            if index < last:
+                np.maximum(hidden, 0.0, out=hidden)
+        return hidden
+
+
+class PolicyController:
+    def __init__(self, model, budget=DECISION_BUDGET, max_overruns=MAX_OVERRUNS):
+        self.model = model
+        self.budget = budget
+        self.max_overruns = max_overruns
+        self.enabled = True
+        self.pending = {}
+        self.overruns = 0
+        self.decisions = 0
+        self.fallbacks = 0
+        self.features = np.zeros((1, FEATURE_COUNT), dtype=np.float32)
+        self.mask = np.zeros((1, len(DECISIONS)), dtype=bool)
+
+    def infer(self, bosses, players):
+        # Feature and mask extraction count against the budget too; they cost as much as the forward pass.
+        start = time.perf_counter()
+        count = len(bosses)
+        if self.features.shape[0] < count:
+            self.features = np.zeros((count, FEATURE_COUNT), dtype=np.float32)
+            self.mask = np.zeros((count, len(DECISIONS)), dtype=bool)
+        features = self.features[:count]
+        mask = self.mask[:count]
+        for row, (boss, player) in enumerate(zip(bosses, players)):
+            boss_features(boss, player, features[row])
+            decision_mask(boss, mask[row])
+
+        logits = self.model.forward(features)
+        logits = np.where(mask, logits, -np.inf)
+        choices = logits.argmax(axis=1)
+        elapsed = (time.perf_counter() - start) / max(1, count)
+        return [DECISIONS[choice] for choice in choices], elapsed
+
+    def record_latency(self, elapsed):
+        # An overrun decision is dropped for the scripted one; repeated overruns stop later calls.
+        if elapsed <= self.budget:
+            self.overruns = 0
+            return True
+        self.overruns += 1
+        if self.overruns >= self.max_overruns:
+            self.enabled = False
+        return False
+
+    def prepare(self, games):
+        # Batch every boss whose ai_decision will run on the coming tick into one forward pass.
+        self.pending.clear()
+        bosses = []
+        players = []
+        for game in games:
+            boss = game.boss
+            if boss.policy is self and game.game_state == "playing" and boss.decision_due(1):
+                bosses.append(boss)
+                players.append(game.player)
+        if not bosses or not self.enabled:
+            return 0
+
+        decisions, elapsed = self.infer(bosses, players)
+        if not self.record_latency(elapsed):
+            decisions = [None] * len(bosses)
+        for boss, decision in zip(bosses, decisions):
+            self.pending[id(boss)] = decision
+        return len(bosses)
+
+    def decide(self, boss, player):
+        if id(boss) in self.pending:
+            decision = self.pending.pop(id(boss))
+        elif self.enabled:
+            decisions, elapsed = self.infer([boss], [player])
+            decision = decisions[0] if self.record_latency(elapsed) else None
+        else:
+            decision = None
+        if decision is None:
+            self.fallbacks += 1
+            return None
+        self.decisions += 1
+        return decision
+
+
+def step_games(games, keys, controller):
+    controller.prepare(games)
+    for game, game_keys in zip(games, keys):
+        game.update(game_keys)
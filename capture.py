@@ -0,0 +1,123 @@
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+RAW_HEADER = "MKRAW1 {width} {height} {order}\n"
+
+
+class FrameRing:
+    def __init__(self, size, slots=8, name=None):
+        width, height = size
+        self.size = size
+        self.slots = slots
+        self.frame_bytes = width * height * 3
+        create = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=create, size=slots * self.frame_bytes + slots * 8)
+        # Slots use surfarray's (width, height, 3) layout so filling one is a single strided copy.
+        self.frames = np.ndarray((slots, width, height, 3), dtype=np.uint8, buffer=self.memory.buf)
+        self.frame_numbers = np.ndarray((slots,), dtype=np.int64, buffer=self.memory.buf,
+                                        offset=slots * self.frame_bytes)
+        if create:
+            self.frame_numbers[:] = -1
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def close(self, unlink=False):
+        self.frames = None
+        self.frame_numbers = None
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+class FrameCapture:
+    def __init__(self, size, directory=None, file_format="raw", slots=8):
+        self.ring = FrameRing(size, slots)
+        self.directory = directory
+        self.file_format = file_format
+        self.head = 0
+        self.tail = 0
+        self.frame_number = 0
+        self.captured = 0
+        self.dropped = 0
+        self.encoded = 0
+        self.filled = threading.Semaphore(0)
+        self.stopping = threading.Event()
+        self.raw_file = None
+        self.encoder = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            if file_format == "raw":
+                self.raw_file = open(os.path.join(directory, "frames.rgb"), "wb")
+                width, height = size
+                self.raw_file.write(RAW_HEADER.format(width=width, height=height, order="xy").encode())
+            self.encoder = threading.Thread(target=self.run, name="frame-encoder", daemon=True)
+            self.encoder.start()
+
+    def capture(self, surface):
+        frame_number = self.frame_number
+        self.frame_number += 1
+        if self.head - self.tail >= self.ring.slots:
+            if self.encoder is None:
+                # Without a directory this is a plain ring of recent frames: reuse the oldest.
+                self.tail += 1
+            else:
+                # The encoder is behind; drop rather than stall the frame loop.
+                self.dropped += 1
+                return False
+
+        slot = self.head % self.ring.slots
+        view = pygame.surfarray.pixels3d(surface)
+        np.copyto(self.ring.frames[slot], view)
+        del view
+        self.ring.frame_numbers[slot] = frame_number
+        self.head += 1
+        self.captured += 1
+        self.filled.release()
+        return True
+
+    def latest(self):
+        if self.head == 0:
+            return None
+        return self.ring.frames[(self.head - 1) % self.ring.slots]
+
+    def release(self):
+        self.tail += 1
+
+    def encode(self, slot):
+        frame = self.ring.frames[slot]
+        if self.raw_file is not None:
+            self.raw_file.write(frame.tobytes())
+        else:
+            number = int(self.ring.frame_numbers[slot])
+            image = pygame.surfarray.make_surface(frame)
+            pygame.image.save(image, os.path.join(self.directory, f"frame-{number:06d}.png"))
+        self.encoded += 1
+
+    def run(self):
+        while True:
+            if not self.filled.acquire(timeout=0.1):
+                if self.stopping.is_set() and self.tail == self.head:
+                    break
+                continue
+            self.encode(self.tail % self.ring.slots)
+            self.release()
+
+    def close(self):
+        if self.encoder is not None:
+            self.stopping.set()
+            self.encoder.join()
+            self.encoder = None
+        if self.raw_file is not None:
+            self.raw_file.close()
+            self.raw_file = None
+        if self.ring.frames is not None:
+            self.ring.close(unlink=True)
+
+    def stats(self):
+        return {'captured': self.captured, 'dropped': self.dropped, 'encoded': self.encoded}
@@ -1,17 +1,36 @@
+import time
+STARTUP_TIME = time.perf_counter()
+
 import pygame
 import sys
+import os
 import random
 import math
-from collections import deque
-import time
+from collections import OrderedDict, deque, namedtuple
+import argparse
+import atexit
+import hashlib
+import json
+import mmap
+import threading
+import weakref
 import numpy as np
 
-pygame.init()
+from arena import load_arena
+from boss_policy import MLPPolicy, PolicyController
+from capture import FrameCapture
+from planner import MonteCarloPlanner
+from replay import ReplayRecorder
+from render import (ACTORS, BACKENDS, EFFECTS, HUD, OVERLAY, SCREEN, SCREEN_TEXT, WORLD, NullBackend, RenderList,
+                    ScaledBackend, SurfaceBackend, TextureBackend)
+from spectator import SpectatorServer, parse_address
+from telemetry import EventBus, TelemetryWriter
+from timers import Countdown, Elapsed, TimerWheel
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Mirror Knights - Adaptive Boss Fight")
+CAPTION = "Mirror Knights - Adaptive Boss Fight"
+screen = None
 
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -27,43 +46,704 @@ YELLOW = (255, 255, 0)
 
 clock = pygame.time.Clock()
 FPS = 60
+TICK_RATE = 60
+RENDER_FPS = 144
+MAX_SIM_LAG = 10
+MAX_FRAME_SKIP = 5
+FRAME_BUDGET = 1.0 / FPS
+SNAP_DISTANCE = 100
+
+startup_metrics = {}
+
+events = EventBus()
+
+ASSET_CACHE_DIR = ".asset_cache"
+ASSET_CACHE_VERSION = 1
+
+
+def init_display(resizable=False):
+    global screen
+    if screen is None:
+        pygame.display.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE if resizable else 0)
+        pygame.display.set_caption(CAPTION)
+        startup_metrics['display_ready'] = time.perf_counter() - STARTUP_TIME
+    return screen
+
+
+def mark_first_frame():
+    if 'first_frame' not in startup_metrics:
+        startup_metrics['first_frame'] = time.perf_counter() - STARTUP_TIME
+        print(f"time to first frame: {startup_metrics['first_frame'] * 1000:.1f} ms", file=sys.stderr)
+
+
+frame_hooks = []
+# Called with the game and the keys it was fed after every live (non-rollout) tick.
+tick_hooks = []
+
+
+def after_tick(game, keys):
+    for hook in tick_hooks:
+        hook(game, keys)
+
+
+def init_backend(name='surface', render_scale=1.0, resizable=False, scaled=False, vsync=False):
+    if name == 'null':
+        # Events and key state still need the video subsystem, just no window.
+        pygame.display.init()
+        return NullBackend((SCREEN_WIDTH, SCREEN_HEIGHT))
+    if name == 'sdl2':
+        pygame.display.init()
+        backend = TextureBackend.open(CAPTION, (SCREEN_WIDTH, SCREEN_HEIGHT), vsync, resizable)
+        startup_metrics['display_ready'] = time.perf_counter() - STARTUP_TIME
+        return backend
+    surface = init_display(resizable)
+    if scaled or resizable or render_scale != 1.0:
+        return ScaledBackend((SCREEN_WIDTH, SCREEN_HEIGHT), render_scale)
+    return SurfaceBackend(surface)
+
+
+def present(backend):
+    if frame_hooks:
+        frame = backend.snapshot()
+        if frame is not None:
+            for hook in frame_hooks:
+                hook(frame)
+    backend.present()
+    latency.presented()
+    mark_first_frame()
+
+
+def quit_game():
+    # pygame quits itself from atexit, after the closers registered later (capture,
+    # telemetry, replay, spectators), so those still run against a live pygame.
+    sys.exit()
+
+
+def init_headless():
+    sounds.muted = True
+
+
+class LazyFont:
+    def __init__(self, name, size):
+        self.name = name
+        self.size_px = size
+        self.font = None
+
+    def get(self):
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self.font = pygame.font.Font(self.name, self.size_px)
+        return self.font
+
+    def render(self, text, antialias, color, background=None):
+        return self.get().render(text, antialias, color, background)
+
+    def size(self, text):
+        return self.get().size(text)
+
+
+font_small = LazyFont(None, 24)
+font_medium = LazyFont(None, 32)
+font_large = LazyFont(None, 48)
+
+
+def as_tuple(value):
+    if isinstance(value, list):
+        return tuple(as_tuple(item) for item in value)
+    return value
+
+
+class AssetCache:
+    def __init__(self, directory=ASSET_CACHE_DIR, version=ASSET_CACHE_VERSION):
+        self.directory = os.path.join(directory, f"v{version}")
+        self.enabled = True
+
+    @staticmethod
+    def digest(*parts):
+        digest = hashlib.sha1()
+        for part in parts:
+            digest.update(part if isinstance(part, bytes) else repr(part).encode())
+        return digest.hexdigest()[:16]
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def map_file(self, name):
+        if not self.enabled:
+            return None
+        try:
+            with open(self.path(name), "rb") as handle:
+                # Copy-on-write so surfaces built on the mapping stay writable.
+                return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError):
+            return None
+
+    def prune(self, stale_prefix, keep_prefix):
+        try:
+            for existing in os.listdir(self.directory):
+                if existing.startswith(stale_prefix) and not existing.startswith(keep_prefix):
+                    os.remove(self.path(existing))
+        except OSError:
+            pass
+
+    def write_file(self, name, data):
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = self.path(name + ".tmp")
+            with open(temp_path, "wb") as handle:
+                handle.write(data)
+            os.replace(temp_path, self.path(name))
+        except OSError:
+            pass
+
+    def sound_name(self, path, source, mixer_format):
+        base = os.path.basename(path)
+        return f"sound-{base}-{self.digest(source, mixer_format)}.pcm", f"sound-{base}-"
+
+    def load_sound(self, path):
+        try:
+            with open(path, "rb") as handle:
+                source = handle.read()
+        except OSError:
+            return None, None
+        name, prefix = self.sound_name(path, source, pygame.mixer.get_init())
+        pcm = self.map_file(name)
+        if pcm is not None:
+            # The mixer copies the samples, so the mapping is only needed while building the Sound.
+            try:
+                return pygame.mixer.Sound(buffer=pcm), None
+            finally:
+                pcm.close()
+        return None, (name, prefix)
+
+    def store_sound(self, entry, sound):
+        name, prefix = entry
+        self.write_file(name, sound.get_raw())
+        self.prune(prefix, name)
+
+    def atlas_key(self):
+        with open(__file__, "rb") as handle:
+            source = handle.read()
+        return self.digest(source, pygame.version.ver)
+
+    def load_atlas(self, atlas, key):
+        index = self.map_file(f"atlas-{key}.json")
+        pixels = self.map_file(f"atlas-{key}.rgba")
+        if index is None or pixels is None:
+            return False
+        try:
+            meta = json.loads(bytes(index))
+            surface = pygame.image.frombuffer(pixels, tuple(meta['size']), 'RGBA')
+        except (ValueError, KeyError, pygame.error):
+            return False
+
+        atlas.backing = pixels
+        atlas.surface = surface
+        atlas.reset_dirty()
+        atlas.shelf_x, atlas.shelf_y, atlas.shelf_height = meta['shelf']
+        atlas.regions = {as_tuple(region_key): pygame.Rect(rect) for region_key, rect in meta['regions']}
+        return True
+
+    def store_atlas(self, atlas, key):
+        meta = {
+            'size': atlas.surface.get_size(),
+            'shelf': [atlas.shelf_x, atlas.shelf_y, atlas.shelf_height],
+            'regions': [[region_key, list(rect)] for region_key, rect in atlas.regions.items()],
+        }
+        self.write_file(f"atlas-{key}.rgba", pygame.image.tobytes(atlas.surface, 'RGBA'))
+        self.write_file(f"atlas-{key}.json", json.dumps(meta).encode())
+        self.prune("atlas-", f"atlas-{key}.")
+
+
+asset_cache = AssetCache()
+
+
+class SoundBank:
+    def __init__(self, directory="."):
+        self.directory = directory
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.muted = False
+        self.mixer_failed = False
+        self.silence = None
+        self.loader = None
+
+    def mixer_ready(self):
+        if self.muted or self.mixer_failed:
+            return False
+        if not pygame.mixer.get_init():
+            with self.lock:
+                if not pygame.mixer.get_init() and not self.mixer_failed:
+                    try:
+                        pygame.mixer.init()
+                    except pygame.error:
+                        self.mixer_failed = True
+        return not self.mixer_failed
+
+    def get_silence(self):
+        if self.silence is None:
+            # A few milliseconds of silence in the mixer's own format is enough to stand in.
+            frequency, size, channels = pygame.mixer.get_init()
+            self.silence = pygame.mixer.Sound(buffer=bytes(64 * channels * abs(size) // 8))
+        return self.silence
+
+    def decode(self, filename):
+        path = os.path.join(self.directory, filename)
+        sound, entry = asset_cache.load_sound(path)
+        if sound is not None:
+            return sound
+        try:
+            sound = pygame.mixer.Sound(path)
+        except FileNotFoundError:
+            return self.get_silence()
+        if entry is not None:
+            asset_cache.store_sound(entry, sound)
+        return sound
+
+    def get(self, filename):
+        sound = self.cache.get(filename)
+        if sound is not None:
+            return sound
+        if not self.mixer_ready():
+            return None
+        with self.lock:
+            sound = self.cache.get(filename)
+            if sound is None:
+                sound = self.decode(filename)
+                self.cache[filename] = sound
+        return sound
+
+    def preload(self, filenames, progress=None, background=True):
+        filenames = list(dict.fromkeys(filenames))
+
+        def load_all():
+            for index, filename in enumerate(filenames):
+                self.get(filename)
+                if progress:
+                    progress(index + 1, len(filenames), filename)
+
+        if not background:
+            load_all()
+            return None
+        # Bring the mixer up here on the main thread; the loader only decodes.
+        self.mixer_ready()
+        self.loader = threading.Thread(target=load_all, name="asset-loader", daemon=True)
+        self.loader.start()
+        return self.loader
+
+
+sounds = SoundBank()
+
+
+class LazySound:
+    def __init__(self, filename, bank=sounds):
+        self.filename = filename
+        self.bank = bank
+
+    def play(self, *args, **kwargs):
+        sound = self.bank.get(self.filename)
+        if sound is not None:
+            return sound.play(*args, **kwargs)
+        return None
+
+
+player_attack_sound = LazySound("player_attack.wav")
+player_dash_sound = LazySound("player_dash.wav")
+hit_sound = LazySound("hit.wav")
+game_over_sound = LazySound("game_over.wav")
+victory_sound = LazySound("victory.wav")
+phase_change_sound = LazySound("phase_change.wav")
+boss_attack_sound = LazySound("boss_attack.wav")
+boss_dash_sound = LazySound("boss_dash.wav")
+projectile_sound = LazySound("projectile.wav")
+hazard_sound = LazySound("hazard.wav")
+laser_sound = LazySound("hazard.wav")
+
+SOUND_FILES = [sound.filename for sound in (
+    player_attack_sound, player_dash_sound, hit_sound, game_over_sound, victory_sound,
+    phase_change_sound, boss_attack_sound, boss_dash_sound, projectile_sound,
+    hazard_sound, laser_sound,
+)]
+
+QUALITY_LEVELS = [
+    {'emission': 1.0, 'max_particles': None, 'portal_rings': 3, 'portal_spokes': 8, 'alpha_effects': True,
+     'render_scale': 1.0},
+    {'emission': 0.6, 'max_particles': 150, 'portal_rings': 3, 'portal_spokes': 8, 'alpha_effects': True,
+     'render_scale': 1.0},
+    {'emission': 0.35, 'max_particles': 60, 'portal_rings': 2, 'portal_spokes': 4, 'alpha_effects': False,
+     'render_scale': 0.75},
+    {'emission': 0.15, 'max_particles': 25, 'portal_rings': 1, 'portal_spokes': 0, 'alpha_effects': False,
+     'render_scale': 0.5},
+]
+
+
+class QualityGovernor:
+    def __init__(self, budget=FRAME_BUDGET, levels=QUALITY_LEVELS, smoothing=0.1,
+                 settle_frames=30, recover_frames=120, headroom=0.6):
+        self.budget = budget
+        self.levels = levels
+        self.smoothing = smoothing
+        self.settle_frames = settle_frames
+        self.recover_frames = recover_frames
+        self.headroom = headroom
+        self.enabled = False
+        self.level = 0
+        self.frame_time = budget
+        self.frames_since_change = 0
+        self.fast_frames = 0
+        # Every system that has emitted, so the particle cap covers all of them together.
+        self.systems = weakref.WeakSet()
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    @property
+    def emission(self):
+        return self.settings['emission']
+
+    @property
+    def max_particles(self):
+        return self.settings['max_particles']
+
+    @property
+    def portal_rings(self):
+        return self.settings['portal_rings']
+
+    @property
+    def portal_spokes(self):
+        return self.settings['portal_spokes']
+
+    @property
+    def alpha_effects(self):
+        return self.settings['alpha_effects']
+
+    @property
+    def render_scale(self):
+        return self.settings['render_scale']
+
+    def scale_count(self, count, carry=0.0):
+        emission = self.emission
+        if emission >= 1.0:
+            return count, carry
+        # The caller keeps the fractional part so its single-particle bursts still thin
+        # out evenly, without other emitters borrowing from it.
+        carry += count * emission
+        scaled = int(carry)
+        return scaled, carry - scaled
+
+    def live_particles(self):
+        return sum(len(system.particles) for system in self.systems)
+
+    def set_level(self, level):
+        level = max(0, min(len(self.levels) - 1, level))
+        if level != self.level:
+            self.level = level
+            self.frames_since_change = 0
+            self.fast_frames = 0
+
+    def record_frame(self, frame_time):
+        if not self.enabled:
+            return self.level
+
+        self.frame_time += (frame_time - self.frame_time) * self.smoothing
+        self.frames_since_change += 1
+
+        if frame_time < self.budget * self.headroom:
+            self.fast_frames += 1
+        else:
+            self.fast_frames = 0
 
-font_small = pygame.font.Font(None, 24)
-font_medium = pygame.font.Font(None, 32)
-font_large = pygame.font.Font(None, 48)
-
-try:
-    player_attack_sound = pygame.mixer.Sound("player_attack.wav")
-    player_dash_sound = pygame.mixer.Sound("player_dash.wav")
-    hit_sound = pygame.mixer.Sound("hit.wav")
-    game_over_sound = pygame.mixer.Sound("game_over.wav")
-    victory_sound = pygame.mixer.Sound("victory.wav")
-    phase_change_sound = pygame.mixer.Sound("phase_change.wav")
-    boss_attack_sound = pygame.mixer.Sound("boss_attack.wav")
-    boss_dash_sound = pygame.mixer.Sound("boss_dash.wav")
-    projectile_sound = pygame.mixer.Sound("projectile.wav")
-    hazard_sound = pygame.mixer.Sound("hazard.wav")
-    laser_sound = pygame.mixer.Sound("hazard.wav")  
-except FileNotFoundError:
-    dummy_array = np.zeros((44100, 2), dtype=np.int16)
-    dummy_sound = pygame.mixer.Sound(pygame.sndarray.make_sound(dummy_array))
-    player_attack_sound = dummy_sound
-    player_dash_sound = dummy_sound
-    hit_sound = dummy_sound
-    game_over_sound = dummy_sound
-    victory_sound = dummy_sound
-    phase_change_sound = dummy_sound
-    boss_attack_sound = dummy_sound
-    boss_dash_sound = dummy_sound
-    projectile_sound = dummy_sound
-    hazard_sound = dummy_sound
-    laser_sound = dummy_sound
+        if self.frames_since_change >= self.settle_frames and self.frame_time > self.budget:
+            self.set_level(self.level + 1)
+        elif self.fast_frames >= self.recover_frames and self.frame_time < self.budget * self.headroom:
+            self.set_level(self.level - 1)
+        return self.level
+
+    def stats(self):
+        return {
+            'level': self.level,
+            'frame_time': self.frame_time,
+            'budget': self.budget,
+            **self.settings,
+        }
+
+
+quality = QualityGovernor()
+
+ALPHA_LEVELS = 16
+ATLAS_PADDING = 1
+ATLAS_DIRTY_LOG = 256
+TEXT_CACHE_SIZE = 64
+
+
+def text_key(font, text, color):
+    return ('text', font.name, font.size_px, text, color)
+
+
+PORTAL_RADIUS = 50
+
+
+class SpriteAtlas:
+    def __init__(self, width=512, height=256):
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.regions = {}
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+        self.backing = None
+        # Bumped whenever pixels change. The dirty log lists (revision, rect) for each
+        # newly painted region since dirty_base, so backends can refresh only those.
+        self.revision = 0
+        self.dirty = []
+        self.dirty_base = 0
+
+    def mark_dirty(self, rect):
+        self.revision += 1
+        self.dirty.append((self.revision, rect))
+        if len(self.dirty) > ATLAS_DIRTY_LOG:
+            self.dirty_base = self.dirty.pop(0)[0]
+
+    def reset_dirty(self):
+        self.revision += 1
+        self.dirty = []
+        self.dirty_base = self.revision
+
+    def _grow(self):
+        width, height = self.surface.get_size()
+        grown = pygame.Surface((width, height * 2), pygame.SRCALPHA)
+        grown.blit(self.surface, (0, 0))
+        self.surface = grown
+        # Existing pixels keep their place, so nothing is dirty; only the size changed.
+        self.revision += 1
+
+    def _allocate(self, width, height):
+        atlas_width = self.surface.get_width()
+        if self.shelf_x + width > atlas_width:
+            self.shelf_x = 0
+            self.shelf_y += self.shelf_height + ATLAS_PADDING
+            self.shelf_height = 0
+        while self.shelf_y + height > self.surface.get_height():
+            self._grow()
+
+        rect = pygame.Rect(self.shelf_x, self.shelf_y, width, height)
+        self.shelf_x += width + ATLAS_PADDING
+        self.shelf_height = max(self.shelf_height, height)
+        return rect
+
+    def add(self, key, width, height, painter):
+        rect = self.regions.get(key)
+        if rect is None:
+            rect = self._allocate(width, height)
+            painter(self.surface.subsurface(rect))
+            self.regions[key] = rect
+            self.mark_dirty(rect)
+        return rect
+
+    def knight(self, width, height, color, eye_radius, facing_right):
+        key = ('knight', width, height, color, eye_radius, facing_right)
+        rect = self.regions.get(key)
+        if rect is not None:
+            return rect
+
+        def paint(sprite):
+            sprite.fill(color)
+            eye_x = width - 10 if facing_right else 10
+            pygame.draw.circle(sprite, WHITE, (eye_x, 10), eye_radius)
+            pygame.draw.circle(sprite, BLACK, (eye_x, 10), 2)
+
+        return self.add(key, width, height, paint)
+
+    def disc(self, color, radius, level=ALPHA_LEVELS):
+        key = ('disc', color, radius, level)
+        rect = self.regions.get(key)
+        if rect is not None:
+            return rect
+
+        faded_color = tuple(int(c * level / ALPHA_LEVELS) for c in color)
+
+        def paint(sprite):
+            pygame.draw.circle(sprite, faded_color, (radius, radius), radius)
+
+        return self.add(key, radius * 2, radius * 2, paint)
+
+    def portal(self, timer, rings=3, spokes=8):
+        key = ('portal', timer, rings, spokes)
+        rect = self.regions.get(key)
+        if rect is not None:
+            return rect
+
+        def paint(sprite):
+            for i in range(rings):
+                color_value = max(0, min(255, 128 + int(math.sin(timer * 0.1 + i) * 127)))
+                color = (color_value, 0, color_value, 150)
+
+                thickness = 3 - i
+                pygame.draw.circle(
+                    sprite,
+                    color,
+                    (PORTAL_RADIUS, PORTAL_RADIUS),
+                    PORTAL_RADIUS - i * 10,
+                    thickness
+                )
+
+            for i in range(spokes):
+                angle = timer * 0.05 + i * math.pi * 2 / spokes
+                length = PORTAL_RADIUS * 0.7
+                start_x = PORTAL_RADIUS + math.cos(angle) * 15
+                start_y = PORTAL_RADIUS + math.sin(angle) * 15
+                end_x = PORTAL_RADIUS + math.cos(angle) * length
+                end_y = PORTAL_RADIUS + math.sin(angle) * length
+
+                pygame.draw.line(
+                    sprite,
+                    (200, 0, 200, 150),
+                    (start_x, start_y),
+                    (end_x, end_y),
+                    2
+                )
+
+        return self.add(key, PORTAL_RADIUS * 2, PORTAL_RADIUS * 2, paint)
+
+    def text(self, font, text, color):
+        key = text_key(font, text, color)
+        rect = self.regions.get(key)
+        if rect is not None:
+            return rect
+
+        rendered = font.render(text, True, color)
+
+        def paint(sprite):
+            sprite.blit(rendered, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+
+        return self.add(key, rendered.get_width(), rendered.get_height(), paint)
+
+    def bake_portal(self, duration, rings=3, spokes=8):
+        for timer in range(duration + 1):
+            self.portal(timer, rings, spokes)
+
+    def bake(self):
+        for facing_right in (True, False):
+            for color in (GREEN, RED):
+                self.knight(30, 40, color, 4, facing_right)
+            for color in (PURPLE, RED):
+                self.knight(40, 50, color, 5, facing_right)
+
+        particle_colors = [RED, BLUE, GREEN, PURPLE, CYAN, (100, 200, 255),
+                           (150, 150, 150), (255, 100, 0), (0, 180, 0)]
+        for color in particle_colors:
+            for radius in range(1, 9):
+                for level in range(ALPHA_LEVELS + 1):
+                    self.disc(color, radius, level)
+        for radius in (5, 6, 8, 10):
+            self.disc(PURPLE, radius)
+            self.disc(CYAN, radius)
+
+        self.bake_portal(60)
+
+        for font, text, color in STATIC_TEXT:
+            self.text(font, text, color)
+
+    def load_or_bake(self, cache):
+        key = cache.atlas_key()
+        if cache.load_atlas(self, key):
+            return True
+        self.bake()
+        cache.store_atlas(self, key)
+        return False
+
+
+CONTROLS_TEXT = "Move: Arrow Keys | Attack: Z | Block: X | Dash: C | Jump: Space"
+DASH_WARNING_TEXT = "Press C to dash through lasers!"
+RESTART_TEXT = "Press R to restart"
+
+STATIC_TEXT = [
+    (font_large, "GAME OVER", RED),
+    (font_large, "VICTORY!", GREEN),
+    (font_medium, RESTART_TEXT, WHITE),
+    (font_medium, DASH_WARNING_TEXT, YELLOW),
+    (font_small, CONTROLS_TEXT, LIGHT_GRAY),
+]
+
+atlas = SpriteAtlas()
+
+
+class TextSprite:
+    # One rendered string as its own sprite source. Its pixels never change.
+    revision = 0
+
+    def __init__(self, surface):
+        self.surface = surface
+        self.area = surface.get_rect()
+
+
+class TextCache:
+    # Strings that change mid-fight (health readouts, phase and adaptation messages)
+    # live here in a bounded LRU instead of the atlas, so they never grow or dirty it.
+    def __init__(self, capacity=TEXT_CACHE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def get(self, font, text, color):
+        key = text_key(font, text, color)
+        sprite = self.entries.get(key)
+        if sprite is not None:
+            self.entries.move_to_end(key)
+            return sprite
+        sprite = self.entries[key] = TextSprite(font.render(text, True, color))
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return sprite
+
+
+text_cache = TextCache()
+
+
+def draw_text(commands, font, text, color, position, center_x=False, layer=HUD):
+    # Only STATIC_TEXT is baked into the atlas; anything else goes through the text cache.
+    source = atlas
+    area = atlas.regions.get(text_key(font, text, color))
+    if area is None:
+        source = text_cache.get(font, text, color)
+        area = source.area
+    x, y = position
+    if center_x:
+        x -= area.width // 2
+    # Empty strings render zero-width, which a texture cannot be made from.
+    if area.width:
+        commands.sprite(layer, source, area, (x, y))
+    return area
 
 class ParticleSystem:
     def __init__(self):
         self.particles = []
+        self.emission_carry = 0.0
+        # Conservative world bounds of every live particle, grown by the fastest speed each
+        # update, so a whole system can be culled without touching its particles.
+        self.bounds = None
+        self.spread = 0.0
     
     def add_particles(self, x, y, color, count=5, speed=2, size_range=(2, 5), lifetime_range=(30, 60)):
+        count, self.emission_carry = quality.scale_count(count, self.emission_carry)
+        max_particles = quality.max_particles
+        if max_particles is not None:
+            count = min(count, max_particles - quality.live_particles())
+        if count <= 0:
+            return
+        quality.systems.add(self)
+
+        reach = size_range[1] + 1
+        if self.bounds is None:
+            self.bounds = (x - reach, y - reach, x + reach, y + reach)
+        else:
+            left, top, right, bottom = self.bounds
+            self.bounds = (min(left, x - reach), min(top, y - reach), max(right, x + reach), max(bottom, y + reach))
+        self.spread = max(self.spread, speed)
+
         for _ in range(count):
             angle = random.uniform(0, math.pi * 2)
             speed_val = random.uniform(1, speed)
@@ -84,31 +764,114 @@ class ParticleSystem:
                 'max_lifetime': lifetime
             })
     
-    def update(self):
+    def update(self, dt=1):
         self.particles = [particle for particle in self.particles if particle['lifetime'] > 0]
+        if not self.particles:
+            self.bounds = None
+            self.spread = 0.0
+            return
+        left, top, right, bottom = self.bounds
+        grow = self.spread * dt
+        self.bounds = (left - grow, top - grow, right + grow, bottom + grow)
         
         for particle in self.particles:
-            particle['x'] += particle['vx']
-            particle['y'] += particle['vy']
-            particle['lifetime'] -= 1
+            particle['x'] += particle['vx'] * dt
+            particle['y'] += particle['vy'] * dt
+            particle['lifetime'] -= dt
     
-    def draw(self, surface):
-        for particle in self.particles:
-            alpha = particle['lifetime'] / particle['max_lifetime']
-            color = particle['color']
-            if len(color) == 3:
-                faded_color = tuple(int(c * alpha) for c in color)
-            else:
-                faded_color = tuple(int(c * alpha) for c in color[:3])
-                
-            pygame.draw.circle(
-                surface, 
-                faded_color,
-                (int(particle['x']), int(particle['y'])), 
-                particle['size']
-            )
+    def view(self):
+        if not self.particles:
+            return None
+        return ParticleView(self.bounds, tuple(
+            (int(particle['x']), int(particle['y']), particle['size'], tuple(particle['color'][:3]),
+             max(0, int(particle['lifetime'] * ALPHA_LEVELS / particle['max_lifetime'] + 0.5)))
+            for particle in self.particles
+        ))
+
+
+class ParticleView(namedtuple('ParticleView', ['bounds', 'particles'])):
+    __slots__ = ()
+
+    def draw(self, commands, offset=(0, 0)):
+        offset_x, offset_y = offset
+        view_width, view_height = commands.size
+        left, top, right, bottom = self.bounds
+        left -= offset_x
+        right -= offset_x
+        top -= offset_y
+        bottom -= offset_y
+        if left >= view_width or top >= view_height or right < 0 or bottom < 0:
+            return
+        inside = left >= 0 and top >= 0 and right < view_width and bottom < view_height
+        sprites = []
+        for x, y, size, color, level in self.particles:
+            x = x - size - offset_x
+            y = y - size - offset_y
+            if not inside and (x >= view_width or y >= view_height or x + 2 * size < 0 or y + 2 * size < 0):
+                continue
+            sprites.append((atlas.disc(color, size, level), (x, y)))
+
+        commands.sprites(EFFECTS, atlas, sprites)
+
+
+def draw_particles(commands, view, offset=(0, 0)):
+    if view is not None:
+        view.draw(commands, offset)
+
+def sweep_time(rect, dx, dy, target):
+    # Slab test of rect moving by (dx, dy) against a static target; edge contact is
+    # not a hit, matching colliderect.
+    if rect.colliderect(target):
+        return 0.0
+    enter, leave = 0.0, 1.0
+    for start, size, delta, target_start, target_size in (
+        (rect.x, rect.width, dx, target.x, target.width),
+        (rect.y, rect.height, dy, target.y, target.height),
+    ):
+        if delta == 0:
+            if start >= target_start + target_size or target_start >= start + size:
+                return None
+            continue
+        near = (target_start - (start + size)) / delta
+        far = (target_start + target_size - start) / delta
+        if near > far:
+            near, far = far, near
+        enter = max(enter, near)
+        leave = min(leave, far)
+        if enter >= leave:
+            return None
+    return enter
+
+
+def swept_collision(rect, motion, target, target_motion):
+    # Both rects are end-of-step positions; test their relative motion over the step.
+    start = rect.move(-round(motion[0]), -round(motion[1]))
+    target_start = target.move(-round(target_motion[0]), -round(target_motion[1]))
+    return sweep_time(start, motion[0] - target_motion[0], motion[1] - target_motion[1], target_start)
+
+
+class ActorView:
+    # Plain per-tick draw state. Views hold no references into the simulation, so the
+    # render thread can draw and interpolate them while the next tick runs.
+    __slots__ = ()
+
+    def moved(self, dx, dy):
+        return self._replace(x=self.x + dx, y=self.y + dy)
+
+
+class ProjectileView(ActorView, namedtuple('ProjectileView', ['key', 'x', 'y', 'size', 'color', 'particles'])):
+    __slots__ = ()
+
+    def draw(self, commands, offset=(0, 0)):
+        area = atlas.disc(self.color, self.size)
+        commands.sprite(EFFECTS, atlas, area, (int(self.x) - self.size - offset[0], int(self.y) - self.size - offset[1]))
+
+        draw_particles(commands, self.particles, offset)
+
 
 class Projectile:
+    layer = 'projectiles'
+
     def __init__(self, x, y, target_x, target_y, speed, size, color, damage, homing=False, lifetime=180):
         self.x = x
         self.y = y
@@ -126,25 +889,28 @@ class Projectile:
         self.homing = homing
         self.homing_strength = 0.08  
         self.particles = ParticleSystem()
+        self.prev_x = x
+        self.prev_y = y
     
-    def update(self, player=None):
-        self.x += self.vx
-        self.y += self.vy
+    def update(self, player=None, arena=None, dt=1):
+        self.prev_x, self.prev_y = self.x, self.y
+        self.x += self.vx * dt
+        self.y += self.vy * dt
         
         if self.homing and player:
             dx = player.x + player.width/2 - self.x
             dy = player.y + player.height/2 - self.y
             distance = max(1, math.sqrt(dx*dx + dy*dy))
             
-            self.vx += (dx / distance) * self.homing_strength
-            self.vy += (dy / distance) * self.homing_strength
+            self.vx += (dx / distance) * self.homing_strength * dt
+            self.vy += (dy / distance) * self.homing_strength * dt
             
             velocity_magnitude = math.sqrt(self.vx*self.vx + self.vy*self.vy)
             if velocity_magnitude > 0:
                 self.vx = self.vx / velocity_magnitude * 5  
                 self.vy = self.vy / velocity_magnitude * 5
         
-        self.lifetime -= 1
+        self.lifetime -= dt
         
         if random.random() < 0.3:
             self.particles.add_particles(
@@ -156,22 +922,48 @@ class Projectile:
                 lifetime_range=(10, 20)
             )
             
-        self.particles.update()
+        self.particles.update(dt)
         
+        width = arena.width if arena is not None else SCREEN_WIDTH
+        height = arena.height if arena is not None else SCREEN_HEIGHT
         return (self.lifetime <= 0 or 
-                self.x < -50 or self.x > SCREEN_WIDTH + 50 or 
-                self.y < -50 or self.y > SCREEN_HEIGHT + 50)
+                self.x < -50 or self.x > width + 50 or 
+                self.y < -50 or self.y > height + 50)
     
-    def draw(self, surface):
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.size)
-        
-        self.particles.draw(surface)
+    def view(self):
+        return ProjectileView(id(self), self.x, self.y, self.size, tuple(self.color[:3]), self.particles.view())
     
     def get_rect(self):
         return pygame.Rect(self.x - self.size, self.y - self.size, self.size * 2, self.size * 2)
 
+    def bounds(self):
+        size = self.size + 8
+        return (self.x - size, self.y - size, 2 * size, 2 * size)
+    
+    def motion(self):
+        return self.x - self.prev_x, self.y - self.prev_y
+
+class HazardView(ActorView, namedtuple('HazardView', ['key', 'x', 'y', 'width', 'height', 'color', 'alpha',
+                                                      'particles'])):
+    __slots__ = ()
+
+    def draw(self, commands, offset=(0, 0)):
+        x = self.x - offset[0]
+        y = self.y - offset[1]
+        if quality.alpha_effects:
+            commands.rect(EFFECTS, (*self.color, int(255 * self.alpha)), (x, y, self.width, self.height))
+
+        commands.rect(EFFECTS, self.color, (x, y, self.width, self.height), 2)
+
+        draw_particles(commands, self.particles, offset)
+
+
 class ArenaHazard:
-    def __init__(self, x, y, width, height, hazard_type, damage, lifetime=120, warning_time=60):
+    layer = 'hazards'
+    lifetime = Countdown()
+
+    def __init__(self, x, y, width, height, hazard_type, damage, lifetime=120, warning_time=60, timers=None):
+        self.timers = timers if timers is not None else TimerWheel()
         self.x = x
         self.y = y
         self.width = width
@@ -182,7 +974,10 @@ class ArenaHazard:
         self.max_lifetime = lifetime
         self.warning_time = warning_time
         self.active = False
+        self.timers.schedule(warning_time, self.activate)
         self.particles = ParticleSystem()
+        self.prev_x = x
+        self.prev_y = y
         
         self.colors = {
             'spike': (150, 150, 150),  
@@ -196,22 +991,21 @@ class ArenaHazard:
         self.vel_x = 0
         self.vel_y = 0
     
-    def update(self):
-        self.lifetime -= 1
-        
-        if self.lifetime <= self.max_lifetime - self.warning_time and not self.active:
-            self.active = True
-            hazard_sound.play()
-        
+    def activate(self):
+        self.active = True
+        hazard_sound.play()
+    
+    def update(self, arena, dt=1):
+        self.prev_x, self.prev_y = self.x, self.y
         
         if self.moving and self.active:
-            self.x += self.vel_x
-            self.y += self.vel_y
+            self.x += self.vel_x * dt
+            self.y += self.vel_y * dt
             
             
-            if self.x <= 0 or self.x + self.width >= SCREEN_WIDTH:
+            if self.x <= 0 or self.x + self.width >= arena.width:
                 self.vel_x *= -1
-            if self.y <= 0 or self.y + self.height >= SCREEN_HEIGHT - 100:
+            if self.y <= 0 or self.y + self.height >= arena.floor:
                 self.vel_y *= -1
         
         if self.active and random.random() < 0.2:
@@ -225,11 +1019,11 @@ class ArenaHazard:
                 lifetime_range=(10, 30)
             )
         
-        self.particles.update()
+        self.particles.update(dt)
         
         return self.lifetime <= 0
     
-    def draw(self, surface):
+    def view(self):
         if not self.active:
             if (self.max_lifetime - self.lifetime) % 10 < 5:
                 alpha = 0.8
@@ -239,22 +1033,49 @@ class ArenaHazard:
         else:
             alpha = 0.7
             color = self.colors[self.type]
-        
-        hazard_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        hazard_color = (*color, int(255 * alpha))
-        pygame.draw.rect(hazard_surface, hazard_color, (0, 0, self.width, self.height))
-        
-        surface.blit(hazard_surface, (self.x, self.y))
-        
-        pygame.draw.rect(surface, color, (self.x, self.y, self.width, self.height), 2)
-        
-        self.particles.draw(surface)
+        return HazardView(id(self), self.x, self.y, self.width, self.height, color, alpha, self.particles.view())
     
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.width, self.height)
+    
+    def bounds(self):
+        return (self.x, self.y, self.width, self.height)
+    
+    def motion(self):
+        return self.x - self.prev_x, self.y - self.prev_y
+
+class LaserView(ActorView, namedtuple('LaserView', ['key', 'x', 'y', 'width', 'height', 'warning_alpha', 'particles'])):
+    __slots__ = ()
+
+    def draw(self, commands, offset=(0, 0)):
+        x = self.x - offset[0]
+        y = self.y - offset[1]
+        if self.warning_alpha is not None:
+            
+            if quality.alpha_effects:
+                commands.rect(EFFECTS, (255, 0, 0, int(255 * self.warning_alpha)), (x, y, self.width, self.height))
+            
+            
+            commands.rect(EFFECTS, (255, 0, 0), (x, y, self.width, self.height), 1)
+        else:
+            
+            if quality.alpha_effects:
+                commands.rect(EFFECTS, (255, 0, 0, 150), (x, y, self.width, self.height))
+            
+            
+            commands.line(EFFECTS, (255, 200, 200), 
+                          (x + self.width//2, y), 
+                          (x + self.width//2, y + self.height), 3)
+
+        draw_particles(commands, self.particles, offset)
+
 
 class Laser:
-    def __init__(self, x, y, speed, damage, lifetime=180, warning_time=60):
+    layer = 'lasers'
+    lifetime = Countdown()
+
+    def __init__(self, x, y, speed, damage, lifetime=180, warning_time=60, timers=None, arena=None):
+        self.timers = timers if timers is not None else TimerWheel()
         self.x = x
         self.y = y
         self.speed = speed
@@ -263,25 +1084,28 @@ class Laser:
         self.max_lifetime = lifetime
         self.warning_time = warning_time
         self.active = False
+        self.timers.schedule(warning_time, self.activate)
         self.particles = ParticleSystem()
+        self.prev_x = x
+        self.prev_y = y
         self.warning_shown = False  
         
        
         self.width = 10
-        self.height = SCREEN_HEIGHT - 100
+        # The beam reaches from its top down to the floor.
+        self.height = (arena.floor if arena is not None else SCREEN_HEIGHT - 100) - y
     
-    def update(self):
-        self.lifetime -= 1
-        
-        if self.lifetime <= self.max_lifetime - self.warning_time and not self.active:
-            self.active = True
-            self.warning_shown = True  
-            laser_sound.play()
-        
+    def activate(self):
+        self.active = True
+        self.warning_shown = True  
+        laser_sound.play()
+    
+    def update(self, arena=None, dt=1):
+        self.prev_x, self.prev_y = self.x, self.y
         
         if self.active:
-            self.x += self.speed
-            if self.x < 0 or self.x + self.width > SCREEN_WIDTH:
+            self.x += self.speed * dt
+            if self.x < 0 or self.x + self.width > (arena.width if arena is not None else SCREEN_WIDTH):
                 self.speed *= -1
         
         
@@ -298,46 +1122,313 @@ class Laser:
                 lifetime_range=(5, 15)
             )
         
-        self.particles.update()
+        self.particles.update(dt)
         
         return self.lifetime <= 0
     
-    def draw(self, surface):
-        if not self.active:
-            
-            if (self.max_lifetime - self.lifetime) % 10 < 5:
-                alpha = 0.4
-            else:
-                alpha = 0.1
+    def view(self):
+        if self.active:
+            alpha = None
+        elif (self.max_lifetime - self.lifetime) % 10 < 5:
+            alpha = 0.4
+        else:
+            alpha = 0.1
+        return LaserView(id(self), self.x, self.y, self.width, self.height, alpha, self.particles.view())
+    
+    def get_rect(self):
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+    
+    def bounds(self):
+        return (self.x - 8, self.y, self.width + 16, self.height)
+    
+    def motion(self):
+        return self.x - self.prev_x, self.y - self.prev_y
+
+def sample_outside(low, high, blocked=None):
+    segments = [(low, high)]
+    if blocked is not None:
+        segments = [(low, min(high, blocked[0] - 1)), (max(low, blocked[1] + 1), high)]
+    segments = [(start, stop) for start, stop in segments if start <= stop]
+    total = sum(stop - start + 1 for start, stop in segments)
+    if total == 0:
+        return None
+
+    pick = random.randint(0, total - 1)
+    for start, stop in segments:
+        span = stop - start + 1
+        if pick < span:
+            return start + pick
+        pick -= span
+    return None
+
+
+DANGER_CELL = 20
+DANGER_HORIZON = 90
+
+
+class DangerField:
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT - 100, cell=DANGER_CELL, horizon=DANGER_HORIZON):
+        self.width = width
+        self.height = height
+        self.cell = cell
+        self.horizon = horizon
+        self.cols = math.ceil(width / cell)
+        self.rows = math.ceil(height / cell)
+        # The hazard layer holds the absolute tick each hazard turns active, so a
+        # warning hazard's stamp stays valid while the clock advances underneath it.
+        self.hazard_layer = np.full((self.rows, self.cols), np.inf)
+        self.hazards = {}
+        # Moving threats are counted per cell per absolute tick, in a ring of slots
+        # (tick % span) stored cell-major, so one cell's ring is contiguous. Stamps
+        # cover two horizons from when they were made, so a threat that keeps to its
+        # predicted path is only re-stamped once a horizon. Counts, unlike a min
+        # layer, let a removed threat be subtracted exactly.
+        self.span = 2 * horizon
+        self.occupancy = np.zeros((self.rows * self.cols, self.span), dtype=np.uint8)
+        # Earliest occupied tick per cell, so a query is a lookup. Cells a stamp touches,
+        # or whose earliest tick has passed, are marked stale and rescanned once, on
+        # their next query.
+        self.earliest = np.full(self.rows * self.cols, np.inf)
+        self.stale = np.zeros(self.rows * self.cols, dtype=bool)
+        self.stamps = {}
+        self.tick = 0
+        self.cover = np.arange(self.span)
+
+    def cell_of(self, x, y):
+        col = int(x // self.cell)
+        row = int(y // self.cell)
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return row, col
+        return None
+
+    def stamp_rect(self, layer, x, y, width, height, impact_tick):
+        col0 = max(0, int(x // self.cell))
+        col1 = min(self.cols, int(math.ceil((x + width) / self.cell)))
+        row0 = max(0, int(y // self.cell))
+        row1 = min(self.rows, int(math.ceil((y + height) / self.cell)))
+        if col0 < col1 and row0 < row1:
+            region = layer[row0:row1, col0:col1]
+            np.minimum(region, impact_tick, out=region)
+
+    def update_hazards(self, tick, hazards):
+        # Hazards only change the layer when one appears, expires or moves.
+        changed = len(hazards) != len(self.hazards)
+        if not changed:
+            for hazard in hazards:
+                entry = self.hazards.get(id(hazard))
+                if entry is None or entry[0] is not hazard or (hazard.moving and entry[1] != (hazard.x, hazard.y)):
+                    changed = True
+                    break
+        if not changed:
+            return
+        self.hazards = {id(hazard): (hazard, (hazard.x, hazard.y)) for hazard in hazards}
+        self.hazard_layer.fill(np.inf)
+        for hazard in hazards:
+            activation_tick = tick + hazard.lifetime - (hazard.max_lifetime - hazard.warning_time)
+            self.stamp_rect(self.hazard_layer, hazard.x, hazard.y, hazard.width, hazard.height, activation_tick)
+
+    def expire(self, tick):
+        passed = tick - self.tick
+        if passed >= self.span:
+            self.occupancy.fill(0)
+            self.earliest.fill(np.inf)
+            self.stale.fill(False)
+        else:
+            for past in range(self.tick, tick):
+                self.occupancy[:, past % self.span] = 0
+        self.tick = tick
+        self.stale |= self.earliest < tick
+
+    def rescan(self, index):
+        # The ring starts at the current tick's slot and wraps once.
+        ring = self.occupancy[index]
+        start = self.tick % self.span
+        hits = np.flatnonzero(ring[start:])
+        if hits.size:
+            earliest = self.tick + hits[0]
+        else:
+            hits = np.flatnonzero(ring[:start])
+            earliest = self.tick + self.span - start + hits[0] if hits.size else math.inf
+        self.earliest[index] = earliest
+        self.stale[index] = False
+        return earliest
+
+    def stamp(self, entity, key, path, seen):
+        seen.add(id(entity))
+        stamp = self.stamps.get(id(entity))
+        if stamp is not None:
+            if stamp[0] is entity and stamp[1] == key and self.tick - stamp[2] <= self.span - self.horizon:
+                return
+            self.unstamp(stamp)
+        ticks, cells = path(entity)
+        # A path never visits the same cell twice on one tick, so plain fancy indexing
+        # is safe here and much faster than ufunc.at.
+        self.occupancy[cells, ticks % self.span] += 1
+        self.stale[cells] = True
+        self.stamps[id(entity)] = (entity, key, self.tick, ticks, cells)
+
+    def unstamp(self, stamp):
+        ticks, cells = stamp[3], stamp[4]
+        # Slots for ticks already passed were cleared by expire().
+        live = ticks >= self.tick
+        cells = cells[live]
+        slots = ticks[live] % self.span
+        self.occupancy[cells, slots] -= 1
+        self.stale[cells] = True
+
+    def projectile_path(self, projectile):
+        ks = self.cover[self.cover < projectile.lifetime]
+        cols = ((projectile.x + projectile.vx * ks) // self.cell).astype(np.int64)
+        rows = ((projectile.y + projectile.vy * ks) // self.cell).astype(np.int64)
+        inside = (cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows)
+        return self.tick + ks[inside], rows[inside] * self.cols + cols[inside]
+
+    def laser_path(self, laser):
+        # Lasers hold still until active, then sweep and flip direction once they
+        # overshoot a wall. Stepping that rule matches Laser.update exactly and only
+        # runs when the laser is stamped; every column under its width is covered.
+        delay = 0 if laser.active else max(0, laser.lifetime - (laser.max_lifetime - laser.warning_time))
+        positions = []
+        x, speed = laser.x, laser.speed
+        for k in range(self.span):
+            if k and k >= delay:
+                x += speed
+                if x < 0 or x + laser.width > self.width:
+                    speed = -speed
+            positions.append(x)
+        xs = np.array(positions)
+        ks = self.cover[delay:]
+        xs = xs[delay:]
+        col0 = np.maximum(0, xs // self.cell).astype(np.int64)
+        col1 = ((xs + laser.width) // self.cell).astype(np.int64)
+        offsets = np.arange(int(laser.width // self.cell) + 2)
+        cols = col0[:, np.newaxis] + offsets
+        valid = (cols <= col1[:, np.newaxis]) & (cols < self.cols)
+        row0 = max(0, int(laser.y // self.cell))
+        row1 = min(self.rows, int(math.ceil((laser.y + laser.height) / self.cell)))
+        rows = np.arange(row0, row1)
+        cells = rows[np.newaxis, np.newaxis, :] * self.cols + cols[:, :, np.newaxis]
+        ticks = np.broadcast_to((self.tick + ks)[:, np.newaxis, np.newaxis], cells.shape)
+        mask = np.broadcast_to(valid[:, :, np.newaxis], cells.shape)
+        return ticks[mask], cells[mask]
+
+    def update(self, tick, boss):
+        self.refresh(tick, boss.hazards, boss.projectiles, boss.lasers)
+
+    def refresh(self, tick, hazards, projectiles, lasers):
+        self.expire(tick)
+        self.update_hazards(tick, hazards)
+
+        # Straight shots and sweeping lasers stay on their stamped paths; homing shots
+        # steer, so their changing velocity re-stamps them every tick.
+        seen = set()
+        for projectile in projectiles:
+            self.stamp(projectile, (projectile.vx, projectile.vy), self.projectile_path, seen)
+        for laser in lasers:
+            self.stamp(laser, (laser.speed, laser.active, laser.width, laser.height), self.laser_path, seen)
+        for key in [key for key in self.stamps if key not in seen]:
+            self.unstamp(self.stamps.pop(key))
+
+    def threats(self):
+        # What the last update saw. A field refreshed from these at the same tick answers
+        # every query the same way, so replays keep this instead of the tables.
+        stamped = [stamp[0] for stamp in self.stamps.values()]
+        return ([entry[0] for entry in self.hazards.values()],
+                [entity for entity in stamped if entity.layer == 'projectiles'],
+                [entity for entity in stamped if entity.layer == 'lasers'])
+
+    def dynamic_impact(self, row, col):
+        index = row * self.cols + col
+        impact_tick = self.rescan(index) if self.stale[index] else self.earliest[index]
+        return float(impact_tick) if impact_tick < self.tick + self.horizon else math.inf
+
+    def time_to_impact(self, x, y):
+        cell = self.cell_of(x, y)
+        if cell is None:
+            return math.inf
+        impact_tick = min(self.hazard_layer[cell], self.dynamic_impact(*cell))
+        return max(0.0, float(impact_tick - self.tick))
+
+    def hazard_covers(self, x, y, width, height):
+        for probe_x in (x, x + width / 2, x + width - 1):
+            cell = self.cell_of(probe_x, y + height / 2)
+            if cell is not None and self.hazard_layer[cell] != np.inf:
+                return True
+        return False
+
+    def is_safe(self, x, y, margin=30):
+        return self.time_to_impact(x, y) > margin
+
+
+class BossView(ActorView, namedtuple('BossView', ['key', 'x', 'y', 'width', 'height', 'visible', 'portal', 'color',
+                                                  'facing_right', 'attack', 'threats', 'particles', 'health',
+                                                  'max_health', 'phase', 'adaptation_text', 'phase_message'])):
+    __slots__ = ()
+
+    def moved(self, dx, dy):
+        attack = self.attack.move(round(dx), round(dy)) if self.attack else None
+        return self._replace(x=self.x + dx, y=self.y + dy, attack=attack)
+
+    def draw(self, commands, offset=(0, 0)):
+        offset_x, offset_y = offset
+        if not self.visible:
+          
+            if self.portal is not None:
                 
-            laser_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            color = (255, 0, 0, int(255 * alpha))  
-            pygame.draw.rect(laser_surface, color, (0, 0, self.width, self.height))
-            
-            surface.blit(laser_surface, (self.x, self.y))
-            
-            
-            pygame.draw.rect(surface, (255, 0, 0), (self.x, self.y, self.width, self.height), 1)
+                area = atlas.portal(self.portal, quality.portal_rings, quality.portal_spokes)
+                commands.sprite(
+                    ACTORS,
+                    atlas,
+                    area,
+                    (self.x + self.width // 2 - PORTAL_RADIUS - offset_x,
+                     self.y + self.height // 2 - PORTAL_RADIUS - offset_y)
+                )
         else:
+            area = atlas.knight(self.width, self.height, self.color, 5, self.facing_right)
+            commands.sprite(ACTORS, atlas, area, (int(self.x) - offset_x, int(self.y) - offset_y))
+        
+        if self.attack and self.visible:
+            commands.rect(OVERLAY, RED, self.attack.move(-offset_x, -offset_y))
             
-            laser_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            color = (255, 0, 0, 150)  
-            pygame.draw.rect(laser_surface, color, (0, 0, self.width, self.height))
+        for threat in self.threats:
+            threat.draw(commands, offset)
             
-            surface.blit(laser_surface, (self.x, self.y))
+        draw_particles(commands, self.particles, offset)
+        
+        if self.visible:
+            health_width = 50
+            health_height = 5
+            health_x = self.x - (health_width - self.width) / 2 - offset_x
+            health_y = self.y - 10 - offset_y
             
+            commands.rect(OVERLAY, DARK_GRAY, (health_x, health_y, health_width, health_height))
             
-            pygame.draw.line(surface, (255, 200, 200), 
-                            (self.x + self.width//2, self.y), 
-                            (self.x + self.width//2, self.y + self.height), 3)
+            health_percent = max(0, self.health / self.max_health)
+            commands.rect(OVERLAY, RED, (health_x, health_y, health_width * health_percent, health_height))
         
-        self.particles.draw(surface)
-    
-    def get_rect(self):
-        return pygame.Rect(self.x, self.y, self.width, self.height)
+        if self.adaptation_text is not None:
+            draw_text(commands, font_medium, self.adaptation_text, ORANGE,
+                      (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50), center_x=True)
+            
+        if self.phase_message:
+            draw_text(commands, font_medium, self.phase_message, PURPLE,
+                      (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 80), center_x=True)
+
 
 class Boss:
-    def __init__(self, x, y):
+    attack_cooldown = Countdown()
+    dash_cooldown = Countdown()
+    dash_duration = Countdown()
+    invincibility = Countdown()
+    adaptation_display_time = Countdown()
+    decision_timer = Countdown()
+    projectile_cooldown = Countdown()
+    hazard_cooldown = Countdown()
+    learning_timer = Elapsed()
+
+    def __init__(self, x, y, arena=None, timers=None):
+        self.timers = timers if timers is not None else TimerWheel()
+        self.arena = arena if arena is not None else load_arena()
         self.x = x
         self.y = y
         self.width = 40
@@ -373,10 +1464,13 @@ class Boss:
         self.current_adaptation_text = ""
         self.adaptation_display_time = 0
         self.particles = ParticleSystem()
+        self.prev_x = x
+        self.prev_y = y
         
         
         self.decision_timer = 0
         self.decision_timer_max = 30
+        self.paused_decision_timer = 0
         self.current_decision = 'idle'
         self.target_x = 0
         self.aggression = 0.5
@@ -422,8 +1516,16 @@ class Boss:
         ]
         self.current_projectile_pattern = 'single'
         self.projectile_cooldown_max = 180  
+        self.pattern_damage = {
+            'single': 10,
+            'triple': 8,
+            'circle': 6,
+            'homing': 15,
+            'hazard': 15,
+            'walls': 20,
+        }
         self.barrage_count = 0
-        self.barrage_timer = 0
+        self.barrage_timer = None
         
         
         self.hazards = []
@@ -440,9 +1542,17 @@ class Boss:
         
         
         self.lasers = []
+        
+        
+        self.policy = None
+        self.danger = None
+        self.actors = None
 
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.width, self.height)
+    
+    def motion(self):
+        return self.x - self.prev_x, self.y - self.prev_y
 
     def get_attack_rect(self):
         if not self.attacking:
@@ -454,7 +1564,7 @@ class Boss:
         attack_y = self.y + 10
         return pygame.Rect(attack_x, attack_y, attack_width, attack_height)
 
-    def take_damage(self, amount):
+    def take_damage(self, amount, source='melee'):
         if self.phase_shifting and self.phase_shift_invulnerable:
             return False
         
@@ -466,6 +1576,7 @@ class Boss:
             self.health -= clamped_damage
             self.invincibility = 40
             hit_sound.play()
+            events.emit('hit', 'boss', source, self.phase, clamped_damage, self.x, self.y)
             
             self.particles.add_particles(
                 self.x + self.width // 2,
@@ -489,6 +1600,9 @@ class Boss:
     def initiate_phase_shift(self):
         if not self.phase_shifting:
             self.phase_shifting = True
+            # The decision timer holds still through the shift and resumes where it stopped.
+            self.paused_decision_timer = self.decision_timer
+            self.decision_timer = 0
             self.phase_shift_timer = 0
             self.phase_shift_invulnerable = True
             self.phase += 1
@@ -517,24 +1631,26 @@ class Boss:
                 self.current_hazard_pattern = 'walls'
                 
             phase_change_sound.play()
+            events.emit('phase_shift', 'boss', 'none', self.phase, self.health, self.x, self.y)
             
             self.current_phase_message = f"Phase {self.phase}: {random.choice(self.phase_messages)}"
             self.adaptation_display_time = 180  
     
     def create_phase_shift_lasers(self):
        
-        self.hazards.clear()
-        self.lasers.clear()
-        self.projectiles.clear()
+        self.clear_threats(self.hazards)
+        self.clear_threats(self.lasers)
+        self.clear_threats(self.projectiles)
         
        
         num_lasers = min(4, 2 + self.phase)  
         for _ in range(num_lasers):
-            x = random.randint(50, SCREEN_WIDTH - 100)
+            x = random.randint(50, int(self.arena.width) - 100)
             speed = random.choice([-4, -3, 3, 4])  
                 
-            laser = Laser(x, 0, speed, 10, lifetime=self.phase_shift_duration, warning_time=30)
-            self.lasers.append(laser)
+            laser = Laser(x, 0, speed, 10, lifetime=self.phase_shift_duration, warning_time=30, timers=self.timers,
+                          arena=self.arena)
+            self.spawn(self.lasers, laser)
 
     def create_phase_shift_hazards(self):
        
@@ -545,6 +1661,7 @@ class Boss:
             pattern = self.current_projectile_pattern
             
         projectile_sound.play()
+        events.emit('projectile_spawn', 'boss', pattern, self.phase, len(self.projectiles), self.x, self.y)
         
         center_x = self.x + self.width / 2
         center_y = self.y + self.height / 2
@@ -552,9 +1669,9 @@ class Boss:
         player_center_y = player.y + player.height / 2
         
         if pattern == 'single':
-            self.projectiles.append(
+            self.spawn(self.projectiles,
                 Projectile(center_x, center_y, player_center_x, player_center_y, 
-                          6, 8, PURPLE, 10, homing=False)
+                          6, 8, PURPLE, self.pattern_damage['single'], homing=False)
             )
             
         elif pattern == 'triple':
@@ -564,9 +1681,9 @@ class Boss:
             for angle in angles:
                 target_x = center_x + math.cos(angle) * 300
                 target_y = center_y + math.sin(angle) * 300
-                self.projectiles.append(
+                self.spawn(self.projectiles,
                     Projectile(center_x, center_y, target_x, target_y, 
-                              5, 6, PURPLE, 8, homing=False)
+                              5, 6, PURPLE, self.pattern_damage['triple'], homing=False)
                 )
                 
         elif pattern == 'circle':
@@ -574,27 +1691,41 @@ class Boss:
                 angle = i * (math.pi * 2 / 8)
                 target_x = center_x + math.cos(angle) * 300
                 target_y = center_y + math.sin(angle) * 300
-                self.projectiles.append(
+                self.spawn(self.projectiles,
                     Projectile(center_x, center_y, target_x, target_y, 
-                              4, 5, PURPLE, 6, homing=False)
+                              4, 5, PURPLE, self.pattern_damage['circle'], homing=False)
                 )
                 
         elif pattern == 'homing':
-            self.projectiles.append(
+            self.spawn(self.projectiles,
                 Projectile(center_x, center_y, player_center_x, player_center_y, 
-                          3, 10, CYAN, 15, homing=True, lifetime=300)
+                          3, 10, CYAN, self.pattern_damage['homing'], homing=True, lifetime=300)
             )
             
         elif pattern == 'barrage':
             self.barrage_count = 3
-            self.barrage_timer = 15  
+            if self.barrage_timer is not None:
+                self.barrage_timer.cancel()
+            self.barrage_timer = self.timers.schedule(15, self.continue_barrage, player)
             self.fire_projectile(player, 'triple')
 
+    def continue_barrage(self, player):
+        self.barrage_count -= 1
+        self.fire_projectile(player, 'triple')
+        if self.barrage_count > 0:
+            self.barrage_timer = self.timers.schedule(15, self.continue_barrage, player)
+        else:
+            self.barrage_timer = None
+
+    def end_attack(self):
+        self.attacking = False
+
     def create_hazard(self, player, pattern=None):
         if pattern is None:
             pattern = self.current_hazard_pattern
             
         hazard_sound.play()
+        events.emit('hazard_spawn', 'boss', pattern, self.phase, len(self.hazards), player.x, player.y)
         
         player_center_x = player.x + player.width / 2
         player_center_y = player.y + player.height / 2
@@ -602,34 +1733,58 @@ class Boss:
         if pattern == 'random':
             hazard_type = random.choice(self.hazard_types)
             
-            while True:
-                x = random.randint(50, SCREEN_WIDTH - 150)
-                y = SCREEN_HEIGHT - 100 - random.randint(10, 60)
-                
-                if abs(x - player_center_x) > 100 or abs(y - player_center_y) > 80:
-                    break
-                    
             width = random.randint(60, 120)
             height = random.randint(20, 40)
-            
-            self.hazards.append(
-                ArenaHazard(x, y - height, width, height, hazard_type, 15)
+            zone_x, zone_y, zone_width, zone_height = random.choice(
+                self.arena.hazard_zones or [(50, 0, self.arena.width - 100, self.arena.floor)]
             )
+            y = zone_y + zone_height - random.randint(10, 60)
+            
+            low, high = int(zone_x), int(zone_x + zone_width - 100)
+            denied = [a['position'] for a in self.adaptations if a['type'] == 'area_denial']
+            if denied and random.random() < 0.5:
+                low = max(low, int(denied[-1][0]) - 60)
+                high = min(high, int(denied[-1][0]) + 60)
             
-        elif pattern == 'targeted':
+            if abs(y - player_center_y) > 80:
+                blocked = None
+            else:
+                blocked = (math.ceil(player_center_x - 100), math.floor(player_center_x + 100))
+            
+            x = sample_outside(low, high, blocked)
+            if x is None:
+                x = sample_outside(int(zone_x), int(zone_x + zone_width - 100), blocked)
+            if x is None:
+                # The zone has no room left beside the player; aim at them instead.
+                pattern = 'targeted'
+            else:
+                if self.danger is not None:
+                    for _ in range(3):
+                        if not self.danger.hazard_covers(x, y - height, width, height):
+                            break
+                        retry = sample_outside(int(zone_x), int(zone_x + zone_width - 100), blocked)
+                        if retry is None:
+                            break
+                        x = retry
+                
+                self.spawn(self.hazards,
+                    ArenaHazard(x, y - height, width, height, hazard_type, self.pattern_damage['hazard'], timers=self.timers)
+                )
+            
+        if pattern == 'targeted':
             hazard_type = random.choice(self.hazard_types)
             offset_x = random.randint(-50, 50)
             
-            x = max(0, min(SCREEN_WIDTH - 100, player_center_x - 50 + offset_x))
-            y = SCREEN_HEIGHT - 100  
+            x = max(0, min(self.arena.width - 100, player_center_x - 50 + offset_x))
+            y = self.arena.floor
             
-            self.hazards.append(
-                ArenaHazard(x, y - 40, 100, 40, hazard_type, 15)
+            self.spawn(self.hazards,
+                ArenaHazard(x, y - 40, 100, 40, hazard_type, self.pattern_damage['hazard'], timers=self.timers)
             )
             
         elif pattern == 'grid':
             hazard_type = random.choice(self.hazard_types)
-            section_width = SCREEN_WIDTH // 3
+            section_width = self.arena.width // 3
             
             for i in range(3):
                 player_section = int(player_center_x / section_width)
@@ -637,66 +1792,39 @@ class Boss:
                     continue
                     
                 x = i * section_width
-                y = SCREEN_HEIGHT - 100 
+                y = self.arena.floor
                 
-                self.hazards.append(
-                    ArenaHazard(x, y - 40, section_width, 40, hazard_type, 15)
+                self.spawn(self.hazards,
+                    ArenaHazard(x, y - 40, section_width, 40, hazard_type, self.pattern_damage['hazard'], timers=self.timers)
                 )
                 
         elif pattern == 'walls':
             hazard_type = random.choice(self.hazard_types)
             
-            if player_center_x < SCREEN_WIDTH / 2:
-                x = SCREEN_WIDTH - 80
+            if player_center_x < self.arena.width / 2:
+                x = self.arena.width - 80
                 width = 80
             else:
                 x = 0
                 width = 80
                 
-            self.hazards.append(
-                ArenaHazard(x, 0, width, SCREEN_HEIGHT - 100, hazard_type, 20, lifetime=180, warning_time=90)
+            self.spawn(self.hazards,
+                ArenaHazard(x, 0, width, self.arena.floor, hazard_type, self.pattern_damage['walls'], lifetime=180, warning_time=90,
+                            timers=self.timers)
             )
 
-    def move(self, player):
-        self.learning_timer += 1
+    def move(self, player, dt=1):
+        self.prev_x, self.prev_y = self.x, self.y
         if self.learning_timer >= self.learning_timer_max:
             self.learning_timer = 0
             self.adapt_to_player(player)
             phase_change_sound.play()
             
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
-            if self.attack_cooldown <= self.attack_cooldown_max - 5:
-                self.attacking = False
-                
-        if self.dash_cooldown > 0:
-            self.dash_cooldown -= 1
-            
-        if self.invincibility > 0:
-            self.invincibility -= 1
-            
-        if self.adaptation_display_time > 0:
-            self.adaptation_display_time -= 1
-            
-        if self.projectile_cooldown > 0:
-            self.projectile_cooldown -= 1
-            
-        if self.barrage_count > 0 and self.barrage_timer > 0:
-            self.barrage_timer -= 1
-            if self.barrage_timer <= 0:
-                self.barrage_timer = 15  
-                self.barrage_count -= 1
-                self.fire_projectile(player, 'triple')
-                
-        if self.hazard_cooldown > 0:
-            self.hazard_cooldown -= 1
-            
         if self.phase_shifting:
-            self.update_phase_shift()
+            self.update_phase_shift(dt)
             return  
         
-        self.decision_timer -= 1
-        if self.decision_timer <= 0:
+        if self.decision_due():
             self.ai_decision(player)
             self.decision_timer = self.decision_timer_max
             
@@ -710,6 +1838,7 @@ class Boss:
             if self.attack_cooldown <= 0:
                 self.attacking = True
                 self.attack_cooldown = self.attack_cooldown_max
+                self.timers.schedule(5, self.end_attack)
                 boss_attack_sound.play()
         elif self.current_decision == 'dash':
             if self.dash_cooldown <= 0:
@@ -717,6 +1846,7 @@ class Boss:
                 self.dash_cooldown = self.dash_cooldown_max
                 self.dash_direction = 1 if player.x > self.x else -1
                 boss_dash_sound.play()
+                events.emit('dash', 'boss', 'none', self.phase, self.dash_direction, self.x, self.y)
         elif self.current_decision == 'projectile':
             if self.projectile_cooldown <= 0:
                 self.fire_projectile(player)
@@ -727,7 +1857,6 @@ class Boss:
                 self.hazard_cooldown = self.hazard_cooldown_max
         
         if self.dash_duration > 0:
-            self.dash_duration -= 1
             self.vel_x = self.dash_direction * self.dash_speed
             self.vel_y = 0
             self.particles.add_particles(
@@ -740,54 +1869,80 @@ class Boss:
                 lifetime_range=(10, 20)
             )
             
-        self.x += self.vel_x
+        self.x, hit_wall = self.arena.resolve_x(self.x, self.x + self.vel_x * dt, self.width, self.y, self.y + self.height)
+        if hit_wall:
+            self.vel_x = 0
         
+        previous_y = self.y
         if not self.on_ground:
-            self.vel_y += self.gravity
-            self.y += self.vel_y
+            self.vel_y += self.gravity * dt
+            self.y += self.vel_y * dt
         
-        if self.y >= SCREEN_HEIGHT - 100 - self.height:
-            self.y = SCREEN_HEIGHT - 100 - self.height
+        ground = self.arena.landing(self.x, self.width, previous_y + self.height, self.y + self.height)
+        if ground is not None:
+            self.y = ground - self.height
             self.on_ground = True
             self.vel_y = 0
         else:
             self.on_ground = False
-            
-        if self.x < 0:
-            self.x = 0
-            self.vel_x = 0
-        elif self.x > SCREEN_WIDTH - self.width:
-            self.x = SCREEN_WIDTH - self.width
-            self.vel_x = 0
+            ceiling = self.arena.ceiling(self.x, self.width, previous_y, self.y)
+            if ceiling is not None:
+                self.y = ceiling
+                self.vel_y = 0
             
         i = 0
         while i < len(self.projectiles):
-            if self.projectiles[i].update(player):
-                self.projectiles.pop(i)
+            if self.projectiles[i].update(player, self.arena, dt):
+                self.untrack(self.projectiles.pop(i))
             else:
+                self.track(self.projectiles[i])
                 i += 1
                 
         i = 0
         while i < len(self.hazards):
-            if self.hazards[i].update():
-                self.hazards.pop(i)
+            if self.hazards[i].update(self.arena, dt):
+                self.untrack(self.hazards.pop(i))
             else:
+                self.track(self.hazards[i])
                 i += 1
                 
         i = 0
         while i < len(self.lasers):
-            if self.lasers[i].update():
-                self.lasers.pop(i)
+            if self.lasers[i].update(self.arena, dt):
+                self.untrack(self.lasers.pop(i))
             else:
+                self.track(self.lasers[i])
                 i += 1
                 
-        self.particles.update()
+        self.particles.update(dt)
         
         if self.current_decision != 'chase' and self.current_decision != 'retreat' and self.dash_duration <= 0:
-            self.vel_x *= 0.8
+            self.vel_x *= 0.8 ** dt
             if abs(self.vel_x) < 0.1:
                 self.vel_x = 0
 
+    def track(self, entity):
+        # Threats keep their own actor-index entries current as they spawn and move.
+        if self.actors is not None:
+            self.actors.update(entity, entity.bounds(), entity.layer)
+
+    def untrack(self, entity):
+        if self.actors is not None:
+            self.actors.remove(entity)
+
+    def spawn(self, group, entity):
+        group.append(entity)
+        self.track(entity)
+
+    def clear_threats(self, group):
+        for entity in group:
+            self.untrack(entity)
+        group.clear()
+
+    def decision_due(self, ticks=0):
+        # Whether move() will call ai_decision within the next `ticks` ticks.
+        return not self.phase_shifting and self.decision_timer <= ticks
+
     def ai_decision(self, player):
         distance_to_player = abs(player.x - self.x)
         
@@ -797,6 +1952,11 @@ class Boss:
             if len(self.playerAttackPattern) % 5 == 0:
                 self.analyze_player_patterns()
         
+        if self.policy is not None:
+            decision = self.policy.decide(self, player)
+            if decision is not None:
+                self.current_decision = decision
+                return
         
         if self.phase >= 2 and random.random() < 0.25:  
             special_choice = random.random()
@@ -844,6 +2004,7 @@ class Boss:
                         'position': key,
                         'description': "I see your preferred attack position..."
                     })
+                    events.emit('adaptation', 'boss', 'position_preference', self.phase, count, key[0], key[1])
                     
         if len(self.playerAttackPattern) > 15:
             self.playerAttackPattern = self.playerAttackPattern[-10:]
@@ -897,140 +2058,65 @@ class Boss:
                     position_counts[bucket] = position_counts.get(bucket, 0) + 1
                     
                 most_common = max(position_counts.items(), key=lambda x: x[1])
-                
-                if most_common[1] > len(player_positions) * 0.4:  
-                    self.adaptations.append({
-                        'type': 'area_denial',
-                        'position': most_common[0],
-                        'description': "This area is no longer safe for you..."
-                    })
-                    adaptation_made = True
-        
-        if adaptation_made:
-            self.current_adaptation_text = self.adaptations[-1]['description']
-            self.adaptation_display_time = 180  
-            
-            player.attack_count = 0
-            player.dash_count = 0
-            player.block_count = 0
-
-    def draw(self, surface):
-        if not self.is_visible:
-          
-            if self.reappear_portal_active:
-                
-                portal_radius = 50
-                portal_surface = pygame.Surface((portal_radius * 2, portal_radius * 2), pygame.SRCALPHA)
-                
-                for i in range(3):
-                    color_value = max(0, min(255, 128 + int(math.sin(self.reappear_portal_timer * 0.1 + i) * 127)))
-                    color = (color_value, 0, color_value, 150)
-                    
-                    thickness = 3 - i
-                    pygame.draw.circle(
-                        portal_surface,
-                        color,
-                        (portal_radius, portal_radius),
-                        portal_radius - i * 10,
-                        thickness
-                    )
-                
-                
-                for i in range(8):
-                    angle = self.reappear_portal_timer * 0.05 + i * math.pi / 4
-                    length = portal_radius * 0.7
-                    start_x = portal_radius + math.cos(angle) * 15
-                    start_y = portal_radius + math.sin(angle) * 15
-                    end_x = portal_radius + math.cos(angle) * length
-                    end_y = portal_radius + math.sin(angle) * length
-                    
-                    pygame.draw.line(
-                        portal_surface,
-                        (200, 0, 200, 150),
-                        (start_x, start_y),
-                        (end_x, end_y),
-                        2
-                    )
-                
-                
-                surface.blit(
-                    portal_surface,
-                    (self.x + self.width // 2 - portal_radius, self.y + self.height // 2 - portal_radius)
-                )
-        else:
-            if self.invincibility > 0:
-                if self.invincibility % 6 < 3:
-                    color = RED
-                else:
-                    color = PURPLE
-            else:
-                color = PURPLE
-                
-            pygame.draw.rect(surface, color, (self.x, self.y, self.width, self.height))
-            
-            eye_y = self.y + 10
-            if self.facing_right:
-                pygame.draw.circle(surface, WHITE, (int(self.x + self.width - 10), int(eye_y)), 5)
-                pygame.draw.circle(surface, BLACK, (int(self.x + self.width - 10), int(eye_y)), 2)
-            else:
-                pygame.draw.circle(surface, WHITE, (int(self.x + 10), int(eye_y)), 5)
-                pygame.draw.circle(surface, BLACK, (int(self.x + 10), int(eye_y)), 2)
-        
-        attack_rect = self.get_attack_rect()
-        if attack_rect and self.is_visible:
-            pygame.draw.rect(surface, RED, attack_rect)
-            
-        for projectile in self.projectiles:
-            projectile.draw(surface)
-            
-        for hazard in self.hazards:
-            hazard.draw(surface)
-            
-        for laser in self.lasers:
-            laser.draw(surface)
-            
-        self.particles.draw(surface)
-        
-        if self.is_visible:
-            health_width = 50
-            health_height = 5
-            health_x = self.x - (health_width - self.width) / 2
-            health_y = self.y - 10
-            
-            pygame.draw.rect(surface, DARK_GRAY, (health_x, health_y, health_width, health_height))
-            
-            health_percent = max(0, self.health / self.max_health)
-            pygame.draw.rect(surface, RED, (health_x, health_y, health_width * health_percent, health_height))
+                
+                if most_common[1] > len(player_positions) * 0.4:  
+                    self.adaptations.append({
+                        'type': 'area_denial',
+                        'position': most_common[0],
+                        'description': "This area is no longer safe for you..."
+                    })
+                    adaptation_made = True
         
-        if self.adaptation_display_time > 0:
-            text = font_medium.render(self.current_adaptation_text, True, ORANGE)
-            text_x = SCREEN_WIDTH // 2 - text.get_width() // 2
-            text_y = SCREEN_HEIGHT // 2 - 50
-            surface.blit(text, (text_x, text_y))
+        if adaptation_made:
+            events.emit('adaptation', 'boss', self.adaptations[-1]['type'], self.phase, len(self.adaptations), player.x, player.y)
+            self.current_adaptation_text = self.adaptations[-1]['description']
+            self.adaptation_display_time = 180  
             
-        if self.current_phase_message and self.adaptation_display_time > 0:
-            text = font_medium.render(self.current_phase_message, True, PURPLE)
-            text_x = SCREEN_WIDTH // 2 - text.get_width() // 2
-            text_y = SCREEN_HEIGHT // 2 - 80
-            surface.blit(text, (text_x, text_y))
+            player.attack_count = 0
+            player.dash_count = 0
+            player.block_count = 0
+
+    def view(self, visible=None):
+        if self.invincibility > 0:
+            if self.invincibility % 6 < 3:
+                color = RED
+            else:
+                color = PURPLE
+        else:
+            color = PURPLE
+
+        if visible is None:
+            visible = (self.projectiles, self.hazards, self.lasers)
+        threats = tuple(threat.view() for group in visible for threat in group)
 
-    def update_phase_shift(self):
-        self.phase_shift_timer += 1
+        adaptation_text = self.current_adaptation_text if self.adaptation_display_time > 0 else None
+        phase_message = self.current_phase_message if adaptation_text is not None else None
+        return BossView(
+            id(self), self.x, self.y, self.width, self.height, self.is_visible,
+            self.reappear_portal_timer if self.reappear_portal_active else None,
+            color, self.facing_right, self.get_attack_rect(), threats, self.particles.view(),
+            self.health, self.max_health, self.phase, adaptation_text, phase_message,
+        )
+
+    def update_phase_shift(self, dt=1):
+        self.phase_shift_timer += dt
         
         
         i = 0
         while i < len(self.lasers):
-            if self.lasers[i].update():
-                self.lasers.pop(i)
+            if self.lasers[i].update(self.arena, dt):
+                self.untrack(self.lasers.pop(i))
             else:
+                self.track(self.lasers[i])
                 i += 1
         
        
-        if len(self.lasers) < 4 and self.phase_shift_timer % 90 == 0 and self.phase_shift_timer < self.phase_shift_duration - 120:
-            x = random.randint(50, SCREEN_WIDTH - 100)
+        crossed_spawn = (self.phase_shift_timer - dt) // 90 != self.phase_shift_timer // 90
+        if len(self.lasers) < 4 and crossed_spawn and self.phase_shift_timer < self.phase_shift_duration - 120:
+            x = random.randint(50, int(self.arena.width) - 100)
             speed = random.choice([-4, -3, 3, 4])
-            laser = Laser(x, 0, speed, 10, lifetime=120, warning_time=30)
-            self.lasers.append(laser)
+            laser = Laser(x, 0, speed, 10, lifetime=120, warning_time=30, timers=self.timers, arena=self.arena)
+            self.spawn(self.lasers, laser)
         
         
         if self.phase_shift_timer >= self.phase_shift_duration - 120 and not self.reappear_portal_active:
@@ -1039,16 +2125,18 @@ class Boss:
         
         
         if self.reappear_portal_active:
-            self.reappear_portal_timer += 1
+            self.reappear_portal_timer += dt
             if self.reappear_portal_timer >= self.reappear_portal_duration:
                 self.is_visible = True
                 self.phase_shifting = False
                 self.phase_shift_invulnerable = False
+                self.decision_timer = self.paused_decision_timer
                 
-                self.lasers.clear()
+                self.clear_threats(self.lasers)
                 
-                self.x = random.randint(100, SCREEN_WIDTH - 200)
-                self.y = SCREEN_HEIGHT - 150 - self.height
+                self.x = random.randint(100, int(self.arena.width) - 200)
+                self.y = self.arena.floor - 50 - self.height
+                self.prev_x, self.prev_y = self.x, self.y
                 
                 self.particles.add_particles(
                     self.x + self.width/2,
@@ -1060,8 +2148,63 @@ class Boss:
                     lifetime_range=(30, 60)
                 )
 
+class PlayerView(ActorView, namedtuple('PlayerView', ['key', 'x', 'y', 'width', 'height', 'visible', 'color',
+                                                      'facing_right', 'attack', 'block', 'particles', 'health',
+                                                      'max_health'])):
+    __slots__ = ()
+
+    def moved(self, dx, dy):
+        shift = round(dx), round(dy)
+        attack = self.attack.move(shift) if self.attack else None
+        block = self.block.move(shift) if self.block else None
+        return self._replace(x=self.x + dx, y=self.y + dy, attack=attack, block=block)
+
+    def draw(self, commands, offset=(0, 0)):
+        offset_x, offset_y = offset
+  
+        if self.visible:
+            area = atlas.knight(self.width, self.height, self.color, 4, self.facing_right)
+            commands.sprite(ACTORS, atlas, area, (int(self.x) - offset_x, int(self.y) - offset_y))
+            
+    
+            if self.attack:
+                commands.rect(OVERLAY, WHITE, self.attack.move(-offset_x, -offset_y))
+            
+     
+            if self.block:
+                commands.rect(OVERLAY, BLUE, self.block.move(-offset_x, -offset_y))
+        
+    
+        draw_particles(commands, self.particles, offset)
+        
+   
+        health_width = 200
+        health_height = 20
+        health_x = 20
+        health_y = 20
+        
+   
+        commands.rect(HUD, DARK_GRAY, (health_x, health_y, health_width, health_height))
+        
+     
+        health_percent = max(0, self.health / self.max_health)
+        commands.rect(HUD, GREEN, (health_x, health_y, health_width * health_percent, health_height))
+        
+   
+        draw_text(commands, font_small, f"Health: {self.health}/{self.max_health}", WHITE, (health_x + 10, health_y + 2))
+
+
 class Player:
-    def __init__(self, x, y):
+    attack_cooldown = Countdown()
+    attack_duration = Countdown()
+    dash_cooldown = Countdown()
+    dash_duration = Countdown()
+    invincibility = Countdown()
+    dash_warning_timer = Countdown()
+
+    def __init__(self, x, y, arena=None, timers=None):
+        self.timers = timers if timers is not None else TimerWheel()
+        self.arena = arena if arena is not None else load_arena()
         self.x = x
         self.y = y
         self.width = 30
@@ -1082,6 +2225,7 @@ class Player:
         self.dash_cooldown_max = 45
         self.dash_duration = 0
         self.dash_duration_max = 10
+        self.dash_left = 0
         self.dash_speed = 12
         self.invincibility = 0
         self.attacking = False
@@ -1089,6 +2233,8 @@ class Player:
         self.facing_right = True
         self.color = GREEN
         self.particles = ParticleSystem()
+        self.prev_x = x
+        self.prev_y = y
         self.visible_during_dash = False  
         self.attack_count = 0
         self.dash_count = 0
@@ -1103,6 +2249,9 @@ class Player:
     def get_rect(self):
         return pygame.Rect(self.x, self.y, self.width, self.height)
     
+    def motion(self):
+        return self.x - self.prev_x, self.y - self.prev_y
+    
     def get_attack_rect(self):
         if not self.attacking:
             return None
@@ -1123,7 +2272,7 @@ class Player:
         block_y = self.y + 5
         return pygame.Rect(block_x, block_y, block_width, block_height)
 
-    def take_damage(self, amount):
+    def take_damage(self, amount, source='melee'):
 
         if self.dash_duration > 0:
             return False
@@ -1135,6 +2284,7 @@ class Player:
               
                 self.health -= amount // 2
                 self.block_count += 1
+                events.emit('block', 'player', source, value=amount // 2, x=self.x, y=self.y)
                 
              
                 self.particles.add_particles(
@@ -1149,6 +2299,7 @@ class Player:
             else:
            
                 self.health -= amount
+                events.emit('hit', 'player', source, value=amount, x=self.x, y=self.y)
                 
             self.invincibility = 60
             hit_sound.play()
@@ -1167,30 +2318,17 @@ class Player:
             return True
         return False
 
-    def move(self, keys, boss):
+    def move(self, keys, boss, dt=1):
+        self.prev_x, self.prev_y = self.x, self.y
  
         self.position_history.append((self.x, self.y))
         if len(self.position_history) > self.position_history_max:
             self.position_history.pop(0)
             
-    
-        if self.attack_cooldown > 0:
-            self.attack_cooldown -= 1
-            
-        if self.dash_cooldown > 0:
-            self.dash_cooldown -= 1
-            
-        if self.invincibility > 0:
-            self.invincibility -= 1
-            
-        if self.attack_duration > 0:
-            self.attack_duration -= 1
-            if self.attack_duration <= 0:
-                self.attacking = False
-                
-       
-        if self.dash_duration > 0:
-            self.dash_duration -= 1
+        # The wheel has already advanced past this step, so the dash covers the ticks it
+        # had left when the previous step ended.
+        dash_ticks = min(dt, self.dash_left)
+        if dash_ticks > 0:
             self.visible_during_dash = False  
             
            
@@ -1217,6 +2355,8 @@ class Player:
             
            
             self.vel_x = self.dash_speed * (1 if self.facing_right else -1)
+            if dash_ticks < dt:
+                self.vel_x = self.vel_x * dash_ticks / dt
         else:
             self.visible_during_dash = True 
             
@@ -1236,11 +2376,16 @@ class Player:
             self.vel_y = self.jump_power
             self.is_jumping = True
             self.on_ground = False
+        
+        dropping = bool(keys[pygame.K_DOWN] or keys[pygame.K_s])
+        if dropping and self.on_ground:
+            self.on_ground = False
             
     
         if (keys[pygame.K_z] or keys[pygame.K_j]) and not self.attacking and self.attack_cooldown <= 0 and not self.blocking:
             self.attacking = True
             self.attack_duration = self.attack_duration_max
+            self.timers.schedule(self.attack_duration_max, self.end_attack)
             self.attack_cooldown = 20
             self.attack_count += 1
             player_attack_sound.play()
@@ -1256,165 +2401,218 @@ class Player:
             self.dash_cooldown = self.dash_cooldown_max
             self.dash_count += 1
             player_dash_sound.play()
+            events.emit('dash', 'player', value=1 if self.facing_right else -1, x=self.x, y=self.y)
             
   
-        self.x += self.vel_x
+        self.x, _ = self.arena.resolve_x(self.x, self.x + self.vel_x * dt, self.width, self.y, self.y + self.height)
         
  
+        previous_y = self.y
         if not self.on_ground:
-            self.vel_y += self.gravity
-            self.y += self.vel_y
+            self.vel_y += self.gravity * dt
+            self.y += self.vel_y * dt
         
     
-        if self.y >= SCREEN_HEIGHT - 100 - self.height:
-            self.y = SCREEN_HEIGHT - 100 - self.height
+        ground = self.arena.landing(self.x, self.width, previous_y + self.height, self.y + self.height, dropping)
+        if ground is not None:
+            self.y = ground - self.height
             self.on_ground = True
             self.vel_y = 0
             self.is_jumping = False
         else:
             self.on_ground = False
-            
-  
-        if self.x < 0:
-            self.x = 0
-        elif self.x > SCREEN_WIDTH - self.width:
-            self.x = SCREEN_WIDTH - self.width
+            ceiling = self.arena.ceiling(self.x, self.width, previous_y, self.y)
+            if ceiling is not None:
+                self.y = ceiling
+                self.vel_y = 0
             
    
-        self.particles.update()
-        
+        self.particles.update(dt)
+        self.dash_left = self.dash_duration
+    
+    def end_attack(self):
+        self.attacking = False
+    
+    def warn_dash(self, duration):
+        self.dash_warning_shown = True
+        self.dash_warning_timer = duration
+        self.timers.schedule(duration, self.clear_dash_warning)
+    
+    def clear_dash_warning(self):
+        self.dash_warning_shown = False
+    
+    def collide(self, boss):
+        rect = self.get_rect()
+        motion = self.motion()
      
         for projectile in boss.projectiles[:]:
-            if projectile.get_rect().colliderect(self.get_rect()):
-                self.take_damage(projectile.damage)
+            if swept_collision(projectile.get_rect(), projectile.motion(), rect, motion) is not None:
+                self.take_damage(projectile.damage, 'projectile')
                 boss.projectiles.remove(projectile)
+                boss.untrack(projectile)
                 
 
         for hazard in boss.hazards:
-            if hazard.active and hazard.get_rect().colliderect(self.get_rect()):
-                self.take_damage(hazard.damage)
+            if hazard.active and swept_collision(hazard.get_rect(), hazard.motion(), rect, motion) is not None:
+                self.take_damage(hazard.damage, 'hazard')
          
                 self.invincibility = max(self.invincibility, 60)
                 
      
         for laser in boss.lasers:
-            if laser.active and laser.get_rect().colliderect(self.get_rect()):
+            if laser.active and swept_collision(laser.get_rect(), laser.motion(), rect, motion) is not None:
    
                 if self.dash_duration <= 0:
-                    self.take_damage(laser.damage)
+                    self.take_damage(laser.damage, 'laser')
              
                     self.invincibility = max(self.invincibility, 60)
 
-    def draw(self, surface):
-  
-        if self.visible_during_dash:
-            if self.invincibility > 0:
-            
-                if self.invincibility % 6 < 3:
-                    color = RED
-                else:
-                    color = self.color
+    def view(self):
+        if self.invincibility > 0:
+            if self.invincibility % 6 < 3:
+                color = RED
             else:
                 color = self.color
-                
-            pygame.draw.rect(surface, color, (self.x, self.y, self.width, self.height))
-            
-        
-            eye_y = self.y + 10
-            if self.facing_right:
-                pygame.draw.circle(surface, WHITE, (int(self.x + self.width - 10), int(eye_y)), 4)
-                pygame.draw.circle(surface, BLACK, (int(self.x + self.width - 10), int(eye_y)), 2)
-            else:
-                pygame.draw.circle(surface, WHITE, (int(self.x + 10), int(eye_y)), 4)
-                pygame.draw.circle(surface, BLACK, (int(self.x + 10), int(eye_y)), 2)
-            
-    
-            attack_rect = self.get_attack_rect()
-            if attack_rect:
-                pygame.draw.rect(surface, WHITE, attack_rect)
-            
-     
-            block_rect = self.get_block_rect()
-            if block_rect:
-                pygame.draw.rect(surface, BLUE, block_rect)
-        
-    
-        self.particles.draw(surface)
-        
-   
-        health_width = 200
-        health_height = 20
-        health_x = 20
-        health_y = 20
-        
-   
-        pygame.draw.rect(surface, DARK_GRAY, (health_x, health_y, health_width, health_height))
-        
-     
-        health_percent = max(0, self.health / self.max_health)
-        pygame.draw.rect(surface, GREEN, (health_x, health_y, health_width * health_percent, health_height))
-        
-   
-        health_text = font_small.render(f"Health: {self.health}/{self.max_health}", True, WHITE)
-        surface.blit(health_text, (health_x + 10, health_y + 2))
+        else:
+            color = self.color
+        return PlayerView(
+            id(self), self.x, self.y, self.width, self.height, self.visible_during_dash, color, self.facing_right,
+            self.get_attack_rect(), self.get_block_rect(), self.particles.view(), self.health, self.max_health,
+        )
+
+
+CONTROL_KEYS = {
+    'left': (pygame.K_LEFT, pygame.K_a),
+    'right': (pygame.K_RIGHT, pygame.K_d),
+    'jump': (pygame.K_SPACE, pygame.K_UP, pygame.K_w),
+    'attack': (pygame.K_z, pygame.K_j),
+    'block': (pygame.K_x, pygame.K_k),
+    'dash': (pygame.K_c, pygame.K_l),
+    'restart': (pygame.K_r,),
+    'drop': (pygame.K_s, pygame.K_DOWN),
+}
+CONTROL_BITS = {name: 1 << index for index, name in enumerate(CONTROL_KEYS)}
+
+
+class KeyBits:
+    __slots__ = ('mask', 'pressed')
+
+    def __init__(self, mask=0):
+        self.mask = mask
+        self.pressed = frozenset(
+            CONTROL_KEYS[name][0] for name, bit in CONTROL_BITS.items() if mask & bit
+        )
+
+    @classmethod
+    def from_names(cls, *names):
+        mask = 0
+        for name in names:
+            mask |= CONTROL_BITS[name]
+        return cls(mask)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+def pack_keys(keys):
+    mask = 0
+    for name, codes in CONTROL_KEYS.items():
+        if any(keys[code] for code in codes):
+            mask |= CONTROL_BITS[name]
+    return mask
 
 
 class MirrorKnightsGame:
-    def __init__(self):
-        self.player = Player(100, SCREEN_HEIGHT - 200)
-        self.boss = Boss(SCREEN_WIDTH - 150, SCREEN_HEIGHT - 200)
+    state_timer = Countdown()
+
+    def __init__(self, boss_policy=None, arena=None):
+        self.boss_policy = boss_policy
+        self.arena = arena if arena is not None else load_arena()
+        self.timers = TimerWheel()
+        self.player = Player(*self.arena.spawn('player', (100, SCREEN_HEIGHT - 200)), self.arena, self.timers)
+        self.boss = Boss(*self.arena.spawn('boss', (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 200)), self.arena, self.timers)
+        self.boss.policy = boss_policy
+        self.danger = DangerField(self.arena.width, self.arena.floor)
+        self.boss.danger = self.danger
+        self.camera = Camera(self.arena)
+        self.camera.follow(self.player, snap=True)
+        self.scenery = SpatialHash()
+        for rect in self.arena.solids:
+            self.scenery.insert(rect, rect, 'solids')
+        for x, y, width in self.arena.ledges:
+            self.scenery.insert((x, y, width, 6), (x, y, width, 6), 'ledges')
+        self.actors = SpatialHash()
+        self.boss.actors = self.actors
         self.game_state = "playing"  
         self.state_timer = 0
         self.particles = ParticleSystem()
+        self.fight_id = 0
+        self.tick = 0
         
     def reset(self):
-        self.player = Player(100, SCREEN_HEIGHT - 200)
-        self.boss = Boss(SCREEN_WIDTH - 150, SCREEN_HEIGHT - 200)
+        self.timers = TimerWheel()
+        self.player = Player(*self.arena.spawn('player', (100, SCREEN_HEIGHT - 200)), self.arena, self.timers)
+        self.boss = Boss(*self.arena.spawn('boss', (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 200)), self.arena, self.timers)
+        self.boss.policy = self.boss_policy
+        self.danger = DangerField(self.arena.width, self.arena.floor)
+        self.boss.danger = self.danger
+        self.actors = SpatialHash()
+        self.boss.actors = self.actors
+        self.camera.follow(self.player, snap=True)
         self.game_state = "playing"
         self.state_timer = 0
+        self.fight_id += 1
+        self.tick = 0
         
-    def update(self, keys):
+    def rebuild_danger(self, tick, threats):
+        self.danger = DangerField(self.arena.width, self.arena.floor)
+        self.boss.danger = self.danger
+        self.danger.refresh(tick, *threats)
+
+    def update(self, keys, dt=1):
+        self.tick += dt
+        self.timers.advance(self.tick)
+        events.begin_tick(self.fight_id, self.tick, self.boss.phase)
+
         if self.game_state == "playing":
       
-            self.player.move(keys, self.boss)
-            self.boss.move(self.player)
+            self.player.move(keys, self.boss, dt)
+            self.boss.move(self.player, dt)
+            self.player.collide(self.boss)
+            self.danger.update(self.tick, self.boss)
             
         
             player_attack_rect = self.player.get_attack_rect()
-            if player_attack_rect and player_attack_rect.colliderect(self.boss.get_rect()) and self.boss.is_visible:
+            if (player_attack_rect and self.boss.is_visible and swept_collision(
+                    player_attack_rect, self.player.motion(), self.boss.get_rect(), self.boss.motion()) is not None):
            
                 self.boss.take_damage(5)
                     
      
             boss_attack_rect = self.boss.get_attack_rect()
-            if boss_attack_rect and boss_attack_rect.colliderect(self.player.get_rect()):
+            if boss_attack_rect and swept_collision(
+                    boss_attack_rect, self.boss.motion(), self.player.get_rect(), self.player.motion()) is not None:
                 self.player.take_damage(5)
             
         
             for laser in self.boss.lasers:
                 if laser.warning_shown and not self.player.dash_warning_shown:
-                    self.player.dash_warning_shown = True
-                    self.player.dash_warning_timer = 180  
-            
-  
-            if self.player.dash_warning_timer > 0:
-                self.player.dash_warning_timer -= 1
-                if self.player.dash_warning_timer <= 0:
-                    self.player.dash_warning_shown = False
+                    self.player.warn_dash(180)
             
 
             if self.player.health <= 0:
                 self.game_state = "game_over"
                 self.state_timer = 180  
                 game_over_sound.play()
+                events.emit('death', 'player', value=self.boss.health, x=self.player.x, y=self.player.y)
             elif self.boss.health <= 0:
                 self.game_state = "victory"
                 self.state_timer = 180  
                 victory_sound.play()
+                events.emit('death', 'boss', value=self.player.health, x=self.boss.x, y=self.boss.y)
                 
         elif self.game_state == "game_over" or self.game_state == "victory":
        
-            self.state_timer -= 1
             if self.state_timer <= 0:
           
                 if self.game_state == "game_over":
@@ -1445,21 +2643,88 @@ class MirrorKnightsGame:
                     self.reset()
         
   
-        self.particles.update()
+        self.particles.update(dt)
+        self.camera.follow(self.player)
+    
+    def ticks_until_event(self):
+        deadline = self.timers.next_deadline()
+        return None if deadline is None else max(0, deadline - self.tick)
+    
+    def fast_forward(self, keys, max_dt=8):
+        # Between scheduled expirations only motion changes, and swept collision keeps a
+        # coarse step honest, so headless runs can jump straight to the next event.
+        wait = self.ticks_until_event()
+        if self.game_state == "playing":
+            dt = max_dt if wait is None else min(max_dt, max(1, wait))
+        else:
+            dt = 1 if wait is None else max(1, wait)
+        self.update(keys, dt)
+        return dt
     
     def draw(self, surface):
+        render_game(self, SurfaceBackend(surface))
 
-        surface.fill(BLACK)
-        
+    def view(self):
+        camera = self.camera
+        rect = camera.view_rect(CULL_MARGIN)
+        visible = (
+            self.actors.query(rect, 'projectiles'),
+            self.actors.query(rect, 'hazards'),
+            self.actors.query(rect, 'lasers'),
+        )
+        return FrameView(
+            id(self), self.tick, self.fight_id, self.game_state, self.state_timer,
+            (camera.x, camera.y, camera.width, camera.height), self.scenery,
+            self.player.view(), self.boss.view(visible), self.particles.view(), self.player.dash_warning_timer,
+        )
+
+    def submit(self, commands):
+        return self.view().submit(commands)
+
+
+class FrameView(namedtuple('FrameView', ['source_id', 'tick', 'fight_id', 'game_state', 'state_timer', 'camera',
+                                         'scenery', 'player', 'boss', 'particles', 'dash_warning'])):
+    # Everything a frame draws, captured once per tick. Scenery is static and shared.
+    __slots__ = ()
+
+    @property
+    def offset(self):
+        return int(self.camera[0]), int(self.camera[1])
 
-        pygame.draw.rect(surface, DARK_GRAY, (0, SCREEN_HEIGHT - 100, SCREEN_WIDTH, 100))
+    def submit(self, commands):
+        if self.game_state == "playing":
+            return self.submit_scene(commands)
+
+        # End screens are a still image: composite the cached dimmed scene, then only
+        # what still moves.
+        commands.clear(BLACK)
+        backdrop = frozen_scene.capture(self)
+        commands.sprite(WORLD, backdrop, backdrop.area, (0, 0))
+        draw_particles(commands, self.particles, self.offset)
+        if self.state_timer <= 0:
+            draw_text(commands, font_medium, RESTART_TEXT, WHITE, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20), center_x=True,
+                      layer=SCREEN_TEXT)
+        return commands
+
+    def submit_scene(self, commands):
+
+        commands.clear(BLACK)
+        
+        offset = self.offset
+        x, y, width, height = self.camera
+        view = (x - CULL_MARGIN, y - CULL_MARGIN, width + 2 * CULL_MARGIN, height + 2 * CULL_MARGIN)
+        for rect in self.scenery.query(view, 'solids'):
+            commands.rect(WORLD, DARK_GRAY, (rect[0] - offset[0], rect[1] - offset[1], rect[2], rect[3]))
+        for rect in self.scenery.query(view, 'ledges'):
+            commands.rect(WORLD, DARK_GRAY, (rect[0] - offset[0], rect[1] - offset[1], rect[2], rect[3]))
         
 
-        self.player.draw(surface)
-        self.boss.draw(surface)
+        self.player.draw(commands, offset)
+        self.boss.draw(commands, offset)
         
 
-        self.particles.draw(surface)
+        if self.game_state == "playing":
+            draw_particles(commands, self.particles, offset)
         
 
         boss_health_width = 200
@@ -1468,101 +2733,657 @@ class MirrorKnightsGame:
         boss_health_y = 20
         
        
-        pygame.draw.rect(surface, DARK_GRAY, (boss_health_x, boss_health_y, boss_health_width, boss_health_height))
+        commands.rect(HUD, DARK_GRAY, (boss_health_x, boss_health_y, boss_health_width, boss_health_height))
         
  
         boss_health_percent = max(0, self.boss.health / self.boss.max_health)
-        pygame.draw.rect(surface, PURPLE, (boss_health_x, boss_health_y, boss_health_width * boss_health_percent, boss_health_height))
+        commands.rect(HUD, PURPLE, (boss_health_x, boss_health_y, boss_health_width * boss_health_percent, boss_health_height))
         
 
-        boss_health_text = font_small.render(f"Boss: {self.boss.health}/{self.boss.max_health}", True, WHITE)
-        surface.blit(boss_health_text, (boss_health_x + 10, boss_health_y + 2))
+        draw_text(commands, font_small, f"Boss: {self.boss.health}/{self.boss.max_health}", WHITE,
+                  (boss_health_x + 10, boss_health_y + 2))
         
   
-        phase_text = font_small.render(f"Phase: {self.boss.phase}", True, PURPLE)
-        surface.blit(phase_text, (boss_health_x + boss_health_width - 80, boss_health_y + 25))
+        draw_text(commands, font_small, f"Phase: {self.boss.phase}", PURPLE,
+                  (boss_health_x + boss_health_width - 80, boss_health_y + 25))
         
 
         if self.game_state == "game_over":
           
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))  
-            surface.blit(overlay, (0, 0))
+            commands.rect(SCREEN, (0, 0, 0, 150), (0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
             
   
-            game_over_text = font_large.render("GAME OVER", True, RED)
-            text_x = SCREEN_WIDTH // 2 - game_over_text.get_width() // 2
-            text_y = SCREEN_HEIGHT // 2 - 50
-            surface.blit(game_over_text, (text_x, text_y))
-            
-         
-            if self.state_timer <= 0:
-                restart_text = font_medium.render("Press R to restart", True, WHITE)
-                restart_x = SCREEN_WIDTH // 2 - restart_text.get_width() // 2
-                restart_y = SCREEN_HEIGHT // 2 + 20
-                surface.blit(restart_text, (restart_x, restart_y))
+            draw_text(commands, font_large, "GAME OVER", RED, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50), center_x=True,
+                      layer=SCREEN_TEXT)
                 
         elif self.game_state == "victory":
      
-            overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))  
-            surface.blit(overlay, (0, 0))
+            commands.rect(SCREEN, (0, 0, 0, 150), (0, 0, SCREEN_WIDTH, SCREEN_HEIGHT))
             
           
-            victory_text = font_large.render("VICTORY!", True, GREEN)
-            text_x = SCREEN_WIDTH // 2 - victory_text.get_width() // 2
-            text_y = SCREEN_HEIGHT // 2 - 50
-            surface.blit(victory_text, (text_x, text_y))
-            
-
-            if self.state_timer <= 0:
-                restart_text = font_medium.render("Press R to restart", True, WHITE)
-                restart_x = SCREEN_WIDTH // 2 - restart_text.get_width() // 2
-                restart_y = SCREEN_HEIGHT // 2 + 20
-                surface.blit(restart_text, (restart_x, restart_y))
+            draw_text(commands, font_large, "VICTORY!", GREEN, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50), center_x=True,
+                      layer=SCREEN_TEXT)
                 
  
         if self.game_state == "playing":
-            controls_text = font_small.render("Move: Arrow Keys | Attack: Z | Block: X | Dash: C | Jump: Space", True, LIGHT_GRAY)
-            surface.blit(controls_text, (20, SCREEN_HEIGHT - 30))
+            draw_text(commands, font_small, CONTROLS_TEXT, LIGHT_GRAY, (20, SCREEN_HEIGHT - 30))
 
    
-        if self.player.dash_warning_timer > 0:
-            warning_text = font_medium.render("Press C to dash through lasers!", True, YELLOW)
-            warning_x = SCREEN_WIDTH // 2 - warning_text.get_width() // 2
-            warning_y = SCREEN_HEIGHT // 2 - 100
-            
-       
-            if (self.player.dash_warning_timer // 10) % 2 == 0:
-                surface.blit(warning_text, (warning_x, warning_y))
+        if self.game_state == "playing" and self.dash_warning > 0:
+            if (self.dash_warning // 10) % 2 == 0:
+                draw_text(commands, font_medium, DASH_WARNING_TEXT, YELLOW,
+                          (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 100), center_x=True, layer=SCREEN_TEXT)
+
+        return commands
+
+
+frame_commands = RenderList((SCREEN_WIDTH, SCREEN_HEIGHT))
+
+
+class FrozenScene:
+    # Sprite source holding the dimmed end-screen backdrop. It is rendered once when a
+    # fight ends; the revision bump tells texture backends to upload it again.
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+        self.area = pygame.Rect((0, 0), size)
+        self.surface = None
+        self.revision = 0
+        self.key = None
+        self.commands = RenderList(size)
+
+    def capture(self, view):
+        # Frame views are rebuilt every tick; they carry the id of the game they show.
+        key = (view.source_id, view.fight_id, view.game_state)
+        if key != self.key:
+            if self.surface is None:
+                self.surface = pygame.Surface(self.area.size)
+            SurfaceBackend(self.surface).render(view.submit_scene(self.commands.reset()))
+            self.key = key
+            self.revision += 1
+        return self
+
+
+frozen_scene = FrozenScene()
+
+
+def render_game(game, backend):
+    if isinstance(backend, ScaledBackend):
+        backend.set_scale(backend.base_scale * quality.render_scale)
+    commands = game.submit(frame_commands.reset(backend.size))
+    backend.render(commands)
+    return commands
+
+
+CULL_MARGIN = 64
+SPATIAL_CELL = 256
+
+
+class SpatialHash:
+    def __init__(self, cell=SPATIAL_CELL):
+        self.cell = cell
+        self.buckets = {}
+        self.entries = {}
+
+    def __getstate__(self):
+        # Entries are keyed by id(), which does not survive a copy or a replay keyframe.
+        state = self.__dict__.copy()
+        state['entries'] = list(self.entries.values())
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.entries = {id(entry[0]): entry for entry in state['entries']}
+
+    def clear(self):
+        self.buckets.clear()
+        self.entries.clear()
+
+    def span(self, rect):
+        x, y, width, height = rect
+        cell = self.cell
+        return int(x // cell), int((x + width) // cell), int(y // cell), int((y + height) // cell)
+
+    def cells(self, rect):
+        x0, x1, y0, y1 = self.span(rect)
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                yield cell_x, cell_y
+
+    def insert(self, item, rect, layer):
+        for cell_x, cell_y in self.cells(rect):
+            self.buckets.setdefault((layer, cell_x, cell_y), []).append(item)
+
+    def update(self, item, rect, layer):
+        # Moving items only touch buckets when they cross a cell boundary.
+        span = self.span(rect)
+        entry = self.entries.get(id(item))
+        if entry is not None:
+            if entry[1] == span and entry[2] == layer:
+                return
+            self.remove(item)
+        self.entries[id(item)] = (item, span, layer)
+        x0, x1, y0, y1 = span
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                self.buckets.setdefault((layer, cell_x, cell_y), []).append(item)
+
+    def remove(self, item):
+        entry = self.entries.pop(id(item), None)
+        if entry is None:
+            return
+        _, (x0, x1, y0, y1), layer = entry
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                key = (layer, cell_x, cell_y)
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    continue
+                for index, other in enumerate(bucket):
+                    if other is item:
+                        del bucket[index]
+                        break
+                if not bucket:
+                    del self.buckets[key]
+
+    def query(self, rect, layer):
+        found = []
+        seen = set()
+        for cell_x, cell_y in self.cells(rect):
+            for item in self.buckets.get((layer, cell_x, cell_y), ()):
+                if id(item) not in seen:
+                    seen.add(id(item))
+                    found.append(item)
+        return found
+
+
+class Camera:
+    def __init__(self, arena, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, smoothing=0.15):
+        self.arena = arena
+        self.width = width
+        self.height = height
+        self.smoothing = smoothing
+        self.x = 0.0
+        self.y = 0.0
+
+    def follow(self, target, snap=False):
+        goal_x = target.x + target.width / 2 - self.width / 2
+        goal_y = target.y + target.height / 2 - self.height / 2
+        if snap:
+            self.x, self.y = goal_x, goal_y
+        else:
+            self.x += (goal_x - self.x) * self.smoothing
+            self.y += (goal_y - self.y) * self.smoothing
+        self.x = min(max(self.x, 0.0), max(0.0, self.arena.width - self.width))
+        self.y = min(max(self.y, 0.0), max(0.0, self.arena.height - self.height))
+
+    @property
+    def offset(self):
+        return int(self.x), int(self.y)
+
+    def view_rect(self, margin=0):
+        return (self.x - margin, self.y - margin, self.width + 2 * margin, self.height + 2 * margin)
+
+
+FrameSnapshot = namedtuple('FrameSnapshot', ['tick', 'time', 'view'])
+
+
+class SimulationThread(threading.Thread):
+    def __init__(self, game, tick_rate=TICK_RATE):
+        super().__init__(name="simulation", daemon=True)
+        self.game = game
+        self.tick_time = 1.0 / tick_rate
+        self.keys = None
+        self.running = False
+        self.tick = 0
+        self.late_ticks = 0
+        snapshot = FrameSnapshot(0, time.perf_counter(), game.view())
+        # (previous, latest), replaced as one reference so the renderer never sees half a swap.
+        self.frames = (snapshot, snapshot)
+
+    def run(self):
+        self.running = True
+        next_tick = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            if now < next_tick:
+                time.sleep(next_tick - now)
+                continue
+
+            keys = self.keys
+            self.game.update(keys)
+            after_tick(self.game, keys)
+            self.tick += 1
+            snapshot = FrameSnapshot(self.tick, next_tick, self.game.view())
+            self.frames = (self.frames[1], snapshot)
+
+            next_tick += self.tick_time
+            # Never try to replay more than MAX_SIM_LAG ticks after a stall.
+            if time.perf_counter() - next_tick > self.tick_time * MAX_SIM_LAG:
+                self.late_ticks += 1
+                next_tick = time.perf_counter()
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join()
+
+    def interpolation_alpha(self, now=None, latest=None):
+        if now is None:
+            now = time.perf_counter()
+        if latest is None:
+            latest = self.frames[1]
+        return max(0.0, min(1.0, (now - latest.time) / self.tick_time))
+
+
+def lerp(before, after, alpha):
+    if abs(after - before) > SNAP_DISTANCE:
+        return after
+    return before + (after - before) * alpha
+
+
+def interpolate_actor(view, before, alpha):
+    if before is None:
+        return view
+    return view.moved(lerp(before.x, view.x, alpha) - view.x, lerp(before.y, view.y, alpha) - view.y)
+
+
+def interpolate_view(previous, latest, alpha):
+    view = latest.view
+    before = previous.view
+    if before.fight_id != view.fight_id or before.game_state != view.game_state:
+        return view
+    earlier = {threat.key: threat for threat in before.boss.threats}
+    threats = tuple(interpolate_actor(threat, earlier.get(threat.key), alpha) for threat in view.boss.threats)
+    x, y, width, height = view.camera
+    camera = (lerp(before.camera[0], x, alpha), lerp(before.camera[1], y, alpha), width, height)
+    return view._replace(
+        camera=camera,
+        player=interpolate_actor(view.player, before.player, alpha),
+        boss=interpolate_actor(view.boss, before.boss, alpha)._replace(threats=threats),
+    )
+
+
+def draw_interpolated(backend, previous, latest, alpha):
+    return render_game(interpolate_view(previous, latest, alpha), backend)
+
+
+class FrameSkipper:
+    def __init__(self, tick_rate=TICK_RATE, max_skip=MAX_FRAME_SKIP, report_interval=1.0):
+        self.tick_time = 1.0 / tick_rate
+        self.max_skip = max_skip
+        self.report_interval = report_interval
+        self.accumulator = 0.0
+        self.last_time = None
+        self.last_report = None
+        self.skipped_draws = 0
+        self.dropped_ticks = 0
+        self.reported_dropped = 0
+
+    def ticks_due(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        if self.last_time is None:
+            self.last_time = now
+            self.last_report = now
+            return 1
+
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        ticks = int(self.accumulator / self.tick_time)
+        self.accumulator -= ticks * self.tick_time
+
+        budget = self.max_skip + 1
+        if ticks > budget:
+            self.dropped_ticks += ticks - budget
+            ticks = budget
+        if ticks > 1:
+            self.skipped_draws += ticks - 1
+        return ticks
+
+    def report(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        if self.last_report is None or now - self.last_report < self.report_interval:
+            return None
+        self.last_report = now
+        if self.dropped_ticks == self.reported_dropped:
+            return None
+        newly_dropped = self.dropped_ticks - self.reported_dropped
+        self.reported_dropped = self.dropped_ticks
+        return (f"frame skip: dropped {newly_dropped} ticks "
+                f"({self.dropped_ticks} total, {self.skipped_draws} updates without draw)")
+
+
+INPUT_EVENTS = (pygame.KEYDOWN, pygame.KEYUP)
+LOW_LATENCY_EVENTS = (pygame.QUIT, *INPUT_EVENTS, pygame.VIDEORESIZE, pygame.WINDOWSIZECHANGED)
+LATENCY_WINDOW = 2048
+PACER_MARGIN = 0.001
+PACER_SPIN = 0.002
+
+
+class LatencyMonitor:
+    # pygame does not expose SDL event timestamps, so an input is stamped when the
+    # queue is drained. sample_to_present is from that drain to the frame it reached;
+    # queued_to_present also counts from the previous drain, the worst case for an
+    # event that arrived just after it.
+    def __init__(self, window=LATENCY_WINDOW, report_interval=5.0):
+        self.enabled = False
+        self.report_interval = report_interval
+        self.sampled = deque(maxlen=window)
+        self.queued = deque(maxlen=window)
+        self.pending = []
+        self.last_pump = None
+        self.last_report = None
+        self.events = 0
+
+    def pump(self):
+        events = pygame.event.get()
+        if not self.enabled:
+            return events
+        now = time.perf_counter()
+        since = now if self.last_pump is None else self.last_pump
+        for event in events:
+            if event.type in INPUT_EVENTS:
+                self.pending.append((now, since))
+        self.last_pump = now
+        return events
+
+    def presented(self, now=None):
+        if not self.pending:
+            return
+        if now is None:
+            now = time.perf_counter()
+        for sampled, since in self.pending:
+            self.sampled.append(now - sampled)
+            self.queued.append(now - since)
+        self.events += len(self.pending)
+        self.pending.clear()
+
+    def percentiles(self):
+        if not self.sampled:
+            return None
+        quantiles = (50, 95, 99)
+        sampled = np.percentile(self.sampled, quantiles) * 1000
+        queued = np.percentile(self.queued, quantiles) * 1000
+        return {
+            'events': self.events,
+            'sample_to_present_ms': {f"p{q}": round(float(v), 2) for q, v in zip(quantiles, sampled)},
+            'queued_to_present_ms': {f"p{q}": round(float(v), 2) for q, v in zip(quantiles, queued)},
+        }
+
+    def report(self, now=None):
+        if not self.enabled:
+            return None
+        if now is None:
+            now = time.perf_counter()
+        if self.last_report is None:
+            self.last_report = now
+            return None
+        if now - self.last_report < self.report_interval:
+            return None
+        self.last_report = now
+        stats = self.percentiles()
+        if stats is None:
+            return None
+        sampled = stats['sample_to_present_ms']
+        queued = stats['queued_to_present_ms']
+        return (f"input latency over {len(self.sampled)} events: sample->present p50 {sampled['p50']:.1f} "
+                f"p95 {sampled['p95']:.1f} p99 {sampled['p99']:.1f} ms, queued->present p50 {queued['p50']:.1f} "
+                f"p95 {queued['p95']:.1f} p99 {queued['p99']:.1f} ms")
+
+    def close(self):
+        stats = self.percentiles()
+        if self.enabled and stats is not None:
+            print(json.dumps({'input_latency': stats}), file=sys.stderr)
+
+
+latency = LatencyMonitor()
+
+
+class FramePacer:
+    # Sleeps before input is sampled instead of after present: wake just early enough
+    # for the predicted update+draw to finish at the frame deadline, so each frame
+    # carries the freshest input instead of input that waited out the sleep.
+    def __init__(self, fps=FPS, margin=PACER_MARGIN, window=120):
+        self.period = 1.0 / fps
+        self.margin = margin
+        self.work = deque(maxlen=window)
+        self.deadline = None
+
+    def predicted_work(self):
+        if not self.work:
+            return 0.0
+        ordered = sorted(self.work)
+        return ordered[int(len(ordered) * 0.9)]
+
+    def wait(self):
+        now = time.perf_counter()
+        if self.deadline is None:
+            self.deadline = now + self.period
+            return
+        wake = self.deadline - self.predicted_work() - self.margin
+        if wake - now > PACER_SPIN:
+            time.sleep(wake - now - PACER_SPIN)
+        # Sleep granularity is too coarse for the last stretch.
+        while time.perf_counter() < wake:
+            pass
+
+    def frame_done(self, frame_start, work_done, now=None):
+        # Predict from update+draw only; a present that blocks on vsync is not work.
+        if now is None:
+            now = time.perf_counter()
+        self.work.append(work_done - frame_start)
+        self.deadline += self.period
+        if now > self.deadline - self.period:
+            # Present returned late (vsync or an overrun): lock onto it rather than
+            # rushing through a backlog of deadlines.
+            self.deadline = now + self.period
+
+
+def run_low_latency(game, backend):
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(LOW_LATENCY_EVENTS)
+    pacer = FramePacer()
+
+    while True:
+        pacer.wait()
+
+        frame_start = time.perf_counter()
+        for event in latency.pump():
+            if event.type == pygame.QUIT:
+                quit_game()
+
+        keys = pygame.key.get_pressed()
+        game.update(keys)
+        after_tick(game, keys)
+
+        render_game(game, backend)
+        work_done = time.perf_counter()
+
+        present(backend)
+        pacer.frame_done(frame_start, work_done)
+        quality.record_frame(work_done - frame_start)
+
+        message = latency.report()
+        if message:
+            print(message, file=sys.stderr)
+
+
+def run_frame_skip(game, max_skip, backend):
+    skipper = FrameSkipper(max_skip=max_skip)
+
+    while True:
+        for event in latency.pump():
+            if event.type == pygame.QUIT:
+                quit_game()
+
+        keys = pygame.key.get_pressed()
+
+        frame_start = time.perf_counter()
+        ticks = skipper.ticks_due(frame_start)
+        for _ in range(ticks):
+            game.update(keys)
+            after_tick(game, keys)
+
+        render_game(game, backend)
+
+        present(backend)
+        # Budget the governor on the drawn frame only; catch-up ticks are already accounted for.
+        quality.record_frame((time.perf_counter() - frame_start) / max(1, ticks))
+
+        message = skipper.report()
+        if message:
+            print(message, file=sys.stderr)
+        message = latency.report()
+        if message:
+            print(message, file=sys.stderr)
+
+        clock.tick(FPS)
+
+
+def run_threaded(game, backend):
+    sim = SimulationThread(game)
+    sim.keys = pygame.key.get_pressed()
+    sim.start()
+
+    while True:
+        for event in latency.pump():
+            if event.type == pygame.QUIT:
+                sim.stop()
+                quit_game()
+
+        sim.keys = pygame.key.get_pressed()
+
+        frame_start = time.perf_counter()
+        previous, latest = sim.frames
+        draw_interpolated(backend, previous, latest, sim.interpolation_alpha(latest=latest))
+
+        present(backend)
+        quality.record_frame(time.perf_counter() - frame_start)
 
+        clock.tick(RENDER_FPS)
 
-def main():
-    game = MirrorKnightsGame()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror Knights - Adaptive Boss Fight")
+    parser.add_argument("--threaded", action="store_true",
+                        help="run the simulation on its own thread and interpolate rendering")
+    parser.add_argument("--frame-skip", type=int, default=None, metavar="N",
+                        help="keep gameplay at TICK_RATE by running up to N extra updates per drawn frame")
+    parser.add_argument("--adaptive-quality", action="store_true",
+                        help="scale particles and effects down when frames exceed the frame budget")
+    parser.add_argument("--capture", metavar="DIR",
+                        help="capture presented frames into DIR on a background encoder thread")
+    parser.add_argument("--capture-format", choices=("raw", "png"), default="raw",
+                        help="file format for --capture (default: raw)")
+    parser.add_argument("--boss-policy", metavar="PATH",
+                        help="let an MLP policy loaded from PATH (.npz) choose boss decisions")
+    parser.add_argument("--planner", action="store_true",
+                        help="choose boss decisions with Monte Carlo lookahead rollouts")
+    parser.add_argument("--telemetry", metavar="PATH",
+                        help="append fight events to PATH (.bin for compact binary, otherwise NDJSON)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record the session to a seekable replay file (inspect or watch it with replay.py)")
+    parser.add_argument("--spectate", metavar="[HOST:]PORT",
+                        help="broadcast delta-compressed fight state to viewers (see spectator.py) on PORT")
+    parser.add_argument("--arena", default="default", metavar="NAME",
+                        help="arena definition to fight in: a name under arenas/ or a path to a .json file")
+    parser.add_argument("--renderer", choices=BACKENDS, default="surface",
+                        help="draw backend: software surface, SDL2 textures, or null for headless benchmarking")
+    parser.add_argument("--render-scale", type=float, default=1.0, metavar="S",
+                        help="draw into an internal buffer S times the screen size (e.g. 0.5) and upscale it once per frame")
+    parser.add_argument("--low-latency", action="store_true",
+                        help="only queue the events the game uses and sleep before sampling input instead of after present")
+    parser.add_argument("--latency-stats", action="store_true",
+                        help="measure input-to-present latency and report p50/p95/p99 (always on with --low-latency)")
+    parser.add_argument("--resizable", action="store_true",
+                        help="open a resizable window; the frame is scaled to fit without extra per-primitive cost")
+    args = parser.parse_args(argv)
+    if args.render_scale != 1.0 and args.renderer != 'surface':
+        # Only the software backend draws into a scaled buffer; sdl2 already lets the GPU scale.
+        parser.error(f"--render-scale only applies to --renderer surface, not {args.renderer}")
+    return args
+
+
+def report_asset_progress(loaded, total, filename):
+    startup_metrics['assets_loaded'] = loaded
+    if loaded == total:
+        startup_metrics['assets_ready'] = time.perf_counter() - STARTUP_TIME
+
+
+def main(threaded=False, frame_skip=None, asset_progress=report_asset_progress, boss_policy=None,
+         planner=False, arena=None, renderer='surface', render_scale=1.0, resizable=False, low_latency=False,
+         record=None):
+    # With the governor on, a scaled buffer lets it trade resolution for frame time.
+    backend = init_backend(renderer, render_scale, resizable, scaled=quality.enabled, vsync=low_latency)
+    sounds.preload(SOUND_FILES, progress=asset_progress)
+    atlas.load_or_bake(asset_cache)
+    game = MirrorKnightsGame(boss_policy, arena)
+    if planner:
+        MonteCarloPlanner().attach(game)
+    if record:
+        # Attach after the policy so its decisions are captured too.
+        recorder = ReplayRecorder(record, game)
+        tick_hooks.append(recorder.record)
+        atexit.register(recorder.close)
     running = True
+
+    if low_latency:
+        run_low_latency(game, backend)
+        return
+    if threaded:
+        run_threaded(game, backend)
+        return
+    if frame_skip is not None:
+        run_frame_skip(game, frame_skip, backend)
+        return
     
     while running:
       
-        for event in pygame.event.get():
+        for event in latency.pump():
             if event.type == pygame.QUIT:
                 running = False
-                pygame.quit()
-                sys.exit()
+                quit_game()
         
    
         keys = pygame.key.get_pressed()
         
- 
+        frame_start = time.perf_counter()
         game.update(keys)
+        after_tick(game, keys)
         
     
-        game.draw(screen)
+        render_game(game, backend)
         
 
-        pygame.display.flip()
+        present(backend)
+        quality.record_frame(time.perf_counter() - frame_start)
+
+        message = latency.report()
+        if message:
+            print(message, file=sys.stderr)
         
 
         clock.tick(FPS)
 
 if __name__ == '__main__':
-    main()
+    args = parse_args()
+    quality.enabled = args.adaptive_quality
+    latency.enabled = args.latency_stats or args.low_latency
+    atexit.register(latency.close)
+    if args.telemetry:
+        events.attach(TelemetryWriter(args.telemetry))
+        atexit.register(events.close)
+    if args.capture:
+        capturer = FrameCapture((SCREEN_WIDTH, SCREEN_HEIGHT), args.capture, args.capture_format)
+        frame_hooks.append(capturer.capture)
+        atexit.register(capturer.close)
+    if args.spectate:
+        spectators = SpectatorServer(*parse_address(args.spectate)).start()
+        tick_hooks.append(spectators.publish)
+        atexit.register(spectators.close)
+        print(f"spectator server on {spectators.host}:{spectators.port}", file=sys.stderr)
+    boss_policy = PolicyController(MLPPolicy.load(args.boss_policy)) if args.boss_policy else None
+    main(threaded=args.threaded, frame_skip=args.frame_skip, boss_policy=boss_policy, planner=args.planner,
+         arena=load_arena(args.arena), renderer=args.renderer, render_scale=args.render_scale,
+         resizable=args.resizable, low_latency=args.low_latency, record=args.record)
@@ -0,0 +1,327 @@
+import multiprocessing as mp
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+import gametest
+from gametest import KeyBits, MirrorKnightsGame, SCREEN_HEIGHT, SCREEN_WIDTH
+
+ACTIONS = [
+    (),
+    ('left',),
+    ('right',),
+    ('jump',),
+    ('attack',),
+    ('block',),
+    ('dash',),
+    ('left', 'jump'),
+    ('right', 'jump'),
+    ('left', 'dash'),
+    ('right', 'dash'),
+    ('left', 'attack'),
+    ('right', 'attack'),
+]
+ACTION_KEYS = [KeyBits.from_names(*names) for names in ACTIONS]
+
+NEAREST = 4
+PLAYER_FEATURES = 11
+BOSS_FEATURES = 13
+PROJECTILE_FEATURES = 5
+HAZARD_FEATURES = 5
+LASER_FEATURES = 3
+DECISIONS = ['idle', 'chase', 'retreat', 'attack', 'dash', 'projectile', 'hazard']
+
+
+def observation_size(nearest=NEAREST):
+    return (PLAYER_FEATURES + BOSS_FEATURES
+            + nearest * (PROJECTILE_FEATURES + HAZARD_FEATURES + LASER_FEATURES))
+
+
+def env_shapes(nearest=NEAREST, pixel_size=(84, 84), **_):
+    # Observation and pixel array shapes for MirrorKnightsEnv keyword arguments.
+    return (observation_size(nearest),), (pixel_size[1], pixel_size[0], 3)
+
+
+def nearest_rows(entities, origin_x, origin_y, nearest, center):
+    if len(entities) <= nearest:
+        return entities
+    return sorted(entities, key=lambda entity: abs(center(entity)[0] - origin_x) + abs(center(entity)[1] - origin_y))[:nearest]
+
+
+def hazard_center(hazard):
+    return hazard.x + hazard.width / 2, hazard.y + hazard.height / 2
+
+
+def encode_observation(game, out, nearest=NEAREST):
+    player = game.player
+    boss = game.boss
+    out[:] = 0.0
+
+    player_x = player.x + player.width / 2
+    player_y = player.y + player.height / 2
+    out[0:PLAYER_FEATURES] = (
+        player_x / SCREEN_WIDTH,
+        player_y / SCREEN_HEIGHT,
+        player.vel_x / player.dash_speed,
+        player.vel_y / 20.0,
+        player.health / player.max_health,
+        player.attack_cooldown / 20.0,
+        player.dash_cooldown / player.dash_cooldown_max,
+        player.invincibility / 60.0,
+        player.dash_duration / player.dash_duration_max,
+        1.0 if player.facing_right else -1.0,
+        1.0 if player.on_ground else 0.0,
+    )
+
+    offset = PLAYER_FEATURES
+    boss_x = boss.x + boss.width / 2
+    boss_y = boss.y + boss.height / 2
+    out[offset:offset + BOSS_FEATURES] = (
+        (boss_x - player_x) / SCREEN_WIDTH,
+        (boss_y - player_y) / SCREEN_HEIGHT,
+        boss.vel_x / boss.dash_speed,
+        boss.vel_y / 20.0,
+        boss.health / boss.max_health,
+        boss.attack_cooldown / max(1, boss.attack_cooldown_max),
+        boss.dash_cooldown / max(1, boss.dash_cooldown_max),
+        boss.invincibility / 40.0,
+        boss.phase / 4.0,
+        1.0 if boss.phase_shifting else 0.0,
+        1.0 if boss.is_visible else 0.0,
+        1.0 if boss.attacking else 0.0,
+        DECISIONS.index(boss.current_decision) / (len(DECISIONS) - 1),
+    )
+    offset += BOSS_FEATURES
+
+    projectiles = nearest_rows(boss.projectiles, player_x, player_y, nearest, lambda p: (p.x, p.y))
+    for index, projectile in enumerate(projectiles):
+        row = offset + index * PROJECTILE_FEATURES
+        out[row:row + PROJECTILE_FEATURES] = (
+            (projectile.x - player_x) / SCREEN_WIDTH,
+            (projectile.y - player_y) / SCREEN_HEIGHT,
+            projectile.vx / 6.0,
+            projectile.vy / 6.0,
+            projectile.damage / 20.0,
+        )
+    offset += nearest * PROJECTILE_FEATURES
+
+    hazards = nearest_rows(boss.hazards, player_x, player_y, nearest, hazard_center)
+    for index, hazard in enumerate(hazards):
+        row = offset + index * HAZARD_FEATURES
+        center_x, center_y = hazard_center(hazard)
+        out[row:row + HAZARD_FEATURES] = (
+            (center_x - player_x) / SCREEN_WIDTH,
+            (center_y - player_y) / SCREEN_HEIGHT,
+            hazard.width / SCREEN_WIDTH,
+            hazard.height / SCREEN_HEIGHT,
+            1.0 if hazard.active else -hazard.lifetime / hazard.max_lifetime,
+        )
+    offset += nearest * HAZARD_FEATURES
+
+    lasers = nearest_rows(boss.lasers, player_x, player_y, nearest, lambda l: (l.x + l.width / 2, player_y))
+    for index, laser in enumerate(lasers):
+        row = offset + index * LASER_FEATURES
+        out[row:row + LASER_FEATURES] = (
+            (laser.x + laser.width / 2 - player_x) / SCREEN_WIDTH,
+            laser.speed / 4.0,
+            1.0 if laser.active else 0.0,
+        )
+    return out
+
+
+class MirrorKnightsEnv:
+    def __init__(self, max_steps=3600, action_repeat=1, pixels=False, pixel_size=(84, 84),
+                 nearest=NEAREST, seed=None, dt=1):
+        gametest.init_headless()
+        self.max_steps = max_steps
+        self.action_repeat = action_repeat
+        self.dt = dt
+        self.pixels = pixels
+        self.pixel_size = pixel_size
+        self.nearest = nearest
+        self.action_count = len(ACTIONS)
+        self.observation_shape, self.pixel_shape = env_shapes(nearest, pixel_size)
+        self.observation = np.zeros(self.observation_shape, dtype=np.float32)
+        self.frame = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)) if pixels else None
+        self.scaled_frame = pygame.Surface(pixel_size) if pixels else None
+        self.game = None
+        self.steps = 0
+        if seed is not None:
+            random.seed(seed)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            random.seed(seed)
+        self.game = MirrorKnightsGame()
+        self.steps = 0
+        return self.observe(), self.info()
+
+    def observe(self, out=None, pixels_out=None):
+        if out is None:
+            out = self.observation
+        encode_observation(self.game, out, self.nearest)
+        if self.pixels:
+            return {'state': out, 'pixels': self.render_pixels(pixels_out)}
+        return out
+
+    def render_pixels(self, out=None):
+        self.game.draw(self.frame)
+        pygame.transform.scale(self.frame, self.pixel_size, self.scaled_frame)
+        view = pygame.surfarray.pixels3d(self.scaled_frame)
+        if out is None:
+            out = np.empty(self.pixel_shape, dtype=np.uint8)
+        out[...] = view.transpose(1, 0, 2)
+        del view
+        return out
+
+    def info(self):
+        return {
+            'player_health': self.game.player.health,
+            'boss_health': self.game.boss.health,
+            'phase': self.game.boss.phase,
+            'steps': self.steps,
+        }
+
+    def step(self, action, out=None, pixels_out=None):
+        game = self.game
+        keys = ACTION_KEYS[action]
+        player_health = game.player.health
+        boss_health = game.boss.health
+
+        for _ in range(self.action_repeat):
+            game.update(keys, self.dt)
+            if game.game_state != "playing":
+                break
+        self.steps += 1
+
+        reward = ((boss_health - game.boss.health) - (player_health - game.player.health)) / 100.0
+        terminated = game.game_state != "playing"
+        if game.game_state == "victory":
+            reward += 1.0
+        elif game.game_state == "game_over":
+            reward -= 1.0
+        truncated = not terminated and self.steps >= self.max_steps
+
+        observation = self.observe(out, pixels_out)
+        return observation, reward, terminated, truncated, self.info()
+
+
+def worker(pipe, shm_names, index_range, env_kwargs, seed):
+    blocks = {name: shared_memory.SharedMemory(name=shm_name) for name, shm_name in shm_names.items()}
+    try:
+        envs = [MirrorKnightsEnv(**env_kwargs) for _ in index_range]
+        observation_shape, pixel_shape = env_shapes(**env_kwargs)
+        total = pipe.recv()
+        observations = np.ndarray((total,) + observation_shape, dtype=np.float32, buffer=blocks['obs'].buf)
+        rewards = np.ndarray((total,), dtype=np.float32, buffer=blocks['reward'].buf)
+        dones = np.ndarray((total,), dtype=np.uint8, buffer=blocks['done'].buf)
+        actions = np.ndarray((total,), dtype=np.int32, buffer=blocks['action'].buf)
+        pixels = None
+        if 'pixels' in blocks:
+            pixels = np.ndarray((total,) + pixel_shape, dtype=np.uint8, buffer=blocks['pixels'].buf)
+
+        random.seed(seed)
+        while True:
+            command = pipe.recv()
+            if command == 'step':
+                for env, index in zip(envs, index_range):
+                    pixel_row = None if pixels is None else pixels[index]
+                    _, reward, terminated, truncated, _ = env.step(int(actions[index]), observations[index], pixel_row)
+                    rewards[index] = reward
+                    dones[index] = terminated or truncated
+                    if terminated or truncated:
+                        env.reset()
+                        env.observe(observations[index], pixel_row)
+                pipe.send(None)
+            elif command == 'reset':
+                for env, index in zip(envs, index_range):
+                    env.reset()
+                    env.observe(observations[index], None if pixels is None else pixels[index])
+                pipe.send(None)
+            elif command == 'close':
+                break
+    finally:
+        for block in blocks.values():
+            block.close()
+        pipe.close()
+
+
+class SubprocVecEnv:
+    def __init__(self, num_envs, num_workers=None, env_kwargs=None, seed=0):
+        env_kwargs = dict(env_kwargs or {})
+        self.num_envs = num_envs
+        self.action_count = len(ACTIONS)
+        self.observation_shape, pixel_shape = env_shapes(**env_kwargs)
+        self.pixels = env_kwargs.get('pixels', False)
+
+        if num_workers is None:
+            num_workers = mp.cpu_count()
+        # Every worker needs at least one env; array_split hands extras empty ranges.
+        num_workers = max(1, min(num_workers, num_envs))
+
+        sizes = {
+            'obs': num_envs * int(np.prod(self.observation_shape)) * 4,
+            'reward': num_envs * 4,
+            'done': num_envs,
+            'action': num_envs * 4,
+        }
+        if self.pixels:
+            sizes['pixels'] = num_envs * int(np.prod(pixel_shape))
+        self.blocks = {name: shared_memory.SharedMemory(create=True, size=size) for name, size in sizes.items()}
+
+        self.observations = np.ndarray((num_envs,) + self.observation_shape, dtype=np.float32,
+                                       buffer=self.blocks['obs'].buf)
+        self.rewards = np.ndarray((num_envs,), dtype=np.float32, buffer=self.blocks['reward'].buf)
+        self.dones = np.ndarray((num_envs,), dtype=np.uint8, buffer=self.blocks['done'].buf)
+        self.actions = np.ndarray((num_envs,), dtype=np.int32, buffer=self.blocks['action'].buf)
+        self.frames = None
+        if self.pixels:
+            self.frames = np.ndarray((num_envs,) + pixel_shape, dtype=np.uint8,
+                                     buffer=self.blocks['pixels'].buf)
+
+        shm_names = {name: block.name for name, block in self.blocks.items()}
+        self.pipes = []
+        self.processes = []
+        for worker_index, index_range in enumerate(np.array_split(np.arange(num_envs), num_workers)):
+            parent, child = mp.Pipe()
+            process = mp.Process(
+                target=worker,
+                args=(child, shm_names, [int(i) for i in index_range], env_kwargs, seed + worker_index),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            parent.send(num_envs)
+            self.pipes.append(parent)
+            self.processes.append(process)
+
+    def broadcast(self, command):
+        # Only a short command crosses the pipe; all array data lives in shared memory.
+        for pipe in self.pipes:
+            pipe.send(command)
+        for pipe in self.pipes:
+            pipe.recv()
+
+    def reset(self):
+        self.broadcast('reset')
+        return self.observations
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self.broadcast('step')
+        return self.observations, self.rewards, self.dones.astype(bool)
+
+    def close(self):
+        for pipe in self.pipes:
+            try:
+                pipe.send('close')
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
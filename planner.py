@@ -0,0 +1,235 @@
+import copy
+import random
+import sys
+import time
+
+import numpy as np
+
+from boss_policy import DECISIONS, decision_mask
+
+ROLLOUT_HORIZON = 40
+ROLLOUT_STEP = 4
+DECISION_BUDGET = 0.006
+FRAME_BUDGET_SHARE = 0.008
+MIN_ROLLOUTS = 1
+MIN_HORIZON = 12
+DODGE_WINDOW = 12
+DODGE_DISTANCE = 80
+
+
+class NullParticles:
+    def __init__(self):
+        self.particles = []
+
+    def add_particles(self, *args, **kwargs):
+        pass
+
+    def update(self, dt=1):
+        pass
+
+    def view(self):
+        return None
+
+
+NULL_PARTICLES = NullParticles()
+
+
+def game_module(game):
+    return sys.modules[type(game).__module__]
+
+
+def clone_for_rollout(game):
+    boss = game.boss
+    memo = {
+        id(game.particles): NULL_PARTICLES,
+        id(game.player.particles): NULL_PARTICLES,
+        id(boss.particles): NULL_PARTICLES,
+        id(boss.policy): None,
+        id(game.boss_policy): None,
+    }
+    for entity in (*boss.projectiles, *boss.hazards, *boss.lasers):
+        memo[id(entity.particles)] = NULL_PARTICLES
+    # Histories only feed the slow adaptation timer, which a short rollout never reaches.
+    memo[id(game.player.position_history)] = []
+    # Scenery is static. Rollouts never draw, so they skip the actor index entirely.
+    memo[id(game.scenery)] = game.scenery
+    memo[id(game.actors)] = None
+    return copy.deepcopy(game, memo)
+
+
+class SimulationSandbox:
+    def __init__(self, module):
+        self.module = module
+
+    def __enter__(self):
+        module = self.module
+        self.random_state = random.getstate()
+        self.muted = module.sounds.muted
+        self.writers = module.events.writers
+        self.event_context = (module.events.fight, module.events.tick, module.events.phase)
+        module.sounds.muted = True
+        module.events.writers = []
+        return self
+
+    def __exit__(self, *exc_info):
+        module = self.module
+        random.setstate(self.random_state)
+        module.sounds.muted = self.muted
+        module.events.writers = self.writers
+        module.events.begin_tick(*self.event_context)
+        return False
+
+
+def player_model(game, keys_cls):
+    player = game.player
+    boss = game.boss
+    names = []
+    if boss.x > player.x + player.width:
+        names.append('right')
+    elif boss.x + boss.width < player.x:
+        names.append('left')
+    if abs(boss.x - player.x) < 60:
+        names.append('attack')
+    danger = getattr(game, 'danger', None)
+    if danger is not None:
+        center_x = player.x + player.width / 2
+        center_y = player.y + player.height / 2
+        if danger.time_to_impact(center_x, center_y) < DODGE_WINDOW:
+            # Dodge toward whichever side of the danger field stays clear longer.
+            left = danger.time_to_impact(center_x - DODGE_DISTANCE, center_y)
+            right = danger.time_to_impact(center_x + DODGE_DISTANCE, center_y)
+            names = [name for name in names if name not in ('left', 'right')]
+            names.append('left' if left > right else 'right')
+            names.append('dash')
+        return keys_cls.from_names(*names)
+
+    for projectile in boss.projectiles:
+        if abs(projectile.x - player.x) < 60 and abs(projectile.y - player.y) < 60:
+            names.append('dash')
+            break
+    for laser in boss.lasers:
+        if laser.active and abs(laser.x - player.x) < 40:
+            names.append('dash')
+            break
+    return keys_cls.from_names(*names)
+
+
+def score(before, after):
+    boss_damage = before.boss.health - after.boss.health
+    player_damage = before.player.health - after.player.health
+    value = player_damage - 1.5 * boss_damage
+    if after.game_state == "game_over":
+        value += 50
+    elif after.game_state == "victory":
+        value -= 50
+    return value
+
+
+class MonteCarloPlanner:
+    def __init__(self, horizon=ROLLOUT_HORIZON, budget=DECISION_BUDGET,
+                 frame_budget=FRAME_BUDGET_SHARE, min_rollouts=MIN_ROLLOUTS, step=ROLLOUT_STEP,
+                 min_horizon=MIN_HORIZON):
+        self.horizon = horizon
+        self.step = step
+        self.budget = budget
+        self.frame_budget = frame_budget
+        self.min_rollouts = min_rollouts
+        self.min_horizon = min_horizon
+        self.clone_cost = None
+        self.step_cost = None
+        self.frame_tick = None
+        self.spent_this_tick = 0.0
+        self.decisions = 0
+        self.rollouts = 0
+        self.skipped = 0
+        self.mask = np.zeros(len(DECISIONS), dtype=bool)
+        self.game = None
+
+    def attach(self, game):
+        self.game = game
+        game.boss_policy = self
+        game.boss.policy = self
+        return self
+
+    def rollout(self, game, decision, module, horizon):
+        start = time.perf_counter()
+        sim = clone_for_rollout(game)
+        cloned = time.perf_counter()
+        boss = sim.boss
+        boss.current_decision = decision
+        boss.decision_timer = max(boss.decision_timer_max, horizon + 1)
+        # Swept collision keeps hits from tunnelling, so rollouts can take coarse steps.
+        steps = 0
+        for _ in range(0, horizon, self.step):
+            sim.update(player_model(sim, module.KeyBits), self.step)
+            steps += 1
+            if sim.game_state != "playing":
+                break
+        value = score(game, sim)
+        self.measure(cloned - start, (time.perf_counter() - cloned) / max(1, steps))
+        return value
+
+    def measure(self, clone_cost, step_cost):
+        if self.clone_cost is None:
+            self.clone_cost, self.step_cost = clone_cost, step_cost
+        else:
+            self.clone_cost = self.clone_cost * 0.8 + clone_cost * 0.2
+            self.step_cost = self.step_cost * 0.8 + step_cost * 0.2
+
+    def remaining_budget(self, tick):
+        if tick != self.frame_tick:
+            self.frame_tick = tick
+            self.spent_this_tick = 0.0
+        return min(self.budget, self.frame_budget - self.spent_this_tick)
+
+    def round_cost(self, candidates, horizon):
+        return len(candidates) * (self.clone_cost + self.step_cost * -(-horizon // self.step))
+
+    def plan(self, remaining, candidates):
+        if self.clone_cost is None:
+            return self.min_rollouts, self.horizon
+        # Every candidate gets min_rollouts; shorten the horizon before leaving any of them out.
+        share = remaining / (len(candidates) * self.min_rollouts) - self.clone_cost
+        horizon = min(self.horizon, max(0, int(share / self.step_cost)) * self.step)
+        if horizon < self.min_horizon:
+            return 0, 0
+        rounds = max(self.min_rollouts, int(remaining / self.round_cost(candidates, self.horizon)))
+        return rounds, horizon
+
+    def decide(self, boss, player):
+        game = self.game
+        if game is None or game.boss is not boss:
+            return None
+
+        decision_mask(boss, self.mask)
+        candidates = [decision for decision, allowed in zip(DECISIONS, self.mask) if allowed]
+        if len(candidates) == 1:
+            return candidates[0]
+
+        module = game_module(game)
+        start = time.perf_counter()
+        remaining = self.remaining_budget(game.tick)
+        rounds, horizon = self.plan(remaining, candidates)
+        if not rounds:
+            # The budget cannot cover every candidate; let the scripted AI decide.
+            self.skipped += 1
+            return None
+        # Rotate the order so ties do not always go to whichever decision comes first.
+        shift = self.decisions % len(candidates)
+        candidates = candidates[shift:] + candidates[:shift]
+
+        totals = dict.fromkeys(candidates, 0.0)
+        counts = dict.fromkeys(candidates, 0)
+        with SimulationSandbox(module):
+            for round_index in range(rounds):
+                if round_index >= self.min_rollouts:
+                    if time.perf_counter() - start + self.round_cost(candidates, horizon) > remaining:
+                        break
+                for decision in candidates:
+                    totals[decision] += self.rollout(game, decision, module, horizon)
+                    counts[decision] += 1
+
+        self.spent_this_tick += time.perf_counter() - start
+        self.rollouts += sum(counts.values())
+        self.decisions += 1
+        return max(candidates, key=lambda decision: totals[decision] / counts[decision])
@@ -0,0 +1,376 @@
+import math
+import weakref
+from itertools import chain
+
+import pygame
+
+# Layers are composited in order. Inside a layer commands keep submission order on the
+# surface backend; the texture backend draws untextured primitives first and then
+# groups sprites by source texture.
+WORLD, ACTORS, EFFECTS, OVERLAY, HUD, SCREEN, SCREEN_TEXT = range(7)
+LAYER_COUNT = 7
+
+RECT, CIRCLE, LINE, SPRITE = range(4)
+MAX_SCRATCH = 64
+
+
+class RenderList:
+    def __init__(self, size=(800, 600), layers=LAYER_COUNT):
+        self.size = size
+        self.background = None
+        self.layers = [[] for _ in range(layers)]
+
+    def reset(self, size=None):
+        if size is not None:
+            self.size = size
+        self.background = None
+        for layer in self.layers:
+            layer.clear()
+        return self
+
+    def __len__(self):
+        return sum(len(layer) for layer in self.layers)
+
+    def __iter__(self):
+        return chain.from_iterable(self.layers)
+
+    def clear(self, color):
+        self.background = color
+
+    def rect(self, layer, color, rect, width=0):
+        self.layers[layer].append((RECT, None, color, rect, width))
+
+    def circle(self, layer, color, center, radius, width=0):
+        self.layers[layer].append((CIRCLE, None, color, (center, radius), width))
+
+    def line(self, layer, color, start, end, width=1):
+        self.layers[layer].append((LINE, None, color, (start, end), width))
+
+    def sprite(self, layer, source, area, dest):
+        # source is a sprite sheet with .surface and .revision; it is read at render time,
+        # so regions baked later in the frame are still there.
+        self.layers[layer].append((SPRITE, source, area, dest, 0))
+
+    def sprites(self, layer, source, items):
+        self.layers[layer].extend((SPRITE, source, area, dest, 0) for area, dest in items)
+
+
+class NullBackend:
+    def __init__(self, size=(800, 600)):
+        self.size = size
+        self.frames = 0
+        self.commands = 0
+
+    def render(self, commands):
+        self.frames += 1
+        self.commands += len(commands)
+
+    def snapshot(self):
+        return None
+
+    def present(self):
+        pass
+
+
+_scratch = {}
+
+
+def blend_rect(surface, color, rect):
+    rect = pygame.Rect(rect)
+    if rect.width <= 0 or rect.height <= 0:
+        return
+    scratch = _scratch.get(rect.size)
+    if scratch is None:
+        if len(_scratch) >= MAX_SCRATCH:
+            _scratch.clear()
+        scratch = _scratch[rect.size] = pygame.Surface(rect.size, pygame.SRCALPHA)
+    scratch.fill(color)
+    surface.blit(scratch, rect)
+
+
+class SurfaceBackend:
+    def __init__(self, surface):
+        self.surface = surface
+        self.size = surface.get_size()
+
+    def render(self, commands):
+        surface = self.surface
+        if commands.background is not None:
+            surface.fill(commands.background)
+        for layer in commands.layers:
+            blits = []
+            for kind, source, a, b, width in layer:
+                if kind == SPRITE:
+                    blits.append((source.surface, b, a))
+                    continue
+                if blits:
+                    surface.blits(blits, doreturn=False)
+                    blits = []
+                if kind == RECT:
+                    if len(a) == 4 and a[3] < 255 and not width:
+                        blend_rect(surface, a, b)
+                    else:
+                        pygame.draw.rect(surface, a, b, width)
+                elif kind == CIRCLE:
+                    pygame.draw.circle(surface, a, b[0], b[1], width)
+                else:
+                    pygame.draw.line(surface, a, b[0], b[1], width)
+            if blits:
+                surface.blits(blits, doreturn=False)
+
+    def snapshot(self):
+        return self.surface
+
+    def present(self):
+        pygame.display.flip()
+
+
+def dirty_since(source, revision):
+    # Rects the source repainted after revision, or None when it keeps no log that far
+    # back and everything must be refreshed.
+    log = getattr(source, 'dirty', None)
+    if log is None or revision < source.dirty_base:
+        return None
+    return [rect for changed, rect in log if changed > revision]
+
+
+def scale_rect(rect, scale):
+    x, y, width, height = rect
+    left = math.floor(x * scale)
+    top = math.floor(y * scale)
+    return (left, top, math.floor((x + width) * scale) - left, math.floor((y + height) * scale) - top)
+
+
+def scale_width(width, scale):
+    return max(1, round(width * scale)) if width else 0
+
+
+class ScaledSheet:
+    # Lazily downscaled copy of a sprite sheet. Each region is resampled the first time
+    # it is drawn and reused until the source repaints pixels under it.
+    def __init__(self, source, scale):
+        self.scale = scale
+        self.surface = None
+        self.areas = {}
+        self.revision = source.revision
+
+    def area(self, source, area):
+        # The source is passed in rather than kept, so the backend's weak key can expire.
+        if self.revision != source.revision:
+            changed = dirty_since(source, self.revision)
+            self.revision = source.revision
+            if changed is None:
+                self.areas.clear()
+            else:
+                for rect in changed:
+                    for stale in [key for key in self.areas if rect.colliderect(key)]:
+                        del self.areas[stale]
+        key = tuple(area)
+        scaled = self.areas.get(key)
+        if scaled is not None:
+            return scaled
+
+        source = source.surface
+        size = tuple(max(1, math.floor(extent * self.scale)) for extent in source.get_size())
+        if self.surface is None or self.surface.get_size() != size:
+            grown = pygame.Surface(size, pygame.SRCALPHA)
+            if self.surface is not None:
+                grown.blit(self.surface, (0, 0))
+            self.surface = grown
+
+        scaled = pygame.Rect(scale_rect(area, self.scale))
+        if scaled.width > 0 and scaled.height > 0:
+            piece = pygame.transform.smoothscale(source.subsurface(area), scaled.size)
+            self.surface.fill((0, 0, 0, 0), scaled)
+            self.surface.blit(piece, scaled, special_flags=pygame.BLEND_RGBA_MAX)
+        self.areas[key] = scaled
+        return scaled
+
+
+class ScaledBackend(SurfaceBackend):
+    # Draws into an internal buffer at scale * the logical size, then stretches that
+    # buffer over the (possibly resized) window once per frame, letterboxed.
+    def __init__(self, size, scale=1.0):
+        self.size = size
+        self.base_scale = scale
+        self.scale = None
+        # Keyed by the source itself, so evicted text sprites take their copies with them.
+        self.sheets = weakref.WeakKeyDictionary()
+        self.scaled = RenderList()
+        self.window_size = None
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        if scale == self.scale:
+            return
+        self.scale = scale
+        width, height = self.size
+        buffer_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        window = pygame.display.get_surface()
+        # Match the window's pixel format so the upscale can write straight into it.
+        self.surface = pygame.Surface(buffer_size, 0, window) if window else pygame.Surface(buffer_size)
+        self.sheets.clear()
+
+    def sheet(self, source):
+        sheet = self.sheets.get(source)
+        if sheet is None:
+            sheet = self.sheets[source] = ScaledSheet(source, self.scale)
+        return sheet
+
+    def render(self, commands):
+        scale = self.scale
+        if scale == 1:
+            SurfaceBackend.render(self, commands)
+            return
+
+        scaled = self.scaled.reset(self.surface.get_size())
+        scaled.background = commands.background
+        for layer, out in zip(commands.layers, scaled.layers):
+            for kind, source, a, b, width in layer:
+                if kind == SPRITE:
+                    sheet = self.sheet(source)
+                    out.append((SPRITE, sheet, sheet.area(source, a), (math.floor(b[0] * scale), math.floor(b[1] * scale)), 0))
+                elif kind == RECT:
+                    out.append((RECT, None, a, scale_rect(b, scale), scale_width(width, scale)))
+                elif kind == CIRCLE:
+                    (x, y), radius = b
+                    out.append((CIRCLE, None, a, ((x * scale, y * scale), max(1, round(radius * scale))),
+                                scale_width(width, scale)))
+                else:
+                    (x1, y1), (x2, y2) = b
+                    out.append((LINE, None, a, ((x1 * scale, y1 * scale), (x2 * scale, y2 * scale)),
+                                scale_width(width, scale)))
+        SurfaceBackend.render(self, scaled)
+
+    def snapshot(self):
+        if self.surface.get_size() == tuple(self.size):
+            return self.surface
+        return pygame.transform.scale(self.surface, self.size)
+
+    def present(self):
+        window = pygame.display.get_surface()
+        window_size = window.get_size()
+        width, height = self.size
+        fit = min(window_size[0] / width, window_size[1] / height)
+        target = pygame.Rect(0, 0, max(1, int(width * fit)), max(1, int(height * fit)))
+        target.center = window.get_rect().center
+        if window_size != self.window_size:
+            window.fill((0, 0, 0))
+            self.window_size = window_size
+        if target.size == self.surface.get_size():
+            window.blit(self.surface, target)
+        else:
+            pygame.transform.scale(self.surface, target.size, window.subsurface(target))
+        pygame.display.flip()
+
+
+class TextureBackend:
+    def __init__(self, renderer, size):
+        self.renderer = renderer
+        self.size = size
+        self.textures = weakref.WeakKeyDictionary()
+        self.circles = {}
+        self.uploads = 0
+        self.patches = 0
+        self.batches = 0
+
+    @classmethod
+    def open(cls, title, size, vsync=False, resizable=False):
+        # A renderer cannot share the window behind display.set_mode, so it gets its own.
+        from pygame._sdl2.video import Renderer, Window
+        window = Window(title, size, resizable=resizable)
+        renderer = Renderer(window, vsync=vsync)
+        # The GPU scales the logical frame to whatever size the window is dragged to.
+        renderer.logical_size = size
+        return cls(renderer, size)
+
+    def texture(self, source):
+        entry = self.textures.get(source)
+        if entry is not None and entry[0] != source.revision:
+            revision, texture = entry
+            changed = dirty_since(source, revision)
+            if changed is None or (texture.width, texture.height) != source.surface.get_size():
+                entry = None
+            else:
+                # New regions only; the rest of the texture is already current.
+                for rect in changed:
+                    texture.update(source.surface.subsurface(rect), rect)
+                    self.patches += 1
+                entry = self.textures[source] = (source.revision, texture)
+        if entry is None:
+            from pygame._sdl2.video import Texture
+            texture = Texture.from_surface(self.renderer, source.surface)
+            texture.blend_mode = pygame.BLENDMODE_BLEND
+            entry = self.textures[source] = (source.revision, texture)
+            self.uploads += 1
+        return entry[1]
+
+    def circle_texture(self, color, radius, width):
+        key = (tuple(color), radius, width)
+        texture = self.circles.get(key)
+        if texture is None:
+            from pygame._sdl2.video import Texture
+            disc = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(disc, color, (radius, radius), radius, width)
+            texture = self.circles[key] = Texture.from_surface(self.renderer, disc)
+            texture.blend_mode = pygame.BLENDMODE_BLEND
+        return texture
+
+    def primitive(self, kind, color, geometry, width):
+        renderer = self.renderer
+        if kind == CIRCLE:
+            (x, y), radius = geometry
+            self.circle_texture(color, int(radius), width).draw(dstrect=(x - radius, y - radius, 2 * radius, 2 * radius))
+            return
+        renderer.draw_color = color if len(color) == 4 else (*color, 255)
+        if kind == RECT:
+            rect = pygame.Rect(geometry)
+            if not width:
+                renderer.fill_rect(rect)
+                return
+            for inset in range(width):
+                renderer.draw_rect(rect.inflate(-2 * inset, -2 * inset))
+            return
+        (x1, y1), (x2, y2) = geometry
+        if width > 1 and (x1 == x2 or y1 == y2):
+            # Axis-aligned thick lines are just thin rects.
+            half = width // 2
+            if x1 == x2:
+                renderer.fill_rect((x1 - half, min(y1, y2), width, abs(y2 - y1) + 1))
+            else:
+                renderer.fill_rect((min(x1, x2), y1 - half, abs(x2 - x1) + 1, width))
+            return
+        renderer.draw_line((x1, y1), (x2, y2))
+
+    def render(self, commands):
+        renderer = self.renderer
+        background = commands.background or (0, 0, 0)
+        renderer.draw_blend_mode = pygame.BLENDMODE_NONE
+        renderer.draw_color = (*background[:3], 255)
+        renderer.clear()
+        renderer.draw_blend_mode = pygame.BLENDMODE_BLEND
+        for layer in commands.layers:
+            batches = {}
+            for kind, source, a, b, width in layer:
+                if kind == SPRITE:
+                    batch = batches.get(id(source))
+                    if batch is None:
+                        batch = batches[id(source)] = (source, [])
+                    batch[1].append((a, b))
+                else:
+                    self.primitive(kind, a, b, width)
+            # One texture bind per sheet per layer; SDL then batches the copies.
+            for source, items in batches.values():
+                texture = self.texture(source)
+                for area, (x, y) in items:
+                    texture.draw(srcrect=area, dstrect=(x, y, area.width, area.height))
+                self.batches += 1
+
+    def snapshot(self):
+        return self.renderer.to_surface()
+
+    def present(self):
+        self.renderer.present()
+
+
+BACKENDS = ('surface', 'sdl2', 'null')
@@ -0,0 +1,403 @@
+import argparse
+import importlib
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from arena import Arena
+from boss_policy import DECISIONS
+from timers import Timer, TimerWheel
+
+REPLAY_MAGIC = b'MKRPL\x02\x00\x00'
+FOOTER_MAGIC = b'MKRPLIDX'
+KEYFRAME_INTERVAL = 300
+NO_DECISION = 255
+
+# tick rate, keyframe interval
+HEADER = struct.Struct('<II')
+# keyframe length; the JSON keyframe and its segment's inputs follow
+SEGMENT = struct.Struct('<I')
+# keys mask, boss decision, quality level
+INPUT_RECORD = struct.Struct('<HBB')
+INPUT = np.dtype([('keys', '<u2'), ('decision', 'u1'), ('quality', 'u1')])
+# keyframe offset, keyframe length, inputs offset, input count
+INDEX = np.dtype([('keyframe', '<u8'), ('length', '<u4'), ('inputs', '<u8'), ('count', '<u4')])
+# index offset, segment count, magic
+FOOTER = struct.Struct('<QI8s')
+
+# Keyframes name every class they rebuild, and timer callbacks by method name. Anything
+# outside these tables is refused, so opening a replay never runs code it carries.
+GAME_CLASSES = ('MirrorKnightsGame', 'Player', 'Boss', 'Projectile', 'ArenaHazard', 'Laser',
+                'ParticleSystem', 'Camera', 'SpatialHash')
+CALLBACKS = {
+    'ArenaHazard': ('activate',),
+    'Laser': ('activate',),
+    'Boss': ('continue_barrage', 'end_attack'),
+    'Player': ('end_attack', 'clear_dash_warning'),
+}
+
+
+def game_module(game):
+    return sys.modules[type(game).__module__]
+
+
+class DecisionRecorder:
+    # Wraps the live boss policy so each decision it makes lands in the input stream;
+    # planner decisions depend on wall-clock budgets and could not be re-derived.
+    def __init__(self, policy):
+        self.policy = policy
+        self.decision = None
+
+    def decide(self, boss, player):
+        decision = self.policy.decide(boss, player)
+        self.decision = decision
+        return decision
+
+    def take(self):
+        decision, self.decision = self.decision, None
+        return NO_DECISION if decision is None else DECISIONS.index(decision)
+
+
+class DecisionPlayback:
+    def __init__(self):
+        self.decision = NO_DECISION
+
+    def decide(self, boss, player):
+        return None if self.decision == NO_DECISION else DECISIONS[self.decision]
+
+
+def detach_policy(game):
+    policies = (game.boss_policy, game.boss.policy)
+    game.boss_policy = None
+    game.boss.policy = None
+    return policies
+
+
+def attach_policy(game, policies):
+    game.boss_policy, game.boss.policy = policies
+
+
+def game_classes_module():
+    # When gametest.py runs as a script its classes live in __main__, not gametest.
+    main = sys.modules.get('__main__')
+    if getattr(getattr(main, 'MirrorKnightsGame', None), '__module__', None) == '__main__':
+        return main
+    return importlib.import_module('gametest')
+
+
+def state_classes(module):
+    classes = {name: getattr(module, name) for name in GAME_CLASSES}
+    classes.update(Arena=Arena, Timer=Timer, TimerWheel=TimerWheel)
+    return classes
+
+
+class StateEncoder:
+    # Flattens the game into JSON-safe values. Shared objects are written once into a
+    # table and referenced by index, so identity and cycles survive the round trip.
+    def __init__(self, classes, skip=()):
+        self.classes = classes
+        self.skip = {id(value) for value in skip}
+        self.refs = {}
+        self.objects = []
+
+    def encode(self, value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if id(value) in self.skip:
+            return None
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+        if isinstance(value, tuple):
+            return {'t': [self.encode(item) for item in value]}
+        if isinstance(value, dict):
+            if all(isinstance(key, str) for key in value):
+                return {'s': {key: self.encode(item) for key, item in value.items()}}
+            return {'d': [[self.encode(key), self.encode(item)] for key, item in value.items()]}
+        if isinstance(value, pygame.Rect):
+            return {'r': list(value)}
+        if hasattr(value, '__self__') and hasattr(value, '__func__'):
+            return {'m': [self.reference(value.__self__), value.__func__.__name__]}
+        return {'o': self.reference(value)}
+
+    def reference(self, obj):
+        index = self.refs.get(id(obj))
+        if index is not None:
+            return index
+        name = type(obj).__name__
+        if self.classes.get(name) is not type(obj):
+            raise TypeError(f"replay keyframes cannot hold {type(obj).__module__}.{name}")
+        index = self.refs[id(obj)] = len(self.objects)
+        self.objects.append(None)
+        if hasattr(type(obj), '__slots__'):
+            state = {slot: getattr(obj, slot) for slot in type(obj).__slots__}
+        elif '__getstate__' in type(obj).__dict__:
+            state = obj.__getstate__()
+        else:
+            state = obj.__dict__
+        self.objects[index] = [name, self.encode(state)]
+        return index
+
+
+class StateDecoder:
+    def __init__(self, classes, objects):
+        self.classes = classes
+        self.objects = []
+        for entry in objects:
+            cls = self.classes.get(entry[0]) if isinstance(entry[0], str) else None
+            if cls is None:
+                raise ValueError(f"replay keyframe names an unknown class {entry[0]!r}")
+            self.objects.append(cls.__new__(cls))
+        # Every object exists before any state is filled in, so references can point ahead.
+        for obj, (_, state) in zip(self.objects, objects):
+            state = self.decode(state)
+            if not isinstance(state, dict) or not all(isinstance(key, str) for key in state):
+                raise ValueError("replay keyframe object state must be a mapping")
+            cls = type(obj)
+            if hasattr(cls, '__slots__'):
+                for slot in cls.__slots__:
+                    setattr(obj, slot, state[slot])
+            elif '__setstate__' in cls.__dict__:
+                obj.__setstate__(state)
+            else:
+                obj.__dict__.update(state)
+
+    def decode(self, value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        if isinstance(value, dict) and len(value) == 1:
+            (tag, body), = value.items()
+            if tag == 't':
+                return tuple(self.decode(item) for item in body)
+            if tag == 's':
+                return {key: self.decode(item) for key, item in body.items()}
+            if tag == 'd':
+                return {self.decode(key): self.decode(item) for key, item in body}
+            if tag == 'r':
+                return pygame.Rect(*body)
+            if tag == 'o':
+                return self.objects[body]
+            if tag == 'm':
+                index, name = body
+                obj = self.objects[index]
+                if name not in CALLBACKS.get(type(obj).__name__, ()):
+                    raise ValueError(f"replay keyframe names an unknown callback {name!r}")
+                return getattr(obj, name)
+        raise ValueError(f"replay keyframe holds an unreadable value {value!r}")
+
+
+def snapshot(game, frame):
+    module = game_module(game)
+    policies = detach_policy(game)
+    try:
+        # The danger field is derived state: only the threats it last saw are kept.
+        encoder = StateEncoder(state_classes(module), skip=(game.danger,))
+        root = encoder.reference(game)
+        danger = encoder.encode((game.danger.tick, game.danger.threats()))
+        return json.dumps({
+            'frame': frame,
+            'game': root,
+            'danger': danger,
+            'objects': encoder.objects,
+            'random': encoder.encode(random.getstate()),
+            'quality': module.quality.level,
+        }, separators=(',', ':')).encode()
+    finally:
+        attach_policy(game, policies)
+
+
+def restore_state(data):
+    try:
+        state = json.loads(bytes(data))
+        classes = state_classes(game_classes_module())
+        decoder = StateDecoder(classes, state['objects'])
+        game = decoder.objects[state['game']]
+        danger_tick, threats = decoder.decode(state['danger'])
+        random_state = decoder.decode(state['random'])
+        frame, quality = int(state['frame']), int(state['quality'])
+    except (KeyError, IndexError, TypeError, UnicodeDecodeError) as error:
+        raise ValueError(f"corrupt replay keyframe: {error}") from error
+    if not isinstance(game, classes['MirrorKnightsGame']):
+        raise ValueError("replay keyframe does not hold a game")
+    return game, frame, random_state, quality, (danger_tick, threats)
+
+
+class ReplayRecorder:
+    def __init__(self, path, game, keyframe_interval=KEYFRAME_INTERVAL, tick_rate=60):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.handle = open(path, 'wb')
+        self.handle.write(REPLAY_MAGIC + HEADER.pack(tick_rate, keyframe_interval))
+        self.index = []
+        self.frame = 0
+        self.decisions = None
+        if game.boss_policy is not None:
+            self.decisions = DecisionRecorder(game.boss_policy)
+            attach_policy(game, (self.decisions, self.decisions))
+        self.keyframe(game)
+
+    def keyframe(self, game):
+        data = snapshot(game, self.frame)
+        offset = self.handle.tell()
+        self.handle.write(SEGMENT.pack(len(data)))
+        self.handle.write(data)
+        self.index.append((offset + SEGMENT.size, len(data), self.handle.tell(), 0))
+
+    def record(self, game, keys):
+        module = game_module(game)
+        self.handle.write(INPUT_RECORD.pack(
+            keys.mask if isinstance(keys, module.KeyBits) else module.pack_keys(keys),
+            self.decisions.take() if self.decisions is not None else NO_DECISION,
+            module.quality.level,
+        ))
+        keyframe, length, inputs, count = self.index[-1]
+        self.index[-1] = (keyframe, length, inputs, count + 1)
+        self.frame += 1
+        if self.frame % self.keyframe_interval == 0:
+            self.keyframe(game)
+
+    def close(self):
+        if self.handle.closed:
+            return
+        index_offset = self.handle.tell()
+        self.handle.write(np.array(self.index, dtype=INDEX).tobytes())
+        self.handle.write(FOOTER.pack(index_offset, len(self.index), FOOTER_MAGIC))
+        self.handle.close()
+
+
+class Replay:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as handle:
+            self.data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(REPLAY_MAGIC)] != REPLAY_MAGIC:
+            if self.data[:5] == REPLAY_MAGIC[:5]:
+                raise ValueError(f"{path} was recorded in an older replay format")
+            raise ValueError(f"{path} is not a replay file")
+        self.tick_rate, self.keyframe_interval = HEADER.unpack_from(self.data, len(REPLAY_MAGIC))
+        self.index = self.read_index()
+        self.frames = int(self.index['count'].sum())
+        self.playback = DecisionPlayback()
+
+    def read_index(self):
+        data = self.data
+        if len(data) >= FOOTER.size:
+            index_offset, count, magic = FOOTER.unpack_from(data, len(data) - FOOTER.size)
+            if magic == FOOTER_MAGIC:
+                return np.frombuffer(data, dtype=INDEX, count=count, offset=index_offset)
+        return self.scan()
+
+    def scan(self):
+        # No footer: the recording was cut short. Every segment but the last holds
+        # exactly keyframe_interval inputs, so the index can be rebuilt by skipping.
+        entries = []
+        offset = len(REPLAY_MAGIC) + HEADER.size
+        end = len(self.data)
+        while offset + SEGMENT.size <= end:
+            (length,) = SEGMENT.unpack_from(self.data, offset)
+            keyframe = offset + SEGMENT.size
+            inputs = keyframe + length
+            if inputs > end:
+                break
+            count = min(self.keyframe_interval, (end - inputs) // INPUT.itemsize)
+            entries.append((keyframe, length, inputs, count))
+            offset = inputs + count * INPUT.itemsize
+        if not entries:
+            raise ValueError(f"{self.path} holds no complete keyframe")
+        return np.array(entries, dtype=INDEX)
+
+    def inputs(self, segment):
+        entry = self.index[segment]
+        return np.frombuffer(self.data, dtype=INPUT, count=int(entry['count']), offset=int(entry['inputs']))
+
+    def restore(self, segment):
+        entry = self.index[segment]
+        offset = int(entry['keyframe'])
+        game, frame, random_state, quality, danger = restore_state(self.data[offset:offset + int(entry['length'])])
+        module = game_module(game)
+        random.setstate(random_state)
+        module.quality.level = quality
+        game.rebuild_danger(*danger)
+        attach_policy(game, (self.playback, self.playback))
+        return game, frame
+
+    def step(self, game, record):
+        module = game_module(game)
+        self.playback.decision = int(record['decision'])
+        module.quality.level = int(record['quality'])
+        game.update(module.KeyBits(int(record['keys'])))
+
+    def seek(self, frame):
+        # Nearest keyframe at or before frame, then at most keyframe_interval - 1 ticks.
+        frame = max(0, min(frame, self.frames))
+        segment = min(frame // self.keyframe_interval, len(self.index) - 1)
+        game, start = self.restore(segment)
+        for record in self.inputs(segment)[:frame - start]:
+            self.step(game, record)
+        return game
+
+    def play(self, start=0):
+        frame = max(0, min(start, self.frames))
+        game = self.seek(frame)
+        yield frame, game
+        segment = frame // self.keyframe_interval
+        skip = frame - segment * self.keyframe_interval
+        for segment in range(segment, len(self.index)):
+            for record in self.inputs(segment)[skip:]:
+                self.step(game, record)
+                frame += 1
+                yield frame, game
+            skip = 0
+
+    def close(self):
+        self.index = None
+        self.data.close()
+
+
+def watch(replay, start):
+    import gametest
+    backend = gametest.init_backend()
+    gametest.atlas.load_or_bake(gametest.asset_cache)
+    for _, game in replay.play(start):
+        for event in gametest.pygame.event.get():
+            if event.type == gametest.pygame.QUIT:
+                return
+        gametest.render_game(game, backend)
+        gametest.present(backend)
+        gametest.clock.tick(replay.tick_rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, seek and watch Mirror Knights replays recorded with --record")
+    parser.add_argument('path', help="replay file")
+    parser.add_argument('--seek', type=int, default=None, metavar='FRAME', help="restore the state at FRAME")
+    parser.add_argument('--watch', action='store_true', help="play back in a window from --seek (default: start)")
+    args = parser.parse_args(argv)
+
+    import gametest
+    gametest.init_headless()
+    replay = Replay(args.path)
+    print(f"{replay.frames} frames ({replay.frames / replay.tick_rate:.1f} s), {len(replay.index)} keyframes "
+          f"every {replay.keyframe_interval} frames, {os.path.getsize(args.path) / 1024:.1f} KiB")
+    if args.seek is not None:
+        start = time.perf_counter()
+        game = replay.seek(args.seek)
+        elapsed = time.perf_counter() - start
+        print(f"frame {args.seek}: fight {game.fight_id} tick {game.tick} {game.game_state}, phase {game.boss.phase}, "
+              f"player {game.player.health} boss {game.boss.health} (seek {elapsed * 1000:.1f} ms)")
+    if args.watch:
+        gametest.sounds.muted = False
+        watch(replay, args.seek or 0)
+    replay.close()
+
+
+if __name__ == '__main__':
+    main()
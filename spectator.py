@@ -0,0 +1,337 @@
+import argparse
+import asyncio
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+KIND_PLAYER, KIND_BOSS, KIND_PROJECTILE, KIND_HAZARD, KIND_LASER = range(1, 6)
+GAME_STATES = ('playing', 'game_over', 'victory')
+HAZARD_TYPES = ('spike', 'fire', 'poison', 'laser')
+
+# Positions are sent in quarter pixels; a 6400-wide arena still fits in an int16.
+POSITION_SCALE = 4
+KEYFRAME_INTERVAL = 60
+MAX_BUFFERED = 64 * 1024
+
+LENGTH = struct.Struct('<I')
+# kind (K/D), tick, keyframe sequence, phase, game state, records, removed ids
+FRAME = struct.Struct('<cIIBBHH')
+# id, kind, flags, x, y, width, height, value
+RECORD = struct.Struct('<HBBhhHHH')
+REMOVED = struct.Struct('<H')
+
+Entity = namedtuple('Entity', 'id kind flags x y width height value')
+
+
+def quantize(value):
+    return max(-32768, min(32767, int(round(value * POSITION_SCALE))))
+
+
+def clamp16(value):
+    return max(0, min(65535, int(value)))
+
+
+def flag_bits(*flags):
+    bits = 0
+    for index, flag in enumerate(flags):
+        if flag:
+            bits |= 1 << index
+    return bits
+
+
+def entity_fields(game):
+    player = game.player
+    boss = game.boss
+    yield player, KIND_PLAYER, flag_bits(
+        player.facing_right, player.attacking, player.blocking, player.dash_duration > 0,
+        player.invincibility > 0, player.on_ground,
+    ), player.x, player.y, player.width, player.height, player.health
+    yield boss, KIND_BOSS, flag_bits(
+        boss.facing_right, boss.is_visible, boss.attacking, boss.dash_duration > 0,
+        boss.invincibility > 0, boss.phase_shifting,
+    ), boss.x, boss.y, boss.width, boss.height, boss.health
+    for projectile in boss.projectiles:
+        yield projectile, KIND_PROJECTILE, flag_bits(projectile.homing), \
+            projectile.x, projectile.y, projectile.size, projectile.size, projectile.lifetime
+    for hazard in boss.hazards:
+        type_code = HAZARD_TYPES.index(hazard.type) if hazard.type in HAZARD_TYPES else 0
+        yield hazard, KIND_HAZARD, flag_bits(hazard.active) | type_code << 4, \
+            hazard.x, hazard.y, hazard.width, hazard.height, hazard.lifetime
+    for laser in boss.lasers:
+        yield laser, KIND_LASER, flag_bits(laser.active, laser.warning_shown), \
+            laser.x, laser.y, laser.width, laser.height, laser.lifetime
+
+
+class StateEncoder:
+    # Encodes each tick once, however many viewers there are. Deltas are taken against
+    # the last keyframe rather than the previous tick, so a viewer can skip any number
+    # of deltas and still decode the next one.
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.ids = {}
+        self.free_ids = []
+        self.next_id = 1
+        self.keyframe_rows = {}
+        self.keyframe_seq = 0
+        self.frames = 0
+
+    def entity_id(self, entity, seen):
+        key = id(entity)
+        entry = self.ids.get(key)
+        if entry is None:
+            sid = self.free_ids.pop() if self.free_ids else self.next_id
+            if sid == self.next_id:
+                self.next_id += 1
+            # Holding the entity keeps its id() from being reused while it is mapped.
+            entry = self.ids[key] = (entity, sid)
+        seen.add(key)
+        return entry[1]
+
+    def rows(self, game):
+        rows = {}
+        seen = set()
+        for entity, kind, flags, x, y, width, height, value in entity_fields(game):
+            sid = self.entity_id(entity, seen)
+            rows[sid] = RECORD.pack(sid, kind, flags, quantize(x), quantize(y),
+                                    clamp16(width), clamp16(height), clamp16(value))
+        for key in [key for key in self.ids if key not in seen]:
+            self.free_ids.append(self.ids.pop(key)[1])
+        return rows
+
+    def encode(self, game):
+        rows = self.rows(game)
+        keyframe = self.frames % self.keyframe_interval == 0
+        self.frames += 1
+        state = GAME_STATES.index(game.game_state) if game.game_state in GAME_STATES else 0
+        if keyframe:
+            self.keyframe_seq += 1
+            self.keyframe_rows = rows
+            changed = list(rows.values())
+            removed = []
+        else:
+            base = self.keyframe_rows
+            changed = [row for sid, row in rows.items() if base.get(sid) != row]
+            removed = [sid for sid in base if sid not in rows]
+        body = b''.join((
+            FRAME.pack(b'K' if keyframe else b'D', game.tick, self.keyframe_seq, game.boss.phase, state,
+                       len(changed), len(removed)),
+            *changed,
+            *(REMOVED.pack(sid) for sid in removed),
+        ))
+        return LENGTH.pack(len(body)) + body, keyframe, self.keyframe_seq
+
+
+class Viewer:
+    def __init__(self, writer):
+        self.writer = writer
+        self.keyframe_seq = None
+        self.sent = 0
+        self.skipped = 0
+
+
+class SpectatorServer:
+    def __init__(self, host='127.0.0.1', port=0, keyframe_interval=KEYFRAME_INTERVAL, max_buffered=MAX_BUFFERED):
+        self.host = host
+        self.port = port
+        self.max_buffered = max_buffered
+        self.encoder = StateEncoder(keyframe_interval)
+        self.viewers = set()
+        self.keyframe = None
+        self.keyframe_seq = None
+        self.loop = None
+        self.stopping = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='spectator-server', daemon=True)
+        self.published = 0
+        self.bytes_published = 0
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with server:
+            await self.stopping.wait()
+        # Hang up on every viewer and let the handlers finish before the loop goes away.
+        writers = [viewer.writer for viewer in self.viewers]
+        for writer in writers:
+            if writer.transport.get_write_buffer_size():
+                # A stalled viewer would never drain, so its wait would never end.
+                writer.transport.abort()
+            else:
+                writer.close()
+        for writer in writers:
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def handle(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        viewer = Viewer(writer)
+        self.viewers.add(viewer)
+        if self.keyframe is not None:
+            writer.write(self.keyframe)
+            viewer.keyframe_seq = self.keyframe_seq
+        try:
+            # Viewers never send anything; reading just notices when they hang up.
+            while await reader.read(1024):
+                pass
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled only when the server shuts down; there is nobody left to tell.
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            writer.close()
+
+    def publish(self, game, keys=None):
+        # Called on the game thread once per tick; encoding happens here, once.
+        if self.loop is None:
+            return
+        frame, keyframe, seq = self.encoder.encode(game)
+        self.published += 1
+        self.bytes_published += len(frame)
+        self.loop.call_soon_threadsafe(self.broadcast, frame, keyframe, seq)
+
+    def broadcast(self, frame, keyframe, seq):
+        if keyframe:
+            self.keyframe = frame
+            self.keyframe_seq = seq
+        for viewer in list(self.viewers):
+            transport = viewer.writer.transport
+            if transport.is_closing():
+                self.viewers.discard(viewer)
+                continue
+            if transport.get_write_buffer_size() > self.max_buffered:
+                # Slow viewer: skip this frame instead of queueing without bound.
+                viewer.skipped += 1
+                continue
+            if viewer.keyframe_seq != seq and not keyframe:
+                # It missed the keyframe this delta is based on; resync first.
+                transport.write(self.keyframe)
+            transport.write(frame)
+            viewer.keyframe_seq = seq
+            viewer.sent += 1
+
+    def stats(self):
+        return {
+            'viewers': len(self.viewers),
+            'published': self.published,
+            'bytes_per_frame': self.bytes_published / max(1, self.published),
+            'skipped': sum(viewer.skipped for viewer in self.viewers),
+        }
+
+    def close(self):
+        if self.loop is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stopping.set)
+            self.thread.join(timeout=2)
+
+
+class SpectatorDecoder:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.keyframe = None
+        self.keyframe_seq = None
+        self.entities = {}
+        self.tick = 0
+        self.phase = 1
+        self.state = GAME_STATES[0]
+
+    def feed(self, data):
+        self.buffer += data
+        updated = 0
+        while len(self.buffer) >= LENGTH.size:
+            (length,) = LENGTH.unpack_from(self.buffer)
+            end = LENGTH.size + length
+            if len(self.buffer) < end:
+                break
+            self.apply(memoryview(self.buffer)[LENGTH.size:end])
+            del self.buffer[:end]
+            updated += 1
+        return updated
+
+    def apply(self, body):
+        kind, tick, seq, phase, state, count, removed = FRAME.unpack_from(body)
+        offset = FRAME.size
+        records = {}
+        for _ in range(count):
+            sid, entity_kind, flags, x, y, width, height, value = RECORD.unpack_from(body, offset)
+            records[sid] = Entity(sid, entity_kind, flags, x / POSITION_SCALE, y / POSITION_SCALE,
+                                  width, height, value)
+            offset += RECORD.size
+        gone = [REMOVED.unpack_from(body, offset + index * REMOVED.size)[0] for index in range(removed)]
+
+        if kind == b'K':
+            self.keyframe = records
+            self.keyframe_seq = seq
+            self.entities = dict(records)
+        elif seq == self.keyframe_seq:
+            entities = dict(self.keyframe)
+            entities.update(records)
+            for sid in gone:
+                entities.pop(sid, None)
+            self.entities = entities
+        else:
+            return
+        self.tick = tick
+        self.phase = phase
+        self.state = GAME_STATES[state] if state < len(GAME_STATES) else GAME_STATES[0]
+
+
+def parse_address(text, default_host='127.0.0.1'):
+    host, _, port = text.rpartition(':')
+    return host or default_host, int(port)
+
+
+async def watch(host, port, seconds=None, interval=1.0):
+    reader, writer = await asyncio.open_connection(host, port)
+    decoder = SpectatorDecoder()
+    start = last = time.perf_counter()
+    frames = received = 0
+    try:
+        while seconds is None or time.perf_counter() - start < seconds:
+            data = await reader.read(65536)
+            if not data:
+                break
+            received += len(data)
+            frames += decoder.feed(data)
+            now = time.perf_counter()
+            if now - last >= interval:
+                print(f"tick {decoder.tick} phase {decoder.phase} {decoder.state}: {len(decoder.entities)} entities, "
+                      f"{frames / (now - last):.0f} frames/s, {received / (now - last) / 1024:.1f} KiB/s")
+                frames = received = 0
+                last = now
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a Mirror Knights fight broadcast with --spectate")
+    parser.add_argument('address', help="HOST:PORT of the spectator server")
+    parser.add_argument('--seconds', type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args(argv)
+    host, port = parse_address(args.address)
+    try:
+        asyncio.run(watch(host, port, args.seconds))
+    except ConnectionRefusedError:
+        print(f"no spectator server at {host}:{port}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
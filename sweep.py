@@ -0,0 +1,230 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import sys
+
+# Results go to stdout as JSON; keep pygame's import banner out of it.
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import gametest
+from arena import load_arena
+from gametest import KeyBits, MirrorKnightsGame
+from planner import player_model
+
+CACHE_DIR = '.sweep_cache'
+SIM_SOURCES = ('gametest.py', 'arena.py', 'timers.py', 'planner.py', 'boss_policy.py', 'sweep.py')
+MAX_TICKS = 18000
+MAX_DT = 4
+
+TUNABLE = (
+    'phase_shift_threshold',
+    'learning_timer_max',
+    'attack_cooldown_max',
+    'dash_cooldown_max',
+    'projectile_cooldown_max',
+    'hazard_cooldown_max',
+    'decision_timer_max',
+    'aggression',
+    'dash_frequency',
+    'pattern_damage',
+)
+
+
+def code_version(arena_name='default'):
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for name in SIM_SOURCES:
+        with open(os.path.join(root, name), 'rb') as handle:
+            digest.update(handle.read())
+    arena = load_arena(arena_name)
+    digest.update(json.dumps([arena.name, arena.width, arena.solids, arena.ledges, arena.hazard_zones]).encode())
+    return digest.hexdigest()[:16]
+
+
+def config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def grid_configs(space):
+    names = sorted(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def sample_value(rng, spec):
+    if isinstance(spec, dict):
+        low, high = spec['low'], spec['high']
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return round(rng.uniform(low, high), 4)
+    return rng.choice(spec)
+
+
+def random_configs(space, count, seed=0):
+    rng = random.Random(seed)
+    names = sorted(space)
+    for _ in range(count):
+        yield {name: sample_value(rng, space[name]) for name in names}
+
+
+def apply_config(boss, config):
+    for name, value in config.items():
+        # Dotted names reach into dict attributes, e.g. pattern_damage.homing.
+        attribute, _, key = name.partition('.')
+        if attribute not in TUNABLE:
+            raise ValueError(f"unknown boss parameter: {name}")
+        if key:
+            getattr(boss, attribute)[key] = value
+        elif isinstance(getattr(boss, attribute), dict):
+            getattr(boss, attribute).update(value)
+        else:
+            setattr(boss, attribute, list(value) if isinstance(value, (list, tuple)) else value)
+    if 'attack_cooldown_max' in config:
+        boss.base_attack_cooldown = boss.attack_cooldown_max
+    if 'dash_cooldown_max' in config:
+        boss.base_dash_cooldown = boss.dash_cooldown_max
+
+
+def run_fight(config, seed, max_ticks=MAX_TICKS, max_dt=MAX_DT, arena_name='default'):
+    random.seed(seed)
+    game = MirrorKnightsGame(arena=load_arena(arena_name))
+    apply_config(game.boss, config)
+    while game.game_state == "playing" and game.tick < max_ticks:
+        game.fast_forward(player_model(game, KeyBits), max_dt)
+    return {
+        'outcome': game.game_state,
+        'ticks': game.tick,
+        'player_health': game.player.health,
+        'boss_health': game.boss.health,
+        'phase': game.boss.phase,
+        'adaptations': len(game.boss.adaptations),
+    }
+
+
+def init_worker():
+    gametest.init_headless()
+
+
+def run_job(job):
+    key, config, seed, max_ticks, max_dt, arena_name = job
+    return key, run_fight(config, seed, max_ticks, max_dt, arena_name)
+
+
+class SweepCache:
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, 'results.jsonl')
+        self.results = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as handle:
+                for line in handle:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.results[entry['key']] = entry['result']
+
+    @staticmethod
+    def key(config, seed, version, max_ticks, max_dt):
+        return f"{config_hash(config)}-{seed}-{version}-{max_ticks}-{max_dt}"
+
+    def __contains__(self, key):
+        return key in self.results
+
+    def get(self, key):
+        return self.results[key]
+
+    def store(self, key, result):
+        os.makedirs(self.directory, exist_ok=True)
+        self.results[key] = result
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps({'key': key, 'result': result}) + '\n')
+
+
+def summarize(config, results):
+    fights = len(results)
+    boss_wins = sum(1 for result in results if result['outcome'] == 'game_over')
+    return {
+        'config': config,
+        'fights': fights,
+        'boss_win_rate': boss_wins / fights,
+        'timeout_rate': sum(1 for result in results if result['outcome'] == 'playing') / fights,
+        'mean_ticks': sum(result['ticks'] for result in results) / fights,
+        'mean_phase': sum(result['phase'] for result in results) / fights,
+        'mean_player_health': sum(result['player_health'] for result in results) / fights,
+        'mean_boss_health': sum(result['boss_health'] for result in results) / fights,
+    }
+
+
+def sweep(configs, seeds, cache, workers=None, max_ticks=MAX_TICKS, max_dt=MAX_DT, arena_name='default'):
+    version = code_version(arena_name)
+    configs = list(configs)
+    jobs = []
+    keys = []
+    for config in configs:
+        config_keys = []
+        for seed in seeds:
+            key = cache.key(config, seed, version, max_ticks, max_dt)
+            config_keys.append(key)
+            if key not in cache:
+                jobs.append((key, config, seed, max_ticks, max_dt, arena_name))
+        keys.append(config_keys)
+
+    # Identical cells from overlapping grids only need simulating once.
+    jobs = list({job[0]: job for job in jobs}.values())
+    if jobs:
+        workers = workers or mp.cpu_count()
+        if workers == 1:
+            init_worker()
+            for job in jobs:
+                cache.store(*run_job(job))
+        else:
+            with mp.Pool(workers, initializer=init_worker) as pool:
+                for key, result in pool.imap_unordered(run_job, jobs):
+                    cache.store(key, result)
+
+    summaries = [summarize(config, [cache.get(key) for key in config_keys])
+                 for config, config_keys in zip(configs, keys)]
+    return summaries, len(jobs)
+
+
+def load_space(text):
+    if os.path.exists(text):
+        with open(text, encoding='utf-8') as handle:
+            return json.load(handle)
+    return json.loads(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memoized boss-balance parameter sweeps over headless fights")
+    parser.add_argument('space', help="JSON search space (file path or inline): name -> list of values, "
+                                      "or {\"low\": a, \"high\": b} ranges with --random")
+    parser.add_argument('--random', type=int, default=None, metavar='N',
+                        help="sample N random configurations instead of the full grid")
+    parser.add_argument('--sample-seed', type=int, default=0, help="seed for --random sampling")
+    parser.add_argument('--seeds', type=int, default=8, help="fights per configuration (seeds 0..N-1)")
+    parser.add_argument('--workers', type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument('--cache', default=CACHE_DIR, help="memo directory")
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS, help="tick limit per fight")
+    parser.add_argument('--max-dt', type=int, default=MAX_DT, help="largest simulation step in ticks")
+    parser.add_argument('--arena', default='default', help="arena name or .json path")
+    args = parser.parse_args(argv)
+
+    space = load_space(args.space)
+    if args.random is not None:
+        configs = random_configs(space, args.random, args.sample_seed)
+    else:
+        configs = grid_configs(space)
+
+    summaries, simulated = sweep(configs, range(args.seeds), SweepCache(args.cache), args.workers,
+                                 args.max_ticks, args.max_dt, args.arena)
+    print(f"simulated {simulated} new fights", file=sys.stderr)
+    summaries.sort(key=lambda summary: abs(summary['boss_win_rate'] - 0.5))
+    json.dump(summaries, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import json
+import struct
+import threading
+from collections import deque
+
+EVENT_TYPES = (
+    'hit',
+    'block',
+    'dash',
+    'phase_shift',
+    'adaptation',
+    'projectile_spawn',
+    'hazard_spawn',
+    'death',
+)
+
+ACTORS = ('none', 'player', 'boss')
+
+SOURCES = (
+    'none',
+    'melee',
+    'projectile',
+    'hazard',
+    'laser',
+    'single',
+    'triple',
+    'circle',
+    'homing',
+    'barrage',
+    'random',
+    'targeted',
+    'grid',
+    'walls',
+    'counter_aggression',
+    'counter_mobility',
+    'counter_defense',
+    'area_denial',
+    'position_preference',
+)
+
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+ACTOR_CODES = {name: code for code, name in enumerate(ACTORS)}
+SOURCE_CODES = {name: code for code, name in enumerate(SOURCES)}
+
+# tick, fight, type, actor, source, phase, value, x, y
+RECORD = struct.Struct('<IIBBBBfff')
+BINARY_MAGIC = b'MKTEL\x01\x00\x00'
+
+
+class TelemetryWriter:
+    def __init__(self, path, binary=None, capacity=65536, flush_interval=0.25):
+        if binary is None:
+            binary = path.endswith('.bin')
+        self.path = path
+        self.binary = binary
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        # deque.append/popleft are atomic, so the frame loop never takes a lock.
+        self.buffer = deque()
+        self.dropped = 0
+        self.written = 0
+        self.stopping = threading.Event()
+        self.handle = open(path, 'ab' if binary else 'a', encoding=None if binary else 'utf-8')
+        if binary and self.handle.tell() == 0:
+            self.handle.write(BINARY_MAGIC)
+        self.thread = threading.Thread(target=self.run, name='telemetry-writer', daemon=True)
+        self.thread.start()
+
+    def push(self, record):
+        if len(self.buffer) >= self.capacity:
+            self.dropped += 1
+            return
+        self.buffer.append(record)
+
+    def encode(self, record):
+        tick, fight, event_type, actor, source, phase, value, x, y = record
+        if self.binary:
+            return RECORD.pack(
+                tick, fight,
+                EVENT_CODES[event_type],
+                ACTOR_CODES.get(actor, 0),
+                SOURCE_CODES.get(source, 0),
+                phase, value, x, y,
+            )
+        return json.dumps({
+            'tick': tick,
+            'fight': fight,
+            'type': event_type,
+            'actor': actor,
+            'source': source,
+            'phase': phase,
+            'value': value,
+            'x': round(x, 1),
+            'y': round(y, 1),
+        }) + '\n'
+
+    def drain(self):
+        chunks = []
+        buffer = self.buffer
+        while buffer:
+            chunks.append(self.encode(buffer.popleft()))
+        if chunks:
+            self.handle.write((b'' if self.binary else '').join(chunks))
+            self.handle.flush()
+            self.written += len(chunks)
+
+    def run(self):
+        while not self.stopping.wait(self.flush_interval):
+            self.drain()
+        self.drain()
+
+    def close(self):
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.handle.close()
+
+
+class EventBus:
+    def __init__(self):
+        self.writers = []
+        self.tick = 0
+        self.fight = 0
+        self.phase = 1
+
+    @property
+    def enabled(self):
+        return bool(self.writers)
+
+    def attach(self, writer):
+        self.writers.append(writer)
+        return writer
+
+    def begin_tick(self, fight, tick, phase):
+        self.fight = fight
+        self.tick = tick
+        self.phase = phase
+
+    def emit(self, event_type, actor='none', source='none', phase=None, value=0.0, x=0.0, y=0.0):
+        if not self.writers:
+            return
+        if phase is None:
+            phase = self.phase
+        record = (self.tick, self.fight, event_type, actor, source, phase, float(value), float(x), float(y))
+        for writer in self.writers:
+            writer.push(record)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+        self.writers = []
@@ -0,0 +1,38 @@
+import os
+
+from analytics import read_telemetry
+from telemetry import RECORD, EventBus, TelemetryWriter
+
+
+def write_events(path, count):
+    bus = EventBus()
+    bus.attach(TelemetryWriter(path))
+    for tick in range(count):
+        bus.begin_tick(2, tick, 1 + tick % 3)
+        bus.emit('hit', actor='player', source='melee', value=tick * 0.5, x=tick, y=-tick)
+    bus.close()
+
+
+def test_binary_and_ndjson_round_trip(tmp_path):
+    for name in ('events.bin', 'events.ndjson'):
+        path = str(tmp_path / name)
+        write_events(path, 40)
+        columns = read_telemetry(path)
+        assert list(columns['tick']) == list(range(40))
+        assert set(columns['fight']) == {2}
+        assert list(columns['phase'][:4]) == [1, 2, 3, 1]
+        assert columns['value'][10] == 5.0
+        assert (columns['x'][39], columns['y'][39]) == (39.0, -39.0)
+
+
+def test_a_partial_trailing_record_is_ignored(tmp_path):
+    path = str(tmp_path / 'events.bin')
+    write_events(path, 5)
+    with open(path, 'ab') as handle:
+        handle.write(b'\x07' * (RECORD.size // 2))
+    assert list(read_telemetry(path)['tick']) == list(range(5))
+
+    # A file holding only the header, as written before the first flush.
+    with open(path, 'r+b') as handle:
+        handle.truncate(os.path.getsize(path) - 5 * RECORD.size - RECORD.size // 2)
+    assert len(read_telemetry(path)['tick']) == 0
@@ -0,0 +1,52 @@
+import glob
+import os
+import random
+
+import pytest
+
+from arena import ARENA_DIR, load_arena
+
+NAMES = sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(ARENA_DIR, '*.json')))
+
+
+def scanned_landing(arena, x, width, old_bottom, new_bottom, drop=False):
+    # Every surface checked directly, without the slab index.
+    tops = [(y, True) for sx, y, sw, _ in arena.solids if sx < x + width and sx + sw > x]
+    tops += [(y, False) for lx, y, lw in arena.ledges if lx < x + width and lx + lw > x]
+    hits = [y for y, solid in tops if old_bottom <= y <= new_bottom and (solid or not drop)]
+    return min(hits) if hits else None
+
+
+@pytest.mark.parametrize('name', NAMES)
+def test_bundled_arenas_load_with_spawns_inside(name):
+    arena = load_arena(name)
+    assert arena.name == name
+    assert load_arena(name) is arena
+    for spawn in ('player', 'boss'):
+        x, y = arena.spawn(spawn, None)
+        assert 0 <= x < arena.width and 0 <= y < arena.floor
+
+
+@pytest.mark.parametrize('name', NAMES)
+def test_landing_matches_a_surface_scan(name):
+    arena = load_arena(name)
+    rng = random.Random(name)
+    for _ in range(2000):
+        x = rng.uniform(0, arena.width - 40)
+        old_bottom = rng.uniform(0, arena.floor)
+        new_bottom = old_bottom + rng.uniform(0, 120)
+        drop = rng.random() < 0.3
+        assert arena.landing(x, 40, old_bottom, new_bottom, drop) == scanned_landing(
+            arena, x, 40, old_bottom, new_bottom, drop)
+
+
+def test_walls_stop_horizontal_movement():
+    arena = load_arena('towers')
+    # The right wall spans y 300-500, so a knight standing on the floor runs into it.
+    x, hit = arena.resolve_x(700, 760, 40, 420, 499)
+    assert (x, hit) == (740, True)
+    x, hit = arena.resolve_x(60, 0, 40, 420, 499)
+    assert (x, hit) == (20, True)
+    # Above the walls only the arena edge stops it.
+    assert arena.resolve_x(700, 790, 40, 100, 180) == (760, True)
+    assert arena.resolve_x(300, 340, 40, 100, 180) == (340, False)
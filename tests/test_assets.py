@@ -0,0 +1,44 @@
+import wave
+
+import pygame
+import pytest
+
+import gametest
+from gametest import AssetCache, SoundBank
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = AssetCache(str(tmp_path / 'cache'))
+    monkeypatch.setattr(gametest, 'asset_cache', cache)
+    return cache
+
+
+def write_wav(path):
+    with wave.open(str(path), 'wb') as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(22050)
+        handle.writeframes(bytes(range(256)) * 40)
+
+
+def test_cached_sounds_release_their_mapping(tmp_path, cache):
+    write_wav(tmp_path / 'blip.wav')
+    first = SoundBank(str(tmp_path))
+    if not first.mixer_ready():
+        pytest.skip('no audio mixer')
+    decoded = first.get('blip.wav').get_raw()
+
+    mapped = []
+    map_file = cache.map_file
+
+    def record(name):
+        pcm = map_file(name)
+        mapped.append(pcm)
+        return pcm
+
+    cache.map_file = record
+    sound = SoundBank(str(tmp_path)).get('blip.wav')
+    assert len(mapped) == 1 and mapped[0] is not None and mapped[0].closed
+    assert sound.get_raw() == decoded
+    pygame.mixer.quit()
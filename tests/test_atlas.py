@@ -0,0 +1,39 @@
+import pygame
+
+from gametest import ALPHA_LEVELS, RED, WHITE, SpriteAtlas, font_small
+from render import dirty_since
+
+
+def test_regions_are_packed_once_and_never_overlap():
+    atlas = SpriteAtlas(64, 32)
+    rects = [atlas.disc(RED, radius) for radius in range(1, 12)]
+    rects.append(atlas.knight(30, 40, RED, 4, True))
+    assert atlas.disc(RED, 5) is rects[4]
+    for index, rect in enumerate(rects):
+        assert atlas.surface.get_rect().contains(rect)
+        assert not any(rect.colliderect(other) for other in rects[index + 1:])
+    # The atlas grew to fit, keeping the sprites already painted in place.
+    assert atlas.surface.get_height() > 32
+    x, y, _, _ = rects[0]
+    assert atlas.surface.get_at((x + 1, y + 1))[:3] == RED
+
+
+def test_faded_discs_and_text_are_painted_into_their_region():
+    atlas = SpriteAtlas()
+    rect = atlas.disc(RED, 6, ALPHA_LEVELS // 2)
+    assert atlas.surface.get_at(rect.center)[:3] == tuple(c // 2 for c in RED)
+    text = atlas.text(font_small, 'HUD', WHITE)
+    assert text.size == font_small.size('HUD')
+    assert pygame.mask.from_surface(atlas.surface.subsurface(text)).count()
+
+
+def test_dirty_log_lists_only_new_regions():
+    atlas = SpriteAtlas()
+    atlas.knight(30, 40, RED, 4, False)
+    revision = atlas.revision
+    added = [atlas.disc(RED, radius) for radius in (3, 4)]
+    atlas.disc(RED, 3)
+    assert dirty_since(atlas, revision) == added
+    assert dirty_since(atlas, atlas.revision) == []
+    atlas.reset_dirty()
+    assert dirty_since(atlas, revision) is None
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pygame
+
+from capture import RAW_HEADER, FrameCapture, FrameRing
+
+SIZE = (16, 8)
+
+
+def frame(value):
+    surface = pygame.Surface(SIZE)
+    surface.fill((value, 255 - value, 7))
+    return surface
+
+
+def test_ring_mode_keeps_the_most_recent_frames():
+    capture = FrameCapture(SIZE, slots=3)
+    try:
+        for value in range(10):
+            assert capture.capture(frame(value))
+        assert capture.stats() == {'captured': 10, 'dropped': 0, 'encoded': 0}
+        assert capture.latest()[0, 0].tolist() == [9, 246, 7]
+        # Another process attaches by name and sees the last three frames in their slots.
+        ring = FrameRing(SIZE, slots=3, name=capture.ring.name)
+        assert sorted(ring.frame_numbers.tolist()) == [7, 8, 9]
+        assert sorted(ring.frames[:, 0, 0, 0].tolist()) == [7, 8, 9]
+        ring.close()
+    finally:
+        capture.close()
+
+
+def test_raw_capture_writes_every_frame_in_order(tmp_path):
+    capture = FrameCapture(SIZE, directory=str(tmp_path), slots=4)
+    for value in range(6):
+        while not capture.capture(frame(value)):
+            # The encoder is behind; give it a moment rather than lose the frame.
+            capture.encoder.join(0.01)
+    capture.close()
+    assert capture.stats()['encoded'] == 6
+
+    with open(os.path.join(tmp_path, 'frames.rgb'), 'rb') as handle:
+        header = handle.readline().decode()
+        pixels = np.frombuffer(handle.read(), dtype=np.uint8)
+    assert header == RAW_HEADER.format(width=16, height=8, order='xy')
+    frames = pixels.reshape(6, 16, 8, 3)
+    assert frames[:, 3, 5, 0].tolist() == list(range(6))
@@ -0,0 +1,12 @@
+import pytest
+
+from gametest import parse_args
+
+
+def test_render_scale_is_rejected_without_the_surface_renderer(capsys):
+    assert parse_args(['--render-scale', '0.5']).render_scale == 0.5
+    assert parse_args(['--renderer', 'sdl2']).render_scale == 1.0
+    for renderer in ('sdl2', 'null'):
+        with pytest.raises(SystemExit):
+            parse_args(['--renderer', renderer, '--render-scale', '0.5'])
+        assert '--render-scale only applies' in capsys.readouterr().err
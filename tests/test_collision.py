@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from gametest import RED, KeyBits, Laser, MirrorKnightsGame, Projectile
+
+STEPS = (1, 2, 4, 8)
+
+
+def quiet_game():
+    random.seed(0)
+    game = MirrorKnightsGame()
+    boss = game.boss
+    # Park the boss on a decision it can never act on, then let both knights land.
+    boss.current_decision = 'projectile'
+    boss.projectile_cooldown = 10 ** 6
+    boss.decision_timer = 10 ** 6
+    for _ in range(16):
+        game.update(KeyBits())
+    return game
+
+
+def run(game, dt, ticks, keys, first=None):
+    for step in range(ticks // dt):
+        game.update(first if step == 0 and first is not None else keys, dt)
+
+
+def dash_through_projectile(dt):
+    game = quiet_game()
+    player = game.player
+    y = player.y + player.height / 2
+    game.boss.spawn(game.boss.projectiles, Projectile(260, y, 0, y, 2, 8, RED, 10))
+    run(game, dt, 40, KeyBits.from_names('right', 'dash'))
+    return player.max_health - player.health, len(game.boss.projectiles), player.x
+
+
+def laser_sweep(dt):
+    game = quiet_game()
+    player = game.player
+    laser = Laser(300, 0, -10, 10, lifetime=120, warning_time=8, timers=game.timers, arena=game.arena)
+    game.boss.spawn(game.boss.lasers, laser)
+    run(game, dt, 64, KeyBits())
+    return player.max_health - player.health
+
+
+def melee(dt):
+    game = quiet_game()
+    player = game.player
+    boss = game.boss
+    # The boss dashes in from out of reach, so coarse steps would skip past the swing.
+    boss.x = boss.prev_x = player.x + player.width + 150
+    boss.dash_direction = -1
+    boss.dash_duration = boss.dash_duration_max
+    run(game, dt, 24, KeyBits(), first=KeyBits.from_names('attack'))
+    return boss.max_health - boss.health
+
+
+# Expected values are what the original one-tick loop produced for the same scenes.
+
+def test_dash_covers_baseline_distance():
+    assert dash_through_projectile(1)[2] == 370
+
+
+@pytest.mark.parametrize('dt', STEPS)
+def test_dash_through_projectile(dt):
+    damage, projectiles, _ = dash_through_projectile(dt)
+    assert (damage, projectiles) == (0, 0)
+
+
+@pytest.mark.parametrize('dt', STEPS)
+def test_laser_sweep(dt):
+    assert laser_sweep(dt) == 10
+
+
+@pytest.mark.parametrize('dt', STEPS)
+def test_melee(dt):
+    assert melee(dt) == 5
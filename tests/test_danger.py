@@ -0,0 +1,54 @@
+import math
+import random
+
+from arena import Arena
+from gametest import RED, DangerField, KeyBits, Laser, MirrorKnightsGame, Projectile
+from timers import TimerWheel
+
+NARROW = {'width': 800, 'height': 600, 'floor': 500,
+          'hazard_zones': [{'x': 300, 'y': 0, 'width': 150, 'height': 500}]}
+
+
+def scanned(field, x, y):
+    # What the ring says without the per-cell earliest layer.
+    cell = field.cell_of(x, y)
+    if cell is None:
+        return math.inf
+    ring = field.occupancy[cell[0] * field.cols + cell[1]]
+    for step in range(field.horizon):
+        if ring[(field.tick + step) % field.span]:
+            return min(float(field.hazard_layer[cell] - field.tick), float(step))
+    return max(0.0, float(field.hazard_layer[cell] - field.tick))
+
+
+def test_lookups_match_a_ring_scan():
+    random.seed(1)
+    timers = TimerWheel()
+    field = DangerField(800, 500)
+    projectiles = [Projectile(50, 100 + 40 * i, 750, 300, 3 + i, 8, RED, 10) for i in range(4)]
+    lasers = [Laser(400, 0, 4, 10, lifetime=150, warning_time=20, timers=timers)]
+    for tick in range(1, 160):
+        timers.advance(tick)
+        for projectile in projectiles:
+            projectile.update()
+        for laser in lasers:
+            laser.update()
+        if tick == 60:
+            projectiles.pop(1)
+        field.refresh(tick, [], projectiles, lasers)
+        for x in range(10, 800, 70):
+            for y in range(10, 500, 45):
+                assert field.time_to_impact(x, y) == scanned(field, x, y)
+
+
+def test_random_hazard_falls_back_when_the_zone_is_blocked():
+    random.seed(5)
+    game = MirrorKnightsGame(arena=Arena(NARROW))
+    for _ in range(20):
+        game.update(KeyBits())
+    player = game.player
+    player.x = 375 - player.width / 2
+    for _ in range(10):
+        game.boss.create_hazard(player, 'random')
+    # Every pick in the zone lands within reach of the player, so each becomes targeted.
+    assert [hazard.width for hazard in game.boss.hazards] == [100] * 10
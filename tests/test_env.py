@@ -0,0 +1,35 @@
+import numpy as np
+
+from mirror_env import ACTIONS, MirrorKnightsEnv, SubprocVecEnv, observation_size
+
+
+def test_env_steps_until_the_fight_ends():
+    env = MirrorKnightsEnv(max_steps=50, pixels=True, pixel_size=(32, 24))
+    observation, info = env.reset(seed=3)
+    assert observation['state'].shape == (observation_size(),)
+    assert observation['pixels'].shape == (24, 32, 3)
+    assert info['steps'] == 0
+    for step in range(1, 51):
+        observation, reward, terminated, truncated, info = env.step(ACTIONS.index(('right', 'attack')))
+        if terminated:
+            break
+    assert info['steps'] == step
+    assert truncated or terminated
+    assert observation['pixels'].any()
+
+
+def test_vector_env_with_more_workers_than_envs():
+    env = SubprocVecEnv(2, num_workers=4, env_kwargs={'max_steps': 20})
+    try:
+        assert len(env.processes) == 2
+        observations = env.reset()
+        assert observations.shape == (2, observation_size())
+        first = observations.copy()
+        for _ in range(5):
+            observations, rewards, dones = env.step(np.array([2, 1]))
+        assert rewards.shape == dones.shape == (2,)
+        # Moving right and left pulls the two players apart.
+        assert not np.array_equal(observations[0], observations[1])
+        assert not np.array_equal(observations, first)
+    finally:
+        env.close()
@@ -0,0 +1,32 @@
+import pytest
+
+from gametest import TICK_RATE, FrameSkipper
+
+
+def run(skipper, frame_time, seconds):
+    now = 100.0
+    ticks = [skipper.ticks_due(now)]
+    for _ in range(round(seconds / frame_time)):
+        now += frame_time
+        ticks.append(skipper.ticks_due(now))
+    return ticks, now
+
+
+@pytest.mark.parametrize('fps', [60, 30, 20, 13])
+def test_ticks_follow_wall_time_at_any_draw_rate(fps):
+    skipper = FrameSkipper(max_skip=5)
+    ticks, _ = run(skipper, 1.0 / fps, 2.0)
+    # Gameplay advances TICK_RATE ticks per second however often frames are drawn.
+    assert abs(sum(ticks) - 1 - 2 * TICK_RATE) <= 1
+    assert skipper.dropped_ticks == 0
+    assert skipper.skipped_draws == sum(count - 1 for count in ticks if count > 1)
+
+
+def test_ticks_beyond_the_budget_are_dropped_and_reported():
+    skipper = FrameSkipper(max_skip=2, report_interval=1.0)
+    ticks, now = run(skipper, 0.25, 1.0)
+    # 15 ticks fall due per frame, but only max_skip + 1 run.
+    assert ticks == [1, 3, 3, 3, 3]
+    assert skipper.dropped_ticks == 4 * (15 - 3)
+    assert skipper.report(now).startswith('frame skip: dropped 48 ticks')
+    assert skipper.report(now + 2.0) is None
@@ -0,0 +1,63 @@
+import random
+
+from boss_policy import DECISIONS
+from gametest import KeyBits, MirrorKnightsGame
+from planner import MonteCarloPlanner
+
+
+def open_game():
+    random.seed(4)
+    game = MirrorKnightsGame()
+    for _ in range(20):
+        game.update(KeyBits())
+    boss = game.boss
+    # Phase 2 with every cooldown spent, so all six decisions are allowed.
+    boss.phase = 2
+    boss.attack_cooldown = boss.dash_cooldown = 0
+    boss.projectile_cooldown = boss.hazard_cooldown = 0
+    return game
+
+
+def recording(planner):
+    rolled = []
+    rollout = planner.rollout
+
+    def record(game, decision, module, horizon):
+        rolled.append((decision, horizon))
+        return rollout(game, decision, module, horizon)
+
+    planner.rollout = record
+    return rolled
+
+
+def test_every_allowed_candidate_is_rolled_out():
+    game = open_game()
+    planner = MonteCarloPlanner(budget=1.0, frame_budget=1.0).attach(game)
+    rolled = recording(planner)
+    before = (game.tick, game.player.x, game.boss.x, random.getstate())
+    for _ in range(3):
+        assert planner.decide(game.boss, game.player) in DECISIONS
+    assert (game.tick, game.player.x, game.boss.x, random.getstate()) == before
+    assert {decision for decision, _ in rolled} == set(DECISIONS)
+    # Each decision rolls out every candidate the same number of times.
+    assert len(rolled) % len(DECISIONS) == 0
+
+
+def test_tight_budget_shortens_the_horizon():
+    planner = MonteCarloPlanner(budget=0.004, frame_budget=1.0, step=2)
+    planner.clone_cost = 0.0002
+    planner.step_cost = 0.00003
+    rounds, horizon = planner.plan(0.004, DECISIONS)
+    assert rounds == 1
+    assert planner.min_horizon <= horizon < planner.horizon
+
+
+def test_falls_back_when_the_budget_cannot_cover_every_candidate():
+    game = open_game()
+    planner = MonteCarloPlanner(budget=0.004, frame_budget=1.0).attach(game)
+    planner.clone_cost = 0.001
+    planner.step_cost = 0.0001
+    rolled = recording(planner)
+    assert planner.decide(game.boss, game.player) is None
+    assert rolled == []
+    assert planner.skipped == 1
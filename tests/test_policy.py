@@ -0,0 +1,49 @@
+import random
+
+import numpy as np
+
+from boss_policy import DECISIONS, MLPPolicy, PolicyController, decision_mask, step_games
+from gametest import KeyBits, MirrorKnightsGame
+
+
+def games(controller, count=3):
+    random.seed(9)
+    return [MirrorKnightsGame(boss_policy=controller) for _ in range(count)]
+
+
+def test_batched_decisions_respect_the_mask():
+    controller = PolicyController(MLPPolicy.random(seed=1), budget=1.0)
+    fights = games(controller)
+    mask = np.zeros(len(DECISIONS), dtype=bool)
+    chosen = []
+    decide = controller.decide
+
+    def record(boss, player):
+        decision_mask(boss, mask)
+        allowed = {name for name, ok in zip(DECISIONS, mask) if ok}
+        decision = decide(boss, player)
+        chosen.append((decision, allowed))
+        return decision
+
+    controller.decide = record
+    for _ in range(200):
+        step_games(fights, [KeyBits()] * len(fights), controller)
+    assert chosen and controller.fallbacks == 0
+    assert all(decision in allowed for decision, allowed in chosen)
+
+
+def test_an_overrun_batch_falls_back_to_the_script():
+    controller = PolicyController(MLPPolicy.random(seed=1), budget=0.0, max_overruns=3)
+    fights = games(controller)
+    for fight in fights:
+        fight.boss.decision_timer = 0
+    assert controller.prepare(fights) == len(fights)
+    for fight in fights:
+        assert controller.decide(fight.boss, fight.player) is None
+    assert (controller.decisions, controller.fallbacks, controller.overruns) == (0, len(fights), 1)
+
+    # Unbatched calls overrun too, and enough of them switch the policy off.
+    boss, player = fights[0].boss, fights[0].player
+    assert controller.decide(boss, player) is None
+    assert controller.decide(boss, player) is None
+    assert not controller.enabled
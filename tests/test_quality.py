@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from gametest import QUALITY_LEVELS, RED, ParticleSystem, quality
+
+
+@pytest.fixture
+def lowest_quality():
+    level = quality.level
+    # Particles left alive by other tests' games would count against the cap.
+    quality.systems.clear()
+    quality.set_level(len(QUALITY_LEVELS) - 1)
+    yield quality.max_particles
+    quality.set_level(level)
+
+
+def test_particle_cap_is_shared_between_emitters(lowest_quality):
+    random.seed(0)
+    systems = [ParticleSystem() for _ in range(6)]
+    for _ in range(20):
+        for system in systems:
+            system.add_particles(100, 100, RED, count=40)
+    assert sum(len(system.particles) for system in systems) == lowest_quality
+    assert quality.live_particles() == lowest_quality
+
+    # Expired particles free room for any emitter, not just the one that made them.
+    for _ in range(100):
+        for system in systems:
+            system.update()
+    assert quality.live_particles() == 0
+    systems[0].add_particles(100, 100, RED, count=400)
+    assert len(systems[0].particles) == lowest_quality
+
+
+def test_emission_scales_with_a_carry(lowest_quality):
+    random.seed(0)
+    system = ParticleSystem()
+    emission = QUALITY_LEVELS[quality.level]['emission']
+    for _ in range(20):
+        system.add_particles(100, 100, RED, count=1)
+    assert len(system.particles) == int(20 * emission)
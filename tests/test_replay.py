@@ -0,0 +1,64 @@
+import json
+import random
+
+import pytest
+
+import gametest
+from gametest import KeyBits, MirrorKnightsGame
+from planner import player_model
+from replay import Replay, ReplayRecorder, restore_state
+
+FRAMES = 700
+
+
+def fingerprint(game):
+    boss = game.boss
+    probes = [game.danger.time_to_impact(x, y) for x in range(0, 800, 40) for y in range(0, 500, 50)]
+    return (game.tick, game.player.x, game.player.y, game.player.health, boss.x, boss.y, boss.health,
+            [(p.x, p.y) for p in boss.projectiles], [(h.x, h.lifetime) for h in boss.hazards],
+            [(l.x, l.active) for l in boss.lasers], probes)
+
+
+@pytest.fixture
+def recording(tmp_path):
+    gametest.init_headless()
+    random.seed(7)
+    game = MirrorKnightsGame()
+    path = tmp_path / 'fight.mkr'
+    recorder = ReplayRecorder(str(path), game, keyframe_interval=300)
+    live = {}
+    for frame in range(1, FRAMES + 1):
+        keys = player_model(game, KeyBits)
+        game.update(keys)
+        recorder.record(game, keys)
+        live[frame] = fingerprint(game)
+    recorder.close()
+    return path, live
+
+
+def test_seek_matches_live_play(recording):
+    path, live = recording
+    replay = Replay(str(path))
+    try:
+        assert replay.frames == FRAMES
+        for frame in (1, 299, 300, 301, 451, FRAMES):
+            assert fingerprint(replay.seek(frame)) == live[frame]
+    finally:
+        replay.close()
+
+
+def keyframe(objects, game=0):
+    return json.dumps({'frame': 0, 'game': game, 'danger': {'t': [0, {'t': [[], [], []]}]},
+                       'objects': objects, 'random': None, 'quality': 0}).encode()
+
+
+@pytest.mark.parametrize('data', [
+    keyframe([['system', {'s': {}}]]),
+    keyframe([['Player', {'s': {'x': {'m': [0, '__init__']}}}]]),
+    keyframe([['Player', {'s': {'x': {'x': 1}}}]]),
+    keyframe([['Player', {'s': {}}]]),
+    b'\x80\x04\x95',
+])
+def test_untrusted_keyframes_are_refused(data):
+    with pytest.raises(ValueError):
+        restore_state(data)
@@ -0,0 +1,62 @@
+import random
+import socket
+import time
+
+import pytest
+
+from gametest import RED, KeyBits, MirrorKnightsGame, Projectile
+from spectator import KIND_PLAYER, KIND_PROJECTILE, SpectatorDecoder, SpectatorServer, StateEncoder
+
+
+def fight():
+    random.seed(4)
+    return MirrorKnightsGame()
+
+
+def positions(decoder, kind):
+    return sorted((entity.x, entity.y) for entity in decoder.entities.values() if entity.kind == kind)
+
+
+def test_decoder_follows_deltas_and_skipped_frames():
+    game = fight()
+    encoder = StateEncoder(keyframe_interval=10)
+    decoder = SpectatorDecoder()
+    keys = KeyBits.from_names('right')
+    for tick in range(45):
+        if tick == 5:
+            game.boss.spawn(game.boss.projectiles, Projectile(100, 300, 700, 300, 3, 8, RED, 10))
+        if tick == 25:
+            game.boss.projectiles.clear()
+        game.update(keys)
+        frame, keyframe, _ = encoder.encode(game)
+        # Only every third frame reaches the viewer, split across reads; deltas still apply.
+        if keyframe or tick % 3 == 0:
+            for start in range(0, len(frame), 7):
+                decoder.feed(frame[start:start + 7])
+            assert decoder.tick == game.tick
+            player = game.player
+            assert positions(decoder, KIND_PLAYER) == [(pytest.approx(player.x, abs=0.125),
+                                                        pytest.approx(player.y, abs=0.125))]
+            assert len(positions(decoder, KIND_PROJECTILE)) == len(game.boss.projectiles)
+
+
+def test_server_streams_to_a_viewer():
+    game = fight()
+    server = SpectatorServer(keyframe_interval=4).start()
+    try:
+        viewer = socket.create_connection(('127.0.0.1', server.port), timeout=2)
+        deadline = time.monotonic() + 2
+        while not server.viewers and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for _ in range(10):
+            game.update(KeyBits())
+            server.publish(game)
+        decoder = SpectatorDecoder()
+        while decoder.tick != game.tick:
+            decoder.feed(viewer.recv(4096))
+        assert positions(decoder, KIND_PLAYER)[0][0] == pytest.approx(game.player.x, abs=0.125)
+        assert server.stats()['published'] == 10
+        viewer.close()
+    finally:
+        server.close()
+    assert not server.thread.is_alive()
@@ -0,0 +1,23 @@
+from sweep import SweepCache, grid_configs, sweep
+
+SPACE = {'aggression': [0.5, 0.9], 'decision_timer_max': [20]}
+
+
+def test_sweep_results_are_cached_on_disk(tmp_path):
+    directory = str(tmp_path / 'cache')
+    configs = list(grid_configs(SPACE))
+    summaries, ran = sweep(configs, [1, 2], SweepCache(directory), workers=1, max_ticks=240)
+    assert ran == 4
+    assert [summary['config'] for summary in summaries] == configs
+    assert all(summary['fights'] == 2 for summary in summaries)
+
+    # A fresh cache reads the same results back and simulates nothing new.
+    again, ran = sweep(configs, [1, 2], SweepCache(directory), workers=1, max_ticks=240)
+    assert ran == 0 and again == summaries
+
+    # Overlapping grids only run the cells they add; other limits are separate cells.
+    _, ran = sweep(configs + [{'aggression': 0.7, 'decision_timer_max': 20}], [1, 2],
+                   SweepCache(directory), workers=1, max_ticks=240)
+    assert ran == 2
+    _, ran = sweep(configs[:1], [1], SweepCache(directory), workers=1, max_ticks=120)
+    assert ran == 1
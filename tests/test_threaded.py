@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from arena import load_arena
+from gametest import (SNAP_DISTANCE, FrameSnapshot, KeyBits, MirrorKnightsGame, NullBackend, Projectile, RED,
+                      draw_interpolated, interpolate_view)
+
+
+def snapshots(game, keys):
+    previous = FrameSnapshot(game.tick, 0.0, game.view())
+    game.update(keys)
+    return previous, FrameSnapshot(game.tick, 1.0, game.view())
+
+
+def moving_game():
+    random.seed(2)
+    # The wide arena scrolls, so the camera moves along with the player.
+    game = MirrorKnightsGame(arena=load_arena('wide'))
+    game.player.x = game.player.prev_x = game.arena.width / 2
+    game.camera.follow(game.player, snap=True)
+    for _ in range(20):
+        game.update(KeyBits())
+    return game
+
+
+def test_views_do_not_follow_the_live_game():
+    game = moving_game()
+    view = game.view()
+    x = view.player.x
+    for _ in range(10):
+        game.update(KeyBits.from_names('right'))
+    assert view.player.x == x != game.player.x
+
+
+def test_interpolation_blends_actors_and_camera():
+    game = moving_game()
+    game.boss.spawn(game.boss.projectiles, Projectile(game.player.x, 300, game.arena.width, 300, 6, 8, RED, 10))
+    previous, latest = snapshots(game, KeyBits.from_names('right'))
+    view = interpolate_view(previous, latest, 0.5)
+    before, after = previous.view, latest.view
+    assert view.player.x == pytest.approx((before.player.x + after.player.x) / 2)
+    assert before.camera[0] != after.camera[0]
+    assert view.camera[0] == pytest.approx((before.camera[0] + after.camera[0]) / 2)
+    projectile = view.boss.threats[0]
+    assert projectile.x == pytest.approx((before.boss.threats[0].x + after.boss.threats[0].x) / 2)
+    # The live game is untouched by drawing an interpolated frame.
+    draw_interpolated(NullBackend(), previous, latest, 0.5)
+    assert game.player.x == after.player.x
+
+
+def test_interpolation_snaps_teleports_and_new_fights():
+    game = moving_game()
+    previous, latest = snapshots(game, KeyBits())
+    jumped = latest._replace(view=latest.view._replace(
+        player=latest.view.player._replace(x=latest.view.player.x + SNAP_DISTANCE + 1)))
+    assert interpolate_view(previous, jumped, 0.5).player == jumped.view.player
+    restarted = latest._replace(view=latest.view._replace(fight_id=latest.view.fight_id + 1))
+    assert interpolate_view(previous, restarted, 0.5) is restarted.view
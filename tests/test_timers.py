@@ -0,0 +1,146 @@
+import random
+
+from gametest import KeyBits, MirrorKnightsGame
+from timers import WHEEL_BITS, WHEEL_LEVELS, WHEEL_SLOTS, Countdown, TimerWheel
+
+OVERFLOW = WHEEL_SLOTS << (WHEEL_BITS * (WHEEL_LEVELS - 1))
+
+
+class Owner:
+    cooldown = Countdown()
+
+    def __init__(self, timers):
+        self.timers = timers
+
+
+def record(wheel, fired, *delays):
+    for delay in delays:
+        wheel.schedule(delay, lambda: fired.append(wheel.now))
+
+
+def live_timers(wheel):
+    buckets = [bucket for slots in wheel.levels for bucket in slots.values()] + [wheel.overflow]
+    return [timer for bucket in buckets for timer in bucket if not timer.cancelled]
+
+
+def test_cascade_fires_on_the_deadline():
+    wheel = TimerWheel()
+    fired = []
+    delays = (WHEEL_SLOTS - 1, WHEEL_SLOTS, WHEEL_SLOTS + 1, 1000, WHEEL_SLOTS ** 2, WHEEL_SLOTS ** 2 + 77)
+    record(wheel, fired, *delays)
+    assert wheel.levels[1] and wheel.levels[2]
+    wheel.advance(WHEEL_SLOTS ** 2 + 100)
+    assert fired == list(delays)
+
+
+def test_cascade_after_an_offset_start():
+    wheel = TimerWheel()
+    wheel.advance(37)
+    fired = []
+    record(wheel, fired, 100, 4000)
+    wheel.advance(5000)
+    assert fired == [137, 4037]
+
+
+def test_overflow_fires_on_the_deadline():
+    wheel = TimerWheel()
+    fired = []
+    record(wheel, fired, OVERFLOW + 5, 3 * OVERFLOW)
+    assert len(wheel.overflow) == 2
+    wheel.advance(OVERFLOW + 4)
+    assert fired == []
+    assert len(wheel.overflow) == 1
+    wheel.advance(3 * OVERFLOW)
+    assert fired == [OVERFLOW + 5, 3 * OVERFLOW]
+
+
+def test_cancelled_timers_do_not_fire():
+    wheel = TimerWheel()
+    fired = []
+    timer = wheel.schedule(500, lambda: fired.append(wheel.now))
+    timer.cancel()
+    wheel.advance(1000)
+    assert fired == []
+
+
+def test_next_deadline_across_levels():
+    wheel = TimerWheel()
+    wheel.advance(10)
+    far = wheel.schedule(OVERFLOW + 1)
+    late = wheel.schedule(5000)
+    soon = wheel.schedule(200)
+    assert wheel.next_deadline() == 210
+    soon.cancel()
+    assert wheel.next_deadline() == 5010
+    late.cancel()
+    assert wheel.next_deadline() == OVERFLOW + 11
+    far.cancel()
+    assert wheel.next_deadline() is None
+
+
+def test_next_deadline_scans_slots_from_the_current_one():
+    wheel = TimerWheel()
+    wheel.advance(WHEEL_SLOTS * 3 + 5)
+    # Both land on level 1; the later one wraps around to a lower slot index.
+    wheel.schedule(WHEEL_SLOTS * 63 + 10)
+    wheel.schedule(WHEEL_SLOTS * 2)
+    assert len(wheel.levels[1]) == 2
+    assert wheel.next_deadline() == wheel.now + WHEEL_SLOTS * 2
+
+
+def test_countdown_keeps_one_live_wakeup():
+    wheel = TimerWheel()
+    owner = Owner(wheel)
+    for value in (90, 40, 300, 120):
+        owner.cooldown = value
+    assert owner.cooldown == 120
+    assert len(live_timers(wheel)) == 1
+    assert wheel.next_deadline() == 120
+    owner.cooldown = 0
+    assert live_timers(wheel) == []
+    assert wheel.next_deadline() is None
+
+
+def test_countdown_reads_down_with_the_wheel():
+    wheel = TimerWheel()
+    owner = Owner(wheel)
+    owner.cooldown = 70
+    wheel.advance(30)
+    assert owner.cooldown == 40
+    wheel.advance(100)
+    assert owner.cooldown == 0
+
+
+def test_boss_decisions_pause_through_a_phase_shift():
+    random.seed(6)
+    game = MirrorKnightsGame()
+    boss = game.boss
+    decisions = []
+    shifting = {}
+    decide = boss.ai_decision
+    move = boss.move
+
+    def record_decision(player):
+        decisions.append(game.tick)
+        return decide(player)
+
+    def record_move(player, dt=1):
+        shifting[game.tick] = boss.phase_shifting
+        return move(player, dt)
+
+    boss.ai_decision = record_decision
+    boss.move = record_move
+    for tick in range(1, 700):
+        game.update(KeyBits())
+        if tick == 100:
+            boss.health = int(boss.max_health * boss.phase_shift_threshold[0]) + 1
+            boss.invincibility = 0
+            boss.take_damage(5)
+            assert boss.phase_shifting
+    assert not boss.phase_shifting
+    # As with the original per-tick decrement, only ticks that start outside a phase
+    # shift count toward the next decision.
+    for before, after in zip(decisions, decisions[1:]):
+        counted = sum(1 for tick in range(before + 1, after + 1) if not shifting[tick])
+        assert counted == boss.decision_timer_max
+    assert any(shifting[tick] for tick in range(decisions[0], decisions[-1]))
@@ -0,0 +1,142 @@
+WHEEL_BITS = 6
+WHEEL_SLOTS = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SLOTS - 1
+WHEEL_LEVELS = 3
+
+
+class Timer:
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    def __init__(self, levels=WHEEL_LEVELS):
+        self.now = 0
+        # Sparse slots: a rollout deepcopies the wheel, so empty slots should cost nothing.
+        self.levels = [{} for _ in range(levels)]
+        self.overflow = []
+
+    def place(self, timer):
+        delta = timer.deadline - self.now
+        for level, slots in enumerate(self.levels):
+            if delta < WHEEL_SLOTS << (WHEEL_BITS * level):
+                slot = (timer.deadline >> (WHEEL_BITS * level)) & WHEEL_MASK
+                slots.setdefault(slot, []).append(timer)
+                return
+        self.overflow.append(timer)
+
+    def schedule(self, delay, callback=None, *args):
+        timer = Timer(self.now + max(0, int(delay)), callback, args)
+        self.place(timer)
+        return timer
+
+    def cascade(self, level):
+        slot = (self.now >> (WHEEL_BITS * level)) & WHEEL_MASK
+        for timer in self.levels[level].pop(slot, ()):
+            if not timer.cancelled:
+                self.place(timer)
+
+    def advance(self, to_tick):
+        slots = self.levels[0]
+        while True:
+            # Drain the current slot; callbacks may schedule more work for this same tick.
+            bucket = slots.pop(self.now & WHEEL_MASK, None)
+            if bucket is None:
+                if self.now >= to_tick:
+                    return
+                self.now += 1
+                for level in range(len(self.levels) - 1, 0, -1):
+                    if self.now & ((1 << (WHEEL_BITS * level)) - 1) == 0:
+                        if level == len(self.levels) - 1:
+                            overflow, self.overflow = self.overflow, []
+                            for timer in overflow:
+                                if not timer.cancelled:
+                                    self.place(timer)
+                        self.cascade(level)
+                continue
+            for timer in bucket:
+                if timer.cancelled:
+                    continue
+                if timer.deadline > self.now:
+                    self.place(timer)
+                elif timer.callback is not None:
+                    timer.callback(*timer.args)
+
+    def next_deadline(self):
+        best = None
+        slots = self.levels[0]
+        for offset in range(WHEEL_SLOTS):
+            bucket = slots.get((self.now + offset) & WHEEL_MASK)
+            if bucket and any(not timer.cancelled for timer in bucket):
+                best = self.now + offset
+                break
+        for level in range(1, len(self.levels)):
+            # Slots after the current one hold later blocks in order; the current slot
+            # can only hold the block one full turn ahead, so it is checked last.
+            slots = self.levels[level]
+            if not slots:
+                continue
+            current = (self.now >> (WHEEL_BITS * level)) & WHEEL_MASK
+            for offset in range(1, WHEEL_SLOTS + 1):
+                bucket = slots.get((current + offset) & WHEEL_MASK)
+                if not bucket:
+                    continue
+                live = [timer.deadline for timer in bucket if not timer.cancelled]
+                if live:
+                    deadline = min(live)
+                    if best is None or deadline < best:
+                        best = deadline
+                    break
+        for timer in self.overflow:
+            if not timer.cancelled and (best is None or timer.deadline < best):
+                best = timer.deadline
+        return best
+
+
+class Countdown:
+    # Ticks remaining until a deadline on the owner's wheel. Reading it is O(1), and
+    # nothing has to decrement it; setting it also registers a wake-up so
+    # next_deadline() sees the expiry.
+    def __set_name__(self, owner, name):
+        self.key = f"_{name}_deadline"
+        self.timer_key = f"_{name}_timer"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return max(0, instance.__dict__.get(self.key, 0) - instance.timers.now)
+
+    def __set__(self, instance, value):
+        timers = instance.timers
+        deadline = timers.now + int(value)
+        state = instance.__dict__
+        if state.get(self.key) == deadline:
+            return
+        state[self.key] = deadline
+        # One live wake-up per countdown: a new value retires the previous one.
+        timer = state.get(self.timer_key)
+        if timer is not None:
+            timer.cancel()
+        state[self.timer_key] = timers.schedule(value) if value > 0 else None
+
+
+class Elapsed:
+    # Ticks since the value was last set, read from the owner's wheel.
+    def __set_name__(self, owner, name):
+        self.key = f"_{name}_start"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.timers.now - instance.__dict__.get(self.key, 0)
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.key] = instance.timers.now - int(value)